@@ -0,0 +1,182 @@
+import asyncio
+import collections
+import functools
+import json
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+from auth import CredentialManager, build_service, get_credentials, save_credentials, get_service_account_credentials
+from config import ACCOUNTS_FILE, ACCOUNT_MAX_CONCURRENCY, ACCOUNT_QPS_LIMIT, DELEGATED_ACCOUNT_LIMIT
+from utils.http_transport import build_transport
+from utils.request_executor import TokenBucket
+from utils.service_pool import current_account
+
+DEFAULT_ACCOUNT = "default"
+
+
+class Account:
+    # One Google identity. Its credentials load on the first call that uses it. The slots and
+    # limiter keep one busy account from taking every worker or the whole request budget.
+
+    def __init__(self, name: str, credentials: CredentialManager, kind: str = "oauth",
+                 max_concurrency: int = ACCOUNT_MAX_CONCURRENCY, qps_limit: float = ACCOUNT_QPS_LIMIT,
+                 qps_burst: float = None):
+        self.name = name
+        self.kind = kind
+        self.credentials = credentials
+        self.is_default = False
+        self.max_concurrency = max_concurrency
+        self.slots = asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else None
+        self.limiter = TokenBucket(qps_limit, qps_burst or max(1.0, 2 * qps_limit)) if qps_limit > 0 else None
+        self.active = 0
+        # Calls that have picked this account and are waiting for one of its slots.
+        self.waiting = 0
+        self.calls = 0
+        # Set when the registry drops a delegated account, so worker threads drop its services too.
+        self.retired = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "type": self.kind,
+            "default": self.is_default,
+            "maxConcurrency": self.max_concurrency or None,
+            "qpsLimit": self.limiter.rate if self.limiter else None,
+            "activeCalls": self.active,
+            "waitingCalls": self.waiting,
+            "calls": self.calls
+        }
+
+
+def _account_from_config(name: str, entry: Dict[str, Any]) -> Account:
+    kind = entry.get("type", "oauth")
+    if kind == "oauth":
+        token_file = entry.get("token_file", "token.json")
+        credentials = CredentialManager(
+            load=functools.partial(get_credentials, token_file, entry.get("client_secrets_file", "credentials.json")),
+            save=functools.partial(save_credentials, token_file=token_file)
+        )
+    elif kind == "service_account":
+        credentials = CredentialManager(
+            load=functools.partial(get_service_account_credentials, entry["key_file"], entry.get("subject")), save=None
+        )
+    else:
+        raise ValueError(f"Unknown account type for '{name}': {kind}")
+    return Account(name, credentials, kind, entry.get("max_concurrency", ACCOUNT_MAX_CONCURRENCY),
+                   entry.get("qps_limit", ACCOUNT_QPS_LIMIT), entry.get("qps_burst"))
+
+
+class AccountRegistry:
+    # Accounts by name, plus users impersonated on demand through domain-wide delegation.
+    # Every service built on one worker thread shares that thread's HTTP connections, so
+    # serving another account costs an authorized wrapper and a Resource, not a new socket.
+    # Delegated users are kept in LRU order and the least recently used idle one is dropped
+    # past delegated_limit, since any address in the domains can create one.
+
+    def __init__(self, accounts: List[Account], default: str = None, delegation: Dict[str, Any] = None,
+                 http_factory: Callable[[], Any] = build_transport, delegated_limit: int = DELEGATED_ACCOUNT_LIMIT):
+        self._accounts = {account.name: account for account in accounts}
+        self._delegated_accounts = collections.OrderedDict()
+        self.delegated_limit = delegated_limit
+        self.default = default or accounts[0].name
+        self._accounts[self.default].is_default = True
+        self.delegation = delegation
+        self._domains = {d.lower() for d in (delegation or {}).get("domains", [])}
+        self._http_factory = http_factory
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.connections = 0
+
+    @classmethod
+    def from_config(cls) -> "AccountRegistry":
+        if ACCOUNTS_FILE:
+            return cls.from_file(ACCOUNTS_FILE)
+        return cls([Account(DEFAULT_ACCOUNT, CredentialManager())])
+
+    @classmethod
+    def from_file(cls, path: str) -> "AccountRegistry":
+        with open(path) as f:
+            config = json.load(f)
+        accounts = [_account_from_config(name, entry) for name, entry in config.get("accounts", {}).items()]
+        if not accounts:
+            raise ValueError(f"No accounts configured in {path}")
+        logging.info(f"Loaded {len(accounts)} accounts from {path}")
+        return cls(accounts, config.get("default"), config.get("delegation"))
+
+    @property
+    def selectable(self) -> bool:
+        return len(self._accounts) > 1 or bool(self._domains)
+
+    def get(self, name: Optional[str] = None) -> Account:
+        if not name:
+            return self._accounts[self.default]
+        account = self._accounts.get(name)
+        if account is not None:
+            return account
+        if "@" in name and name.rsplit("@", 1)[1].lower() in self._domains:
+            return self._delegated(name.lower())
+        raise KeyError(f"Unknown account: {name}. Use one of {', '.join(self.names())}"
+                       + (f" or a user in {', '.join(sorted(self._domains))}." if self._domains else "."))
+
+    def names(self) -> List[str]:
+        return sorted(self._accounts)
+
+    def service_factory(self) -> Any:
+        # Called by ServicePool on a worker thread, in the context of the account to build for.
+        account = current_account.get() or self.get()
+        http = getattr(self._local, "http", None)
+        if http is None:
+            http = self._local.http = self._http_factory()
+            with self._lock:
+                self.connections += 1
+        return build_service(account.credentials.get(), http)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            accounts = list(self._accounts.values()) + list(self._delegated_accounts.values())
+        return {
+            "defaultAccount": self.default,
+            "delegatedDomains": sorted(self._domains),
+            "delegatedAccountLimit": self.delegated_limit if self._domains else None,
+            "sharedTransports": self.connections,
+            "accounts": [account.stats() for account in accounts]
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            accounts = list(self._accounts.values()) + list(self._delegated_accounts.values())
+        for account in accounts:
+            account.credentials.close()
+
+    def _delegated(self, email: str) -> Account:
+        with self._lock:
+            account = self._delegated_accounts.get(email)
+            if account is not None:
+                self._delegated_accounts.move_to_end(email)
+                return account
+            config = self.delegation
+            credentials = CredentialManager(
+                load=functools.partial(get_service_account_credentials, config["key_file"], email), save=None
+            )
+            account = self._delegated_accounts[email] = Account(
+                email, credentials, "delegated", config.get("max_concurrency", ACCOUNT_MAX_CONCURRENCY),
+                config.get("qps_limit", ACCOUNT_QPS_LIMIT), config.get("qps_burst")
+            )
+            logging.info(f"Added delegated account {email}")
+            self._evict_delegated(keep=email)
+            return account
+
+    def _evict_delegated(self, keep: str) -> None:
+        # The account being handed out and accounts with calls in flight or waiting for a slot are
+        # skipped: dropping one would give its next call fresh slots and limiter while the old ones
+        # are still in use. The registry can run over the limit until they go idle.
+        if self.delegated_limit <= 0:
+            return
+        excess = len(self._delegated_accounts) - self.delegated_limit
+        idle = [email for email, account in self._delegated_accounts.items()
+                if email != keep and account.active == 0 and account.waiting == 0]
+        for email in idle[:excess]:
+            account = self._delegated_accounts.pop(email)
+            account.retired = True
+            account.credentials.close()
+            logging.info(f"Dropped delegated account {email}")
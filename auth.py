@@ -1,23 +1,139 @@
 import os
+import json
 import logging
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
-from config import SCOPES
+import threading
+import datetime
+import functools
+import google_auth_httplib2
+from googleapiclient.discovery import build_from_document, DISCOVERY_URI
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.http import build_http
+from utils.http_transport import build_transport
+from config import SCOPES, DISCOVERY_CACHE_PATH, CREDENTIAL_REFRESH_MARGIN
 
-def authenticate_drive():
+def get_credentials(token_file: str = "token.json", client_secrets_file: str = "credentials.json"):
+    # These pull in requests and oauthlib; importing them here keeps them off the startup path.
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
     creds = None
-    if os.path.exists("token.json"):
-        logging.info("Loading existing credentials from token.json")
-        creds = Credentials.from_authorized_user_file("token.json", SCOPES)
+    if os.path.exists(token_file):
+        logging.info(f"Loading existing credentials from {token_file}")
+        creds = Credentials.from_authorized_user_file(token_file, SCOPES)
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
             creds.refresh(Request())
         else:
-            flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
+            flow = InstalledAppFlow.from_client_secrets_file(client_secrets_file, SCOPES)
             creds = flow.run_local_server(port=0)
-        with open("token.json", "w") as token:
-            token.write(creds.to_json())
+        save_credentials(creds, token_file)
     logging.info("Authenticated with Google Drive API")
-    return build("drive", "v3", credentials=creds)
+    return creds
+
+def save_credentials(creds, token_file: str = "token.json"):
+    with open(token_file, "w") as token:
+        token.write(creds.to_json())
+
+@functools.lru_cache(maxsize=None)
+def _service_account_key(key_file: str):
+    from google.oauth2 import service_account
+    return service_account.Credentials.from_service_account_file(key_file, scopes=SCOPES)
+
+def get_service_account_credentials(key_file: str, subject: str = None):
+    # With a subject the service account acts as that user through domain-wide delegation.
+    # The key file is parsed once; each subject gets its own credentials and token.
+    from google.auth.transport.requests import Request
+    creds = _service_account_key(key_file).with_subject(subject)
+    creds.refresh(Request())
+    logging.info(f"Authenticated with service account {creds.service_account_email}" + (f" as {subject}" if subject else ""))
+    return creds
+
+@functools.lru_cache(maxsize=None)
+def load_discovery_document():
+    # Prefer an on-disk copy, then the document bundled with googleapiclient; only fetch
+    # over the network when neither exists, and keep what was fetched for next time.
+    if DISCOVERY_CACHE_PATH and os.path.exists(DISCOVERY_CACHE_PATH):
+        try:
+            with open(DISCOVERY_CACHE_PATH) as f:
+                return json.load(f)
+        except ValueError:
+            logging.warning(f"Ignoring unreadable discovery document at {DISCOVERY_CACHE_PATH}")
+    document = get_static_doc("drive", "v3")
+    if document is not None:
+        return json.loads(document)
+    logging.info("No cached Drive discovery document, fetching it")
+    http = build_http()
+    resp, content = http.request(DISCOVERY_URI.format(api="drive", apiVersion="v3"))
+    # Only a successful response is kept; an error page on disk would break every later start.
+    if resp.status != 200:
+        raise RuntimeError(f"Could not fetch the Drive discovery document: HTTP {resp.status}")
+    document = content.decode()
+    parsed = json.loads(document)
+    if DISCOVERY_CACHE_PATH:
+        os.makedirs(os.path.dirname(DISCOVERY_CACHE_PATH) or ".", exist_ok=True)
+        with open(DISCOVERY_CACHE_PATH, "w") as f:
+            f.write(document)
+    return parsed
+
+def build_service(creds, http=None):
+    # httplib2.Http is not thread-safe, so a transport must only be shared by services used on
+    # one thread. build_http() also stops httplib2 from treating resumable-upload 308s as redirects.
+    # With GDRIVE_TRANSPORT=httpx every thread gets a handle on one shared HTTP/2 client instead.
+    http = google_auth_httplib2.AuthorizedHttp(creds, http=http or build_transport())
+    return build_from_document(load_discovery_document(), http=http)
+
+def authenticate_drive():
+    return build_service(get_credentials())
+
+
+class CredentialManager:
+    # Loads credentials on first use instead of at startup, and refreshes them on a
+    # background timer shortly before they expire so no tool call pays for the refresh.
+
+    def __init__(self, load=get_credentials, save=save_credentials, refresh_margin: float = CREDENTIAL_REFRESH_MARGIN):
+        self.refresh_margin = refresh_margin
+        self._load = load
+        self._save = save
+        self._creds = None
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def get(self):
+        with self._lock:
+            if self._creds is None:
+                self._creds = self._load()
+                self._schedule_refresh()
+            return self._creds
+
+    def service_factory(self):
+        return build_service(self.get())
+
+    def close(self):
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+
+    def _schedule_refresh(self):
+        # Service account credentials can always mint a new token; user credentials need a refresh token.
+        if not self._creds.expiry or not getattr(self._creds, "refresh_token", True):
+            return
+        expiry = self._creds.expiry.replace(tzinfo=datetime.timezone.utc)
+        delay = (expiry - datetime.datetime.now(datetime.timezone.utc)).total_seconds() - self.refresh_margin
+        self._timer = threading.Timer(max(delay, 0), self._refresh)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _refresh(self):
+        from google.auth.transport.requests import Request
+        with self._lock:
+            try:
+                self._creds.refresh(Request())
+                if self._save:
+                    self._save(self._creds)
+                logging.info("Refreshed Google Drive credentials in the background")
+            except Exception as e:
+                logging.error(f"Background credential refresh failed: {e}")
+                # Leave it to google-auth to refresh on the next request.
+                return
+            self._schedule_refresh()
@@ -0,0 +1,122 @@
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("GDRIVE_STATE_DIR", tempfile.mkdtemp(prefix="gdrive-bench-"))
+os.environ.setdefault("GDRIVE_QPS_LIMIT", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from google.auth.credentials import AnonymousCredentials
+
+from accounts import Account, AccountRegistry
+from auth import CredentialManager
+from fake_drive import FakeDrive, FakeHttp
+from main import GoogleDriveMCP
+
+
+class CountingTransports:
+    # http_factory for AccountRegistry; every FakeHttp stands for one pooled connection.
+
+    def __init__(self, drive: FakeDrive):
+        self.drive = drive
+        self.created = 0
+
+    def __call__(self):
+        self.created += 1
+        return FakeHttp(self.drive)
+
+
+def account(name: str, max_concurrency: int = 0) -> Account:
+    return Account(name, CredentialManager(load=AnonymousCredentials, save=None), max_concurrency=max_concurrency)
+
+
+async def timed_call(agent: GoogleDriveMCP, arguments: dict):
+    started = time.perf_counter()
+    await agent.mcp.call_tool("get_file_metadata", arguments)
+    return time.perf_counter() - started
+
+
+async def run_accounts(agents, file_id: str, calls: int):
+    # agents: [(agent, account name or None)]. Each account makes `calls` calls; all run at once.
+    async def one_account(agent, name):
+        selector = {"account": name} if name else {}
+        first = await timed_call(agent, {"file_id": file_id, **selector})
+        rest = await asyncio.gather(*(timed_call(agent, {"file_id": file_id, "fields": "id, name", **selector})
+                                      for _ in range(calls - 1)))
+        return first, rest
+    started = time.perf_counter()
+    results = await asyncio.gather(*(one_account(agent, name) for agent, name in agents))
+    return time.perf_counter() - started, [first for first, _ in results]
+
+
+def shared_server(drive, names, workers):
+    transports = CountingTransports(drive)
+    started = time.perf_counter()
+    agent = GoogleDriveMCP(max_workers=workers, accounts=AccountRegistry([account(n) for n in names],
+                                                                         http_factory=transports))
+    return [(agent, name) for name in names], transports, time.perf_counter() - started
+
+
+def server_per_account(drive, names, workers):
+    transports = CountingTransports(drive)
+    started = time.perf_counter()
+    agents = [(GoogleDriveMCP(max_workers=workers, accounts=AccountRegistry([account(n)], http_factory=transports)), None)
+              for n in names]
+    return agents, transports, time.perf_counter() - started
+
+
+async def fairness(drive, file_id, workers, heavy_calls, light_calls, limit):
+    registry = AccountRegistry([account("heavy", limit), account("light")], http_factory=CountingTransports(drive))
+    agent = GoogleDriveMCP(max_workers=workers, accounts=registry)
+    logging.getLogger().setLevel(logging.WARNING)
+    heavy = [timed_call(agent, {"file_id": file_id, "fields": "id, size", "account": "heavy"})
+             for _ in range(heavy_calls)]
+    light = [timed_call(agent, {"file_id": file_id, "fields": "id, size", "account": "light"})
+             for _ in range(light_calls)]
+    # The cache would answer every call after the first, so each call asks for fresh metadata.
+    agent.cache.max_entries = 0
+    results = await asyncio.gather(*heavy, *light)
+    agent.pool.shutdown()
+    return statistics.median(results[heavy_calls:])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serving many accounts from one server versus one server per account")
+    parser.add_argument("--accounts", type=int, default=20)
+    parser.add_argument("--calls", type=int, default=10, help="calls per account")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.005, help="simulated Drive round trip in seconds")
+    args = parser.parse_args()
+
+    drive = FakeDrive(latency=args.latency)
+    file_id = drive.add_file("shared.txt", content=b"x" * 1024)
+    names = [f"user{i}" for i in range(args.accounts)]
+
+    print(f"{args.accounts} accounts x {args.calls} calls, workers={args.workers}, latency={args.latency * 1000:.1f}ms")
+    print(f"{'layout':<22}{'setup ms':>10}{'wall s':>9}{'calls/s':>10}{'first call p50 ms':>19}{'transports':>12}")
+    for label, build in (("one shared server", shared_server), ("server per account", server_per_account)):
+        agents, transports, setup = build(drive, names, args.workers)
+        # FastMCP sets up logging when a server is created.
+        logging.getLogger().setLevel(logging.WARNING)
+        wall, firsts = asyncio.run(run_accounts(agents, file_id, args.calls))
+        for agent in {id(agent): agent for agent, _ in agents}.values():
+            agent.pool.shutdown()
+        print(f"{label:<22}{setup * 1000:>10.1f}{wall:>9.2f}{args.accounts * args.calls / wall:>10.1f}"
+              f"{statistics.median(firsts) * 1000:>19.1f}{transports.created:>12}")
+
+    print()
+    print("light account p50 while a heavy account sends 200 concurrent calls")
+    for limit in (0, 2):
+        p50 = asyncio.run(fairness(drive, file_id, args.workers, 200, 20, limit))
+        print(f"  heavy max_concurrency={limit or 'unlimited':<10} light p50={p50 * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
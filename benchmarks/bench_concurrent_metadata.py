@@ -0,0 +1,81 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from googleapiclient.discovery import build
+from googleapiclient.http import build_http
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import GoogleDriveMCP
+
+
+def make_handler(latency: float):
+    class FakeDriveHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            time.sleep(latency)
+            file_id = self.path.split("?")[0].rstrip("/").split("/")[-1]
+            body = json.dumps({
+                "id": file_id, "name": f"file-{file_id}", "mimeType": "text/plain",
+                "size": "1024", "parents": ["root"]
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+    return FakeDriveHandler
+
+
+def start_fake_drive(latency: float):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/drive/v3/"
+
+
+async def run_calls(agent: GoogleDriveMCP, calls: int):
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        agent.mcp.call_tool("get_file_metadata", {"file_id": f"id{i}"}) for i in range(calls)
+    ))
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent get_file_metadata throughput against a local fake Drive")
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated server latency in seconds")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8, 16])
+    args = parser.parse_args()
+
+    server, endpoint = start_fake_drive(args.latency)
+
+    def factory():
+        return build("drive", "v3", http=build_http(), client_options={"api_endpoint": endpoint})
+
+    try:
+        for workers in args.workers:
+            agent = GoogleDriveMCP(service_factory=factory, max_workers=workers)
+            logging.getLogger().setLevel(logging.WARNING)
+            asyncio.run(run_calls(agent, workers))
+            elapsed = asyncio.run(run_calls(agent, args.calls))
+            agent.pool.shutdown()
+            print(f"workers={workers:>3}  calls={args.calls}  elapsed={elapsed:.3f}s  throughput={args.calls / elapsed:.1f} calls/s")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
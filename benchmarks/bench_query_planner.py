@@ -0,0 +1,98 @@
+import argparse
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("GDRIVE_STATE_DIR", tempfile.mkdtemp(prefix="gdrive-bench-"))
+os.environ.setdefault("GDRIVE_QPS_LIMIT", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_drive import FakeDrive
+from utils.query_builder import build_query_string, query_terms
+from utils.query_planner import plan_query
+from utils.request_executor import execute
+
+PARENT_CLAUSE = re.compile(r"'([^']+)' in parents")
+WORDS = ["budget", "roadmap", "invoice", "hiring", "launch", "retro", "forecast", "audit"]
+
+
+def cost_model(drive: FakeDrive, base: float, per_file: float):
+    # Drive does not publish how fullText is evaluated. This model charges a fullText listing for
+    # every file it could have to read: the whole corpus, or only the children of the folders the
+    # query names. Metadata-only listings cost a plain round trip.
+    def latency(method, path, params):
+        query = params.get("q", "")
+        if "fullText" not in query:
+            return base
+        folders = set(PARENT_CLAUSE.findall(query))
+        scanned = sum(1 for f in drive.files.values() if folders.intersection(f.get("parents", []))) \
+            if folders else len(drive.files)
+        return base + scanned * per_file
+    return latency
+
+
+def run(service, query):
+    files, page_token = [], None
+    while True:
+        params = {"q": query, "spaces": "drive", "pageSize": 100, "fields": "nextPageToken, files(id)"}
+        if page_token:
+            params["pageToken"] = page_token
+        response = execute(service.files().list(**params))
+        files.extend(response.get("files", []))
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return {f["id"] for f in files}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="fullText searches with and without the query planner")
+    parser.add_argument("--files", type=int, default=20_000)
+    parser.add_argument("--folders", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.02, help="round trip in seconds")
+    parser.add_argument("--per-file", type=float, default=20e-6, help="fullText cost per file read, in seconds")
+    args = parser.parse_args()
+
+    drive = FakeDrive(seed=3)
+    folders = [drive.add_folder(f"team {i}") for i in range(args.folders)]
+    for i in range(args.files):
+        word = WORDS[i % len(WORDS)]
+        drive.add_file(f"{word} notes {i}.txt", folders[i % len(folders)], content=f"{word} plan {i}".encode(),
+                       mime_type="application/pdf" if i % 10 == 0 else "text/plain")
+    drive.latency = cost_model(drive, args.latency, args.per_file)
+    service = drive.service()
+
+    cases = [
+        ("fullText + rare name", {"contains_text": "plan", "name": "notes 1234"}),
+        ("fullText + missing name", {"contains_text": "plan", "name": "no such file"}),
+        ("fullText + mimeType", {"contains_text": "budget", "mime_type": "application/pdf"}),
+        ("fullText only", {"contains_text": "roadmap"}),
+    ]
+    print(f"{args.files} files in {args.folders} folders, round trip {args.latency * 1000:.0f}ms, "
+          f"fullText {args.per_file * 1e6:.0f}us per file read")
+    print(f"{'case':<26}{'strategy':<10}{'matches':>8}{'unplanned ms':>14}{'planned ms':>12}{'speedup':>9}")
+    for label, filters in cases:
+        filters = {**filters, "trashed": False}
+        unplanned, planned = [], []
+        for _ in range(args.rounds):
+            started = time.perf_counter()
+            expected = run(service, build_query_string(**filters))
+            unplanned.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            query, plan = plan_query(service, query_terms(**filters))
+            found = run(service, query) if query is not None else set()
+            planned.append(time.perf_counter() - started)
+            assert found == expected, f"{label}: planned search returned different files"
+        before, after = statistics.median(unplanned), statistics.median(planned)
+        print(f"{label:<26}{plan['strategy']:<10}{len(expected):>8}{before * 1000:>14.0f}{after * 1000:>12.0f}"
+              f"{before / after:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
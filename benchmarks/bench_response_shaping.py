@@ -0,0 +1,85 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import pydantic_core
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.pagination import format_files
+from utils.response_handler import FIELD_PROFILES, shape_items, success_response
+
+# What Drive returns for a wide mask with a bare "owners", as get_file_metadata used to request.
+WIDE_FIELDS = ["id", "name", "mimeType", "size", "createdTime", "modifiedTime", "owners", "parents", "webViewLink"]
+MIME_TYPES = ["application/pdf", "image/png", "text/plain", "application/vnd.google-apps.document",
+              "application/vnd.google-apps.folder", "application/vnd.google-apps.spreadsheet"]
+
+
+def synthetic_files(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    owners = [{
+        "kind": "drive#user", "displayName": f"User {i}", "me": i == 0, "permissionId": f"{rng.getrandbits(64):020d}",
+        "emailAddress": f"user{i}@example.com",
+        "photoLink": f"https://lh3.googleusercontent.com/a/{rng.getrandbits(128):032x}=s64"
+    } for i in range(20)]
+    files = []
+    for i in range(count):
+        file_id = f"{rng.getrandbits(160):040x}"[:33]
+        files.append({
+            "id": file_id,
+            "name": f"Quarterly report {i} draft v{rng.randint(1, 9)}.pdf",
+            "mimeType": rng.choice(MIME_TYPES),
+            "size": str(rng.randint(1_000, 50_000_000)),
+            "createdTime": f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T10:00:00.000Z",
+            "modifiedTime": f"2025-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T12:30:00.000Z",
+            "owners": [rng.choice(owners)],
+            "parents": [f"{rng.getrandbits(160):040x}"[:33]],
+            "webViewLink": f"https://drive.google.com/file/d/{file_id}/view?usp=drivesdk",
+            "md5Checksum": f"{rng.getrandbits(128):032x}",
+            "starred": rng.random() < 0.1,
+            "trashed": False
+        })
+    return files
+
+
+def measure(payload, rounds: int):
+    # The MCP server serializes tool results with pydantic_core and an indent of 2.
+    started = time.perf_counter()
+    for _ in range(rounds):
+        wire = pydantic_core.to_json(payload, indent=2)
+    elapsed = (time.perf_counter() - started) / rounds
+    return len(wire), len(json.dumps(payload, separators=(",", ":"))), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Response size for a listing of synthetic files by profile and layout")
+    parser.add_argument("--files", type=int, default=10_000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    files = synthetic_files(args.files)
+    cases = [("wide mask (old default)", WIDE_FIELDS, "records")]
+    for profile in ("full", "standard", "minimal"):
+        for layout in ("records", "columns"):
+            cases.append((f"{profile} / {layout}", FIELD_PROFILES[profile], layout))
+
+    baseline = None
+    print(f"{args.files} files")
+    print(f"{'case':<26}{'wire bytes':>13}{'compact bytes':>15}{'vs old':>9}{'serialize ms':>14}")
+    for label, fields, layout in cases:
+        source = files if fields is WIDE_FIELDS else [
+            {**f, "owners": [{"displayName": o["displayName"], "emailAddress": o["emailAddress"]} for o in f["owners"]]}
+            for f in files
+        ]
+        payload = success_response({"files": shape_items(format_files(source, fields), layout, fields),
+                                    "totalFiles": len(files)})
+        wire, compact, elapsed = measure(payload, args.rounds)
+        baseline = baseline or wire
+        print(f"{label:<26}{wire:>13,}{compact:>15,}{1 - wire / baseline:>9.1%}{elapsed * 1000:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
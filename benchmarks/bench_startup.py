@@ -0,0 +1,76 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs main.py with every non-loopback connect() refused, so any network access during startup fails loudly.
+OFFLINE_LAUNCHER = """
+import ipaddress, runpy, socket, sys
+_connect = socket.socket.connect
+def _offline_connect(self, address):
+    host = address[0] if isinstance(address, tuple) else None
+    if host is not None:
+        try:
+            if not ipaddress.ip_address(host).is_loopback:
+                raise OSError("network access disabled by benchmark")
+        except ValueError:
+            raise OSError("network access disabled by benchmark")
+    return _connect(self, address)
+socket.socket.connect = _offline_connect
+sys.argv = ["main.py"]
+runpy.run_path("main.py", run_name="__main__")
+"""
+
+MESSAGES = [
+    {"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {
+        "protocolVersion": "2024-11-05", "capabilities": {},
+        "clientInfo": {"name": "bench", "version": "0"}
+    }},
+    {"jsonrpc": "2.0", "method": "notifications/initialized"},
+    {"jsonrpc": "2.0", "id": 2, "method": "tools/list"},
+]
+
+
+def measure_once(state_dir: str) -> float:
+    env = dict(os.environ, GDRIVE_STATE_DIR=state_dir, PYTHONDONTWRITEBYTECODE="1")
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-c", OFFLINE_LAUNCHER], cwd=ROOT, env=env,
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    try:
+        for message in MESSAGES:
+            process.stdin.write(json.dumps(message) + "\n")
+        process.stdin.flush()
+        for line in process.stdout:
+            response = json.loads(line)
+            if response.get("id") == 2:
+                elapsed = time.perf_counter() - start
+                if "error" in response:
+                    raise RuntimeError(f"tools/list failed: {response['error']}")
+                return elapsed
+        raise RuntimeError("Server exited before answering tools/list")
+    finally:
+        process.kill()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start to first tools/list response with network access disabled")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        timings = [measure_once(state_dir) for _ in range(args.runs)]
+    print(f"runs={args.runs}  median={statistics.median(timings) * 1000:.0f}ms  "
+          f"min={min(timings) * 1000:.0f}ms  max={max(timings) * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import ssl
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("GDRIVE_STATE_DIR", tempfile.mkdtemp(prefix="gdrive-bench-"))
+os.environ.setdefault("GDRIVE_QPS_LIMIT", "0")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import h2.config
+import h2.connection
+import h2.events
+import h2.settings
+import httplib2
+from googleapiclient.discovery import build_from_document
+from googleapiclient.http import build_http
+
+from auth import load_discovery_document
+from fake_drive import FakeDrive
+from main import GoogleDriveMCP
+from utils.http_transport import HttpxHttp, HttpxTransport
+
+H2_PREFACE = b"PRI * HTTP/2.0\r\n\r\nSM\r\n\r\n"
+
+
+class Counter:
+    # Same interface as a multiprocessing.Value, for a stub in this process.
+    value = 0
+
+
+class StubServer:
+    # Serves a FakeDrive over real sockets, as HTTP/1.1 with keep-alive or as cleartext HTTP/2
+    # (prior knowledge), picked per connection from its first bytes. Requests run on a thread
+    # pool so the fake's latency overlaps the way a real server's would.
+
+    def __init__(self, drive: FakeDrive, threads: int = 256, connections=None):
+        self.drive = drive
+        self.handlers = ThreadPoolExecutor(threads)
+        # Connections accepted per protocol; shared counters when the stub runs in another process.
+        self.connections = connections or {"HTTP/1.1": Counter(), "HTTP/2": Counter()}
+        self.loop = asyncio.new_event_loop()
+        self.server = None
+        self.scheme = "http"
+
+    def start(self, cert_file: str = None) -> str:
+        context = None
+        if cert_file:
+            context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            context.load_cert_chain(cert_file)
+            context.set_alpn_protocols(["h2", "http/1.1"])
+        threading.Thread(target=self.loop.run_forever, daemon=True).start()
+        self.server = asyncio.run_coroutine_threadsafe(
+            self.loop.create_server(lambda: StubProtocol(self), "127.0.0.1", 0, ssl=context), self.loop).result()
+        port = self.server.sockets[0].getsockname()[1]
+        self.scheme = "https" if cert_file else "http"
+        return f"https://localhost:{port}/" if cert_file else f"http://127.0.0.1:{port}/"
+
+    def stop(self) -> None:
+        self.loop.call_soon_threadsafe(self.server.close)
+        self.handlers.shutdown(wait=False)
+
+    async def handle(self, method, uri, body, headers):
+        headers["x-fake-scheme"] = self.scheme
+        response, content = await self.loop.run_in_executor(self.handlers, self.drive.handle, uri, method, body, headers)
+        return response.status, {k: v for k, v in response.items() if k != "status"}, content
+
+
+class StubProtocol(asyncio.Protocol):
+
+    def __init__(self, stub: StubServer):
+        self.stub = stub
+        self.buffer = b""
+        self.h2 = None
+        self.http1 = False
+        self.http1_busy = False
+        self.streams = {}
+        self.window_open = asyncio.Event()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        if self.h2 is not None:
+            return self._h2_received(data)
+        self.buffer += data
+        if not self.http1:
+            if len(self.buffer) < len(H2_PREFACE) and H2_PREFACE.startswith(self.buffer):
+                return
+            if self.buffer.startswith(H2_PREFACE):
+                self.stub.connections["HTTP/2"].value += 1
+                self.h2 = h2.connection.H2Connection(h2.config.H2Configuration(client_side=False,
+                                                                               header_encoding="utf-8"))
+                self.h2.initiate_connection()
+                self.h2.increment_flow_control_window(2 ** 30)
+                self.h2.update_settings({h2.settings.SettingCodes.INITIAL_WINDOW_SIZE: 2 ** 30})
+                data, self.buffer = self.buffer, b""
+                return self._h2_received(data)
+            self.http1 = True
+            self.stub.connections["HTTP/1.1"].value += 1
+        self._http1_next()
+
+    # --- HTTP/1.1 ---
+
+    def _http1_next(self):
+        if self.http1_busy or b"\r\n\r\n" not in self.buffer:
+            return
+        head, _, rest = self.buffer.partition(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        method, target, _ = lines[0].split(" ", 2)
+        headers = dict(line.split(": ", 1) for line in lines[1:] if ": " in line)
+        length = int({k.lower(): v for k, v in headers.items()}.get("content-length", 0))
+        if len(rest) < length:
+            return
+        self.buffer = rest[length:]
+        self.http1_busy = True
+        asyncio.ensure_future(self._http1_respond(method, target, rest[:length] or None, headers))
+
+    async def _http1_respond(self, method, target, body, headers):
+        headers = {k.lower(): v for k, v in headers.items()}
+        status, response_headers, content = await self.stub.handle(method, self._url(target), body, headers)
+        response_headers["content-length"] = str(len(content))
+        head = f"HTTP/1.1 {status} OK\r\n" + "".join(f"{k}: {v}\r\n" for k, v in response_headers.items())
+        self.transport.write(head.encode() + b"\r\n" + content)
+        self.http1_busy = False
+        self._http1_next()
+
+    # --- HTTP/2 ---
+
+    def _h2_received(self, data):
+        for event in self.h2.receive_data(data):
+            if isinstance(event, h2.events.RequestReceived):
+                self.streams[event.stream_id] = {"headers": dict(event.headers), "body": b""}
+            elif isinstance(event, h2.events.DataReceived):
+                self.streams[event.stream_id]["body"] += event.data
+                self.h2.acknowledge_received_data(event.flow_controlled_length, event.stream_id)
+            elif isinstance(event, h2.events.StreamEnded):
+                asyncio.ensure_future(self._h2_respond(event.stream_id, self.streams.pop(event.stream_id)))
+            elif isinstance(event, h2.events.WindowUpdated):
+                self.window_open.set()
+        self.transport.write(self.h2.data_to_send())
+
+    async def _h2_respond(self, stream_id, request):
+        headers = request["headers"]
+        status, response_headers, content = await self.stub.handle(
+            headers[":method"], self._url(headers[":path"]), request["body"] or None,
+            {"host": headers[":authority"], **{k: v for k, v in headers.items() if not k.startswith(":")}})
+        response_headers["content-length"] = str(len(content))
+        self.h2.send_headers(stream_id, [(":status", str(status))] + list(response_headers.items()),
+                             end_stream=not content)
+        while content:
+            window = min(self.h2.local_flow_control_window(stream_id), self.h2.max_outbound_frame_size)
+            if window <= 0:
+                self.transport.write(self.h2.data_to_send())
+                self.window_open.clear()
+                await self.window_open.wait()
+                continue
+            chunk, content = content[:window], content[window:]
+            self.h2.send_data(stream_id, chunk, end_stream=not content)
+        self.transport.write(self.h2.data_to_send())
+
+    @staticmethod
+    def _url(target):
+        return f"http://stub{target}"
+
+
+def serve(pipe, connections, latency: float, download_size: int, cert_file: str):
+    # Runs in its own process, so the stub's work does not compete with the client for the GIL.
+    drive = FakeDrive(latency=latency, seed=9)
+    folder = drive.add_folder("bench")
+    files = [drive.add_file(f"file {i}.txt", folder, content=b"x" * 512) for i in range(50)]
+    blob = drive.add_file("blob.bin", folder, content=os.urandom(download_size))
+    stub = StubServer(drive, connections=connections)
+    pipe.send((stub.start(cert_file), folder, files, blob))
+    pipe.recv()
+    stub.stop()
+
+
+def self_signed_cert(directory: str) -> str:
+    # A localhost certificate for --tls; returns the PEM file holding both the key and the cert.
+    import datetime
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.datetime.now(datetime.timezone.utc)
+    cert = (x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(key.public_key())
+            .serial_number(x509.random_serial_number()).not_valid_before(now)
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .add_extension(x509.SubjectAlternativeName([x509.DNSName("localhost")]), critical=False)
+            .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+            .sign(key, hashes.SHA256()))
+    path = os.path.join(directory, "stub.pem")
+    with open(path, "wb") as f:
+        f.write(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                  serialization.NoEncryption()))
+        f.write(cert.public_bytes(serialization.Encoding.PEM))
+    return path
+
+
+def factory(kind: str, endpoint: str, transport: HttpxTransport = None, ca_file: str = None):
+    # A service factory for the server: one httplib2.Http per worker thread, as the server uses
+    # by default, or a handle on the one shared httpx client.
+    # Pointing rootUrl at the stub moves uploads and batch requests there too; api_endpoint does not.
+    document = {**load_discovery_document(), "rootUrl": endpoint}
+
+    def build():
+        if kind == "httpx":
+            http = HttpxHttp(transport)
+        elif ca_file:
+            http = httplib2.Http(ca_certs=ca_file, timeout=60)
+            http.redirect_codes = http.redirect_codes - {308}
+        else:
+            http = build_http()
+        return build_from_document(document, http=http)
+    return build
+
+
+async def timed(agent, tool, arguments):
+    started = time.perf_counter()
+    result = await agent.mcp.call_tool(tool, arguments)
+    content = result[0] if isinstance(result, tuple) else result
+    assert '"status": "success"' in content[0].text, content[0].text[:300]
+    return time.perf_counter() - started
+
+
+async def run_load(agent, tool, arguments, calls):
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(timed(agent, tool, arguments(i)) for i in range(calls)))
+    return time.perf_counter() - started, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="httplib2 versus the shared httpx HTTP/2 transport against a local stub")
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--workers", type=int, nargs="+", default=[8, 32])
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated server time per request in seconds")
+    parser.add_argument("--download-size", type=int, default=1024 * 1024)
+    parser.add_argument("--tls", action="store_true",
+                        help="serve HTTPS and negotiate HTTP/2 with ALPN, as Drive does (needs cryptography)")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="gdrive-bench-")
+    ca_file = self_signed_cert(tmp) if args.tls else None
+    context = multiprocessing.get_context("spawn")
+    connections = {"HTTP/1.1": context.Value("i", 0), "HTTP/2": context.Value("i", 0)}
+    pipe, child_pipe = context.Pipe()
+    stub = context.Process(target=serve, args=(child_pipe, connections, args.latency, args.download_size, ca_file),
+                           daemon=True)
+    stub.start()
+    endpoint, folder, files, blob = pipe.recv()
+
+    def opened():
+        return sum(counter.value for counter in connections.values())
+
+    workloads = [
+        ("get_file_metadata", lambda i: {"file_id": files[i % len(files)], "fields": f"id, name, size, f{i}"}),
+        ("list_files", lambda i: {"page_size": 20}),
+        ("upload_file_in_parent", lambda i: {"content": "x" * 65536, "name": f"upload {i}.txt",
+                                             "mime_type": "text/plain", "parent_folder_id": folder}),
+        ("download_file", lambda i: {"file_id": blob, "local_path": os.path.join(tmp, f"{i % 8}.bin")}),
+    ]
+    print(f"{'https' if args.tls else 'cleartext'}, server time {args.latency * 1000:.0f}ms, {args.calls} concurrent "
+          f"calls per row (download_file: {args.calls // 10} of {args.download_size // 1024}KiB)")
+    print(f"{'tool':<22}{'workers':>8}{'transport':>11}{'cold ms':>9}{'calls/s':>10}{'p50 ms':>9}{'p99 ms':>9}"
+          f"{'sockets':>9}")
+    for workers in args.workers:
+        for kind in ("httplib2", "httpx"):
+            transport = None
+            if kind == "httpx":
+                # Cleartext HTTP/2 needs prior knowledge; over TLS it is negotiated like with Drive.
+                transport = HttpxTransport(http2=True, http1=bool(ca_file),
+                                           verify=ssl.create_default_context(cafile=ca_file) if ca_file else True)
+            before = opened()
+            agent = GoogleDriveMCP(service_factory=factory(kind, endpoint, transport, ca_file), max_workers=workers)
+            # FastMCP sets up logging when a server is created.
+            logging.getLogger().setLevel(logging.WARNING)
+            agent.cache.max_entries = 0
+            for tool, arguments in workloads:
+                calls = args.calls // 10 if tool == "download_file" else args.calls
+                # The first batch opens the connections; it is reported separately as "cold".
+                cold, _ = asyncio.run(run_load(agent, tool, arguments, workers))
+                wall, latencies = asyncio.run(run_load(agent, tool, arguments, calls))
+                latencies.sort()
+                print(f"{tool:<22}{workers:>8}{kind:>11}{cold * 1000:>9.1f}{calls / wall:>10.1f}"
+                      f"{statistics.median(latencies) * 1000:>9.1f}{latencies[int(0.99 * (len(latencies) - 1))] * 1000:>9.1f}"
+                      f"{opened() - before:>9}")
+            agent.pool.shutdown()
+            if transport:
+                print(f"{'':<22}httpx responses by protocol: {transport.stats()['httpVersions']}")
+                transport.close()
+    pipe.send("stop")
+    stub.join(timeout=5)
+
+
+if __name__ == "__main__":
+    main()
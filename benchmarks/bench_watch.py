@@ -0,0 +1,115 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+os.environ.setdefault("GDRIVE_STATE_DIR", tempfile.mkdtemp(prefix="gdrive-bench-"))
+os.environ.setdefault("GDRIVE_QPS_LIMIT", "0")
+os.environ.setdefault("GDRIVE_WEBHOOK_PORT", "18765")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_drive import FakeDrive
+from config import WEBHOOK_PORT
+from utils.change_watcher import ChangeWatcher
+from utils.query_builder import build_query_string
+from utils.request_executor import execute
+
+
+def schedule(duration: float, bursts: int, seed: int):
+    # Offsets at which a file lands in the folder: a few bursts of 1-3 files with quiet stretches
+    # between them, the way an inbox folder is usually written to.
+    rng = random.Random(seed)
+    times = []
+    for start in sorted(rng.uniform(0.05, 0.9) * duration for _ in range(bursts)):
+        times.extend(start + i * 0.2 for i in range(rng.randint(1, 3)))
+    return times
+
+
+def writer(drive, folder_id, times, created):
+    started = time.perf_counter()
+    for i, offset in enumerate(times):
+        time.sleep(max(0.0, started + offset - time.perf_counter()))
+        file_id = drive.add_file(f"incoming {i}.txt", folder_id, content=b"x")
+        created[file_id] = time.perf_counter()
+
+
+def search_polling(drive, folder_id, times, duration, interval):
+    # What an agent does today: search_files with modified_after on a fixed interval.
+    service, created, seen = drive.service(), {}, {}
+    thread = threading.Thread(target=writer, args=(drive, folder_id, times, created))
+    requests = drive.request_count
+    since = datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+    started = time.perf_counter()
+    thread.start()
+    # Keeps going past the duration until every file is seen, so late files still count.
+    while time.perf_counter() - started < duration or (len(seen) < len(times) and
+                                                       time.perf_counter() - started < duration + 2 * interval):
+        query = build_query_string(parent_folder_id=folder_id, modified_after=since, trashed=False)
+        for file in execute(service.files().list(q=query, pageSize=100, fields="files(id)")).get("files", []):
+            seen.setdefault(file["id"], time.perf_counter())
+        time.sleep(interval)
+    thread.join()
+    return drive.request_count - requests, [seen[i] - created[i] for i in created if i in seen], len(created)
+
+
+def watched(drive, folder_id, times, duration, webhook_url, min_interval, max_interval):
+    service, created, seen = drive.service(), {}, {}
+    watcher = ChangeWatcher(service, webhook_url=webhook_url, min_interval=min_interval, max_interval=max_interval)
+    requests = drive.request_count
+    subscription = watcher.subscribe(folder_id)
+    thread = threading.Thread(target=writer, args=(drive, folder_id, times, created))
+    started = time.perf_counter()
+    thread.start()
+    while time.perf_counter() - started < duration or (len(seen) < len(times) and
+                                                       time.perf_counter() - started < duration + max_interval):
+        for event in subscription.since(0)["events"]:
+            seen.setdefault(event["fileId"], time.perf_counter())
+        time.sleep(0.005)
+    thread.join()
+    mode = watcher.mode
+    watcher.close()
+    return drive.request_count - requests, [seen[i] - created[i] for i in created if i in seen], len(created), mode
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Noticing new files: repeated searches versus the change watcher")
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds per run")
+    parser.add_argument("--bursts", type=int, default=4)
+    parser.add_argument("--interval", type=float, default=2.0, help="search polling interval in seconds")
+    parser.add_argument("--min-interval", type=float, default=1.0)
+    parser.add_argument("--max-interval", type=float, default=16.0)
+    parser.add_argument("--latency", type=float, default=0.02, help="simulated Drive round trip in seconds")
+    args = parser.parse_args()
+
+    drive = FakeDrive(latency=args.latency, seed=5)
+    folder_id = drive.add_folder("inbox")
+    for i in range(200):
+        drive.add_file(f"existing {i}.txt", folder_id)
+    times = schedule(args.duration, args.bursts, seed=11)
+
+    print(f"{len(times)} files in {args.bursts} bursts over {args.duration:.0f}s, round trip {args.latency * 1000:.0f}ms")
+    print(f"{'approach':<34}{'requests':>9}{'seen':>7}{'p50 ms':>9}{'max ms':>9}")
+
+    def report(label, requests, delays, total):
+        p50 = statistics.median(delays) * 1000 if delays else float("nan")
+        worst = max(delays) * 1000 if delays else float("nan")
+        print(f"{label:<34}{requests:>9}{f'{len(delays)}/{total}':>7}{p50:>9.0f}{worst:>9.0f}")
+
+    report(f"search every {args.interval:g}s", *search_polling(drive, folder_id, times, args.duration, args.interval))
+    requests, delays, total, _ = watched(drive, folder_id, times, args.duration, None,
+                                         args.min_interval, args.max_interval)
+    report(f"changes poller {args.min_interval:g}-{args.max_interval:g}s", requests, delays, total)
+    requests, delays, total, mode = watched(drive, folder_id, times, args.duration,
+                                            f"http://127.0.0.1:{WEBHOOK_PORT}/", args.min_interval, args.max_interval)
+    report(f"webhook channel ({mode})", requests, delays, total)
+
+
+if __name__ == "__main__":
+    main()
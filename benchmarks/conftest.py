@@ -0,0 +1,45 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Configuration is read at import time, so it has to be in place before the server modules load.
+STATE_DIR = tempfile.mkdtemp(prefix="gdrive-bench-")
+os.environ.setdefault("GDRIVE_STATE_DIR", STATE_DIR)
+os.environ.setdefault("GDRIVE_INDEX_PATH", os.path.join(STATE_DIR, "index.sqlite"))
+os.environ.setdefault("GDRIVE_QPS_LIMIT", "0")
+os.environ.setdefault("GDRIVE_RETRY_BASE_DELAY", "0.01")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("gdrive", "fake Drive used by the benchmarks")
+    group.addoption("--drive-latency", type=float, default=0.005, help="simulated Drive round trip in seconds")
+    group.addoption("--drive-workers", type=int, default=8, help="tool worker threads, and calls per concurrent round")
+    group.addoption("--drive-error-rate", type=float, default=0.0,
+                    help="fraction of requests failing with 429 or 500")
+    group.addoption("--drive-download-size", type=int, default=1024 * 1024)
+    group.addoption("--drive-seed", type=int, default=0)
+
+
+LATENCY_ROWS = pytest.StashKey[list]()
+
+
+@pytest.fixture
+def latency_report(request):
+    # Rows of per-call latency for the summary below; pytest-benchmark's own table only times rounds.
+    return request.config.stash.setdefault(LATENCY_ROWS, [])
+
+
+def pytest_terminal_summary(terminalreporter, config):
+    rows = config.stash.get(LATENCY_ROWS, [])
+    if not rows:
+        return
+    terminalreporter.write_sep("-", "per-call latency")
+    terminalreporter.write_line(f"{'test':<56}{'calls':>7}{'ops/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for row in rows:
+        terminalreporter.write_line(f"{row['name']:<56}{row['calls']:>7}{row['opsPerSecond']:>10.1f}"
+                                    f"{row['p50Ms']:>10.2f}{row['p99Ms']:>10.2f}{row['errors']:>8}")
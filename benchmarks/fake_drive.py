@@ -0,0 +1,691 @@
+import email.parser
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import urllib.request
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Union
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import httplib2
+from googleapiclient.discovery import build_from_document
+
+from auth import load_discovery_document
+from utils.response_handler import split_fields
+
+# An in-memory Drive v3 backend behind an httplib2-compatible transport. Services built by
+# FakeDrive.service() are real googleapiclient services, so batch requests, resumable uploads,
+# ranged downloads and retries go through the same client code as against Google.
+
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+WORKSPACE_PREFIX = "application/vnd.google-apps."
+ROLE_RANK = {"reader": 1, "commenter": 2, "writer": 3, "fileOrganizer": 4, "organizer": 5, "owner": 6}
+ERROR_REASONS = {
+    400: ("global", "invalid", "Invalid Value"),
+    403: ("global", "forbidden", "Forbidden"),
+    404: ("global", "notFound", "File not found"),
+    416: ("global", "requestedRangeNotSatisfiable", "Requested range not satisfiable"),
+    429: ("usageLimits", "rateLimitExceeded", "Rate Limit Exceeded"),
+    500: ("global", "backendError", "Backend Error"),
+    503: ("global", "backendError", "Service Unavailable")
+}
+
+
+class DriveError(Exception):
+
+    def __init__(self, status: int, message: Optional[str] = None, reason: Optional[str] = None,
+                 headers: Optional[Dict[str, str]] = None):
+        domain, default_reason, default = ERROR_REASONS.get(status, ("global", "error", "Error"))
+        super().__init__(message or default)
+        self.status = status
+        self.headers = headers or {}
+        self.body = {"error": {"code": status, "message": message or default,
+                               "errors": [{"domain": domain, "reason": reason or default_reason,
+                                           "message": message or default}]}}
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def _select(value: Any, fields: Optional[str]) -> Any:
+    # Applies a partial-response field mask such as "nextPageToken, files(id, owners(emailAddress))".
+    if not fields or fields.strip() == "*":
+        return value
+    if isinstance(value, list):
+        return [_select(item, fields) for item in value]
+    if not isinstance(value, dict):
+        return value
+    selected = {}
+    for field in split_fields(fields):
+        key, _, nested = field.partition("(")
+        key = key.strip().split("/", 1)[0]
+        if key in value:
+            selected[key] = _select(value[key], nested[:-1] if nested else None)
+    return selected
+
+
+class QueryError(ValueError):
+    pass
+
+
+class Query:
+    # Evaluates the Drive search language: comparisons on name, mimeType, fullText, modifiedTime,
+    # createdTime, starred and trashed; 'x' in parents/owners/readers/writers; sharedWithMe;
+    # properties has { key='k' and value='v' }; combined with and, or, not and parentheses.
+    TOKEN = re.compile(r"\s*(?:('(?:\\.|[^'\\])*')|(!=|<=|>=|=|<|>)|([(){}])|([A-Za-z_][A-Za-z0-9_.]*))")
+
+    def __init__(self, text: str):
+        self.tokens = self._tokenize(text)
+        self.pos = 0
+        self.predicate = self._or() if self.tokens else (lambda drive, file: True)
+        if self.pos != len(self.tokens):
+            raise QueryError(f"Unexpected token in query: {self.tokens[self.pos][1]}")
+
+    def matches(self, drive: "FakeDrive", file: Dict[str, Any]) -> bool:
+        return self.predicate(drive, file)
+
+    def _tokenize(self, text):
+        tokens, pos = [], 0
+        while pos < len(text):
+            if text[pos:].strip() == "":
+                break
+            match = self.TOKEN.match(text, pos)
+            if not match:
+                raise QueryError(f"Invalid query near: {text[pos:pos + 20]}")
+            string, op, punct, word = match.groups()
+            if string is not None:
+                tokens.append(("string", re.sub(r"\\(.)", r"\1", string[1:-1])))
+            elif op is not None:
+                tokens.append(("op", op))
+            elif punct is not None:
+                tokens.append(("punct", punct))
+            else:
+                tokens.append(("word", word))
+            pos = match.end()
+        return tokens
+
+    def _peek(self, kind=None, value=None):
+        if self.pos >= len(self.tokens):
+            return None
+        token = self.tokens[self.pos]
+        if (kind and token[0] != kind) or (value and token[1] != value):
+            return None
+        return token
+
+    def _take(self, kind=None, value=None):
+        token = self._peek(kind, value)
+        if token is None:
+            found = self.tokens[self.pos][1] if self.pos < len(self.tokens) else "end of query"
+            raise QueryError(f"Expected {value or kind} but found {found}")
+        self.pos += 1
+        return token[1]
+
+    def _or(self):
+        terms = [self._and()]
+        while self._peek("word", "or"):
+            self.pos += 1
+            terms.append(self._and())
+        return terms[0] if len(terms) == 1 else (lambda d, f: any(t(d, f) for t in terms))
+
+    def _and(self):
+        terms = [self._not()]
+        while self._peek("word", "and"):
+            self.pos += 1
+            terms.append(self._not())
+        return terms[0] if len(terms) == 1 else (lambda d, f: all(t(d, f) for t in terms))
+
+    def _not(self):
+        if self._peek("word", "not"):
+            self.pos += 1
+            term = self._not()
+            return lambda d, f: not term(d, f)
+        if self._peek("punct", "("):
+            self.pos += 1
+            term = self._or()
+            self._take("punct", ")")
+            return term
+        return self._comparison()
+
+    def _value(self):
+        token = self._take()
+        if token in ("true", "false"):
+            return token == "true"
+        return token
+
+    def _comparison(self):
+        if self._peek("string"):
+            value = self._take("string")
+            self._take("word", "in")
+            collection = self._take("word")
+            if collection == "parents":
+                return lambda d, f: value in f.get("parents", [])
+            if collection == "owners":
+                return lambda d, f: any(o["emailAddress"] == value for o in f.get("owners", []))
+            if collection in ("readers", "writers"):
+                minimum = ROLE_RANK["reader" if collection == "readers" else "writer"]
+                return lambda d, f: any(p.get("emailAddress") == value and ROLE_RANK[p["role"]] >= minimum
+                                        for p in d.effective_permissions(f["id"]))
+            raise QueryError(f"Unsupported collection: {collection}")
+        field = self._take("word")
+        if field == "sharedWithMe":
+            return lambda d, f: all(o["emailAddress"] != d.user_email for o in f.get("owners", []))
+        if self._peek("word", "contains"):
+            self.pos += 1
+            needle = self._take("string").lower()
+            if field == "fullText":
+                return lambda d, f: needle in f.get("name", "").lower() or needle in d.text(f["id"]).lower()
+            if field == "name":
+                # Drive only matches name terms by prefix.
+                return lambda d, f: f.get("name", "").lower().startswith(needle)
+            raise QueryError(f"Unsupported field for contains: {field}")
+        if self._peek("word", "has"):
+            self.pos += 1
+            self._take("punct", "{")
+            pairs = {}
+            for i in range(2):
+                if i:
+                    self._take("word", "and")
+                name = self._take("word")
+                self._take("op", "=")
+                pairs[name] = self._take("string")
+            self._take("punct", "}")
+            return lambda d, f: f.get(field, {}).get(pairs.get("key")) == pairs.get("value")
+        op = self._take("op")
+        value = self._value()
+        if field in ("modifiedTime", "createdTime", "viewedByMeTime"):
+            value = str(value)
+        compare = {
+            "=": lambda a, b: a == b, "!=": lambda a, b: a != b, "<": lambda a, b: a < b,
+            ">": lambda a, b: a > b, "<=": lambda a, b: a <= b, ">=": lambda a, b: a >= b
+        }[op]
+        default = False if field in ("starred", "trashed") else ""
+        return lambda d, f: compare(f.get(field, default), value)
+
+
+class FakeDrive:
+
+    def __init__(self, latency: Union[float, Callable[[str, str], float]] = 0.0,
+                 error_rates: Optional[Dict[int, float]] = None, seed: int = 0,
+                 user_email: str = "me@example.com", page_size_limit: int = 1000):
+        # latency: seconds per HTTP round trip, or a callable (method, path, query params) -> seconds.
+        # error_rates: {status: probability} applied to every request and every batch item.
+        self.latency = latency
+        self.error_rates = dict(error_rates or {})
+        self.user_email = user_email
+        self.page_size_limit = page_size_limit
+        self._rng = random.Random(seed)
+        self._lock = threading.RLock()
+        self._forced_errors: List[Dict[str, Any]] = []
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.content: Dict[str, bytes] = {}
+        self.permissions: Dict[str, List[Dict[str, Any]]] = {}
+        self.changes: List[Dict[str, Any]] = []
+        self.uploads: Dict[str, Dict[str, Any]] = {}
+        self.channels: Dict[str, Dict[str, Any]] = {}
+        self.request_count = 0
+        self.owner = {"kind": "drive#user", "displayName": user_email.split("@")[0], "me": True,
+                      "emailAddress": user_email, "permissionId": self._new_id(20)}
+        self.root_id = self._new_id()
+        self.files[self.root_id] = self._resource(self.root_id, "My Drive", FOLDER_MIME_TYPE, [])
+        self.permissions[self.root_id] = [self._owner_permission()]
+
+    # --- test and benchmark helpers ---
+
+    def service(self):
+        # Suitable as GoogleDriveMCP(service_factory=drive.service): each call gets its own transport.
+        return build_from_document(load_discovery_document(), http=FakeHttp(self))
+
+    def fail_next(self, status: int, count: int = 1, match: Optional[str] = None, reason: Optional[str] = None,
+                  headers: Optional[Dict[str, str]] = None) -> None:
+        # The next `count` requests whose "METHOD path" contains `match` fail with `status`, and with
+        # `reason` in the error body (such as userRateLimitExceeded on a 403) and `headers` if given.
+        with self._lock:
+            self._forced_errors.append({"status": status, "count": count, "match": match, "reason": reason,
+                                        "headers": headers})
+
+    def add_file(self, name: str, parent_id: Optional[str] = None, mime_type: str = "text/plain",
+                 content: bytes = b"", **fields) -> str:
+        with self._lock:
+            return self._create({"name": name, "mimeType": mime_type, "parents": [parent_id or self.root_id], **fields},
+                                content)["id"]
+
+    def add_folder(self, name: str, parent_id: Optional[str] = None) -> str:
+        return self.add_file(name, parent_id, FOLDER_MIME_TYPE)
+
+    def add_tree(self, parent_id: Optional[str] = None, depth: int = 2, folders_per_level: int = 3,
+                 files_per_folder: int = 10, file_size: int = 1024, prefix: str = "item") -> str:
+        # Builds a folder tree under parent_id and returns the id of its top folder.
+        top = self.add_folder(f"{prefix} tree", parent_id)
+
+        def fill(folder_id, level, path):
+            for i in range(files_per_folder):
+                body = (f"{path} file {i} " * (file_size // 16 + 1)).encode()[:file_size]
+                self.add_file(f"{prefix} {path}-{i}.txt", folder_id, content=body)
+            if level < depth:
+                for i in range(folders_per_level):
+                    fill(self.add_folder(f"{prefix} folder {path}-{i}", folder_id), level + 1, f"{path}-{i}")
+        fill(top, 0, "0")
+        return top
+
+    def text(self, file_id: str) -> str:
+        return self.content.get(file_id, b"").decode("utf-8", "ignore")
+
+    def effective_permissions(self, file_id: str) -> List[Dict[str, Any]]:
+        # Explicit permissions plus those inherited from every ancestor, one per principal at its highest role.
+        best: Dict[Any, Dict[str, Any]] = {}
+        pending, seen = [file_id], set()
+        while pending:
+            current = pending.pop()
+            if current in seen or current not in self.files:
+                continue
+            seen.add(current)
+            for permission in self.permissions.get(current, []):
+                key = (permission["type"], permission.get("emailAddress") or permission.get("domain"))
+                if key not in best or ROLE_RANK[permission["role"]] > ROLE_RANK[best[key]["role"]]:
+                    best[key] = permission
+            pending.extend(self.files[current].get("parents", []))
+        return [dict(p) for p in best.values()]
+
+    # --- transport entry point ---
+
+    def handle(self, uri: str, method: str, body: Any, headers: Dict[str, str]):
+        parts = urlsplit(uri)
+        params = {k: v[-1] for k, v in parse_qs(parts.query, keep_blank_values=True).items()}
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        self._sleep(method, parts.path, params)
+        with self._lock:
+            self.request_count += 1
+        if parts.path.endswith("/batch/drive/v3"):
+            return self._batch(body, headers)
+        return self._respond(method, parts.path, params, headers, body)
+
+    def _respond(self, method, path, params, headers, body):
+        try:
+            self._maybe_fail(method, path)
+            with self._lock:
+                status, payload, extra = self._route(method, path, params, headers, body)
+        except DriveError as e:
+            status, payload, extra = e.status, e.body, dict(e.headers)
+        if isinstance(payload, (bytes, bytearray)):
+            content, content_type = bytes(payload), extra.pop("content-type", "application/octet-stream")
+        elif payload is None:
+            content, content_type = b"", "text/plain"
+        else:
+            content, content_type = json.dumps(payload).encode(), "application/json; charset=UTF-8"
+        response_headers = {"status": str(status), "content-type": content_type,
+                            "content-length": str(len(content)), **extra}
+        return httplib2.Response(response_headers), content
+
+    def _sleep(self, method, path, params):
+        delay = self.latency(method, path, params) if callable(self.latency) else self.latency
+        if delay:
+            time.sleep(delay)
+
+    def _maybe_fail(self, method, path):
+        target = f"{method} {path}"
+        with self._lock:
+            for forced in self._forced_errors:
+                if forced["match"] is None or forced["match"] in target:
+                    forced["count"] -= 1
+                    if forced["count"] <= 0:
+                        self._forced_errors.remove(forced)
+                    raise DriveError(forced["status"], reason=forced["reason"], headers=forced["headers"])
+            for status, rate in self.error_rates.items():
+                if self._rng.random() < rate:
+                    raise DriveError(status)
+
+    # --- batch ---
+
+    def _batch(self, body, headers):
+        if isinstance(body, bytes):
+            body = body.decode()
+        message = email.parser.Parser().parsestr(f"content-type: {headers['content-type']}\r\n\r\n{body}")
+        parts = []
+        for part in message.get_payload():
+            request_line, _, rest = part.get_payload().partition("\n")
+            method, target, _ = request_line.split(" ", 2)
+            inner = email.parser.Parser().parsestr(rest)
+            inner_body = inner.get_payload() or None
+            target_parts = urlsplit(target)
+            params = {k: v[-1] for k, v in parse_qs(target_parts.query, keep_blank_values=True).items()}
+            inner_headers = {k.lower(): v for k, v in inner.items()}
+            response, content = self._respond(method, target_parts.path, params, inner_headers, inner_body)
+            content_id = part["Content-ID"]
+            parts.append(
+                f"--batch_fake\r\nContent-Type: application/http\r\nContent-ID: <response-{content_id[1:]}\r\n\r\n"
+                f"HTTP/1.1 {response.status} {'OK' if response.status < 300 else 'Error'}\r\n"
+                f"Content-Type: {response['content-type']}\r\n\r\n{content.decode()}\r\n"
+            )
+        content = ("".join(parts) + "--batch_fake--\r\n").encode()
+        return httplib2.Response({"status": "200", "content-type": "multipart/mixed; boundary=batch_fake"}), content
+
+    # --- routing ---
+
+    def _route(self, method, path, params, headers, body):
+        upload = path.startswith("/upload/drive/v3/")
+        path = path.split("/drive/v3/", 1)[1] if "/drive/v3/" in path else path
+        segments = [unquote(s) for s in path.strip("/").split("/")]
+        fields = params.get("fields")
+        if upload:
+            return self._upload(method, self._resolve(segments[1]) if len(segments) == 2 else None, params, headers, body)
+        if segments == ["files"]:
+            if method == "GET":
+                return 200, self._list(params), {}
+            if method == "POST":
+                return 200, _select(self._public(self._create(self._json(body))), fields), {}
+        if segments[:1] == ["files"] and len(segments) >= 2:
+            file_id = self._resolve(segments[1])
+            if len(segments) == 2:
+                if method == "GET" and params.get("alt") == "media":
+                    return self._media(file_id, headers)
+                if method == "GET":
+                    return 200, _select(self._public(self._get(file_id)), fields), {}
+                if method == "PATCH":
+                    return 200, _select(self._public(self._update(file_id, self._json(body), params)), fields), {}
+                if method == "DELETE":
+                    self._delete(file_id)
+                    return 204, None, {}
+            elif segments[2] == "copy" and method == "POST":
+                return 200, _select(self._public(self._copy(file_id, self._json(body))), fields), {}
+            elif segments[2] == "export" and method == "GET":
+                return self._export(file_id, params.get("mimeType", "application/pdf"))
+            elif segments[2] == "permissions":
+                self._get(file_id)
+                if len(segments) == 3 and method == "GET":
+                    return 200, _select({"kind": "drive#permissionList",
+                                         "permissions": self.effective_permissions(file_id)}, fields), {}
+                if len(segments) == 3 and method == "POST":
+                    return 200, _select(self._add_permission(file_id, self._json(body)), fields), {}
+                if len(segments) == 4 and method == "DELETE":
+                    self._remove_permission(file_id, segments[3])
+                    return 204, None, {}
+        if segments == ["changes", "startPageToken"]:
+            return 200, _select({"kind": "drive#startPageToken", "startPageToken": str(len(self.changes) + 1)}, fields), {}
+        if segments == ["changes"] and method == "GET":
+            return 200, self._list_changes(params), {}
+        if segments == ["changes", "watch"] and method == "POST":
+            return 200, self._watch(self._json(body), params), {}
+        if segments == ["channels", "stop"] and method == "POST":
+            self.channels.pop(self._json(body).get("id"), None)
+            return 204, None, {}
+        raise DriveError(404, f"Unsupported request: {method} {path}")
+
+    @staticmethod
+    def _json(body):
+        if not body:
+            return {}
+        return json.loads(body.decode() if isinstance(body, bytes) else body)
+
+    # --- files ---
+
+    def _new_id(self, length: int = 33) -> str:
+        alphabet = "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_-"
+        return "".join(self._rng.choice(alphabet) for _ in range(length))
+
+    def _owner_permission(self):
+        return {"kind": "drive#permission", "id": self.owner["permissionId"], "type": "user",
+                "role": "owner", "emailAddress": self.user_email, "displayName": self.owner["displayName"]}
+
+    def _resource(self, file_id, name, mime_type, parents, **fields):
+        now = _now()
+        return {"kind": "drive#file", "id": file_id, "name": name, "mimeType": mime_type, "parents": parents,
+                "createdTime": now, "modifiedTime": now, "owners": [dict(self.owner)], "starred": False,
+                "trashed": False, "version": "1", "webViewLink": f"https://drive.google.com/file/d/{file_id}/view",
+                **fields}
+
+    def _resolve(self, file_id):
+        return self.root_id if file_id == "root" else file_id
+
+    def _get(self, file_id):
+        file = self.files.get(file_id)
+        if file is None:
+            raise DriveError(404, f"File not found: {file_id}.")
+        return file
+
+    def _public(self, file):
+        resource = dict(file)
+        resource["permissions"] = self.effective_permissions(file["id"])
+        resource["permissionIds"] = [p["id"] for p in resource["permissions"]]
+        return resource
+
+    def _set_content(self, file, content):
+        self.content[file["id"]] = content
+        if not file["mimeType"].startswith(WORKSPACE_PREFIX):
+            file["size"] = str(len(content))
+            file["md5Checksum"] = hashlib.md5(content).hexdigest()
+
+    def _record_change(self, file_id, removed=False):
+        self.changes.append({"fileId": file_id, "removed": removed, "time": _now()})
+        for channel in list(self.channels.values()):
+            threading.Thread(target=self._post_notification, args=(channel, "change"), daemon=True).start()
+
+    def _post_notification(self, channel, state):
+        # What Drive sends to a web_hook channel: an empty POST described by X-Goog-* headers.
+        headers = {"X-Goog-Channel-ID": channel["id"], "X-Goog-Resource-ID": channel["resourceId"],
+                   "X-Goog-Resource-State": state, "X-Goog-Message-Number": str(len(self.changes))}
+        if channel.get("token"):
+            headers["X-Goog-Channel-Token"] = channel["token"]
+        try:
+            urllib.request.urlopen(urllib.request.Request(channel["address"], data=b"", headers=headers), timeout=5).close()
+        except OSError:
+            pass
+
+    def _create(self, body, content=b""):
+        parents = [self._resolve(p) for p in body.get("parents") or [self.root_id]]
+        for parent in parents:
+            self._get(parent)
+        file_id = self._new_id()
+        extra = {k: v for k, v in body.items() if k not in ("name", "mimeType", "parents", "id")}
+        file = self._resource(file_id, body.get("name", "Untitled"), body.get("mimeType", "application/octet-stream"),
+                              parents, **extra)
+        self.files[file_id] = file
+        self.permissions[file_id] = [self._owner_permission()]
+        self._set_content(file, content)
+        self._record_change(file_id)
+        return file
+
+    def _update(self, file_id, body, params):
+        file = self._get(file_id)
+        for key in ("name", "trashed", "starred", "description", "properties", "mimeType"):
+            if key in body:
+                file[key] = body[key]
+        removed = set(filter(None, params.get("removeParents", "").split(",")))
+        added = [self._resolve(p) for p in filter(None, params.get("addParents", "").split(","))]
+        for parent in added:
+            self._get(parent)
+        file["parents"] = [p for p in file.get("parents", []) if p not in removed] + \
+                          [p for p in added if p not in file.get("parents", [])]
+        file["modifiedTime"] = _now()
+        file["version"] = str(int(file["version"]) + 1)
+        self._record_change(file_id)
+        return file
+
+    def _copy(self, file_id, body):
+        source = self._get(file_id)
+        if source["mimeType"] == FOLDER_MIME_TYPE:
+            raise DriveError(403, "Folders cannot be copied.")
+        copy = {k: v for k, v in source.items() if k in ("mimeType", "description", "properties")}
+        copy.update({"name": f"Copy of {source['name']}", "parents": source.get("parents")})
+        copy.update(body)
+        return self._create(copy, self.content.get(file_id, b""))
+
+    def _delete(self, file_id):
+        self._get(file_id)
+        pending = [file_id]
+        while pending:
+            current = pending.pop()
+            if self.files.pop(current, None) is None:
+                continue
+            self.content.pop(current, None)
+            self.permissions.pop(current, None)
+            self._record_change(current, removed=True)
+            pending.extend(f["id"] for f in self.files.values() if current in f.get("parents", []))
+
+    def _list(self, params):
+        try:
+            query = Query(params.get("q", ""))
+        except QueryError as e:
+            raise DriveError(400, f"Invalid Value: {e}")
+        page_size = max(1, min(int(params.get("pageSize", 100)), self.page_size_limit))
+        offset = int(params.get("pageToken") or 0)
+        matches = [f for f in self.files.values() if f["id"] != self.root_id and query.matches(self, f)]
+        page = matches[offset:offset + page_size]
+        result = {"kind": "drive#fileList", "incompleteSearch": False, "files": [self._public(f) for f in page]}
+        if offset + page_size < len(matches):
+            result["nextPageToken"] = str(offset + page_size)
+        return _select(result, params.get("fields") or "kind, incompleteSearch, nextPageToken, files(kind, id, name, mimeType)")
+
+    # --- media ---
+
+    def _media(self, file_id, headers):
+        file = self._get(file_id)
+        if file["mimeType"].startswith(WORKSPACE_PREFIX):
+            raise DriveError(403, "Only files with binary content can be downloaded. Use Export with Docs Editors files.")
+        return self._ranged(self.content.get(file_id, b""), headers, file["mimeType"])
+
+    def _export(self, file_id, mime_type):
+        file = self._get(file_id)
+        if not file["mimeType"].startswith(WORKSPACE_PREFIX) or file["mimeType"] == FOLDER_MIME_TYPE:
+            raise DriveError(403, "Export only supports Docs Editors files.")
+        content = self.content.get(file_id) or f"{file['name']}\n".encode()
+        return 200, content, {"content-type": mime_type}
+
+    @staticmethod
+    def _ranged(content, headers, content_type):
+        match = re.match(r"bytes=(\d+)-(\d*)", headers.get("range", ""))
+        if not match:
+            return 200, content, {"content-type": content_type}
+        start = int(match.group(1))
+        end = min(int(match.group(2)) if match.group(2) else len(content) - 1, len(content) - 1)
+        if start >= len(content) and content:
+            raise DriveError(416)
+        return 206, content[start:end + 1], {"content-type": content_type,
+                                              "content-range": f"bytes {start}-{end}/{len(content)}"}
+
+    def _upload(self, method, file_id, params, headers, body):
+        # POST creates a file and PATCH on /upload/drive/v3/files/{id} replaces an existing file's content.
+        upload_type = params.get("uploadType")
+        if method in ("POST", "PATCH") and upload_type == "resumable":
+            if file_id:
+                self._get(file_id)
+            upload_id = self._new_id(24)
+            self.uploads[upload_id] = {"metadata": self._json(body), "fields": params.get("fields"), "data": bytearray(),
+                                       "mimeType": headers.get("x-upload-content-type"), "fileId": file_id}
+            # Served over a socket, the session URL points back at the host the client used.
+            origin = f"{headers.get('x-fake-scheme', 'https')}://{headers.get('host', 'www.googleapis.com')}"
+            location = f"{origin}/upload/drive/v3/files?uploadType=resumable&upload_id={upload_id}"
+            return 200, None, {"location": location}
+        if method == "PUT" and "upload_id" in params:
+            session = self.uploads.get(params["upload_id"])
+            if session is None:
+                raise DriveError(404, "Upload session not found")
+            match = re.match(r"bytes (\*|(\d+)-(\d+))/(\*|\d+)", headers.get("content-range", ""))
+            if not match:
+                raise DriveError(400, "Missing Content-Range")
+            data = session["data"]
+            if match.group(2) is not None:
+                start = int(match.group(2))
+                chunk = body if isinstance(body, bytes) else (body or "").encode()
+                if start == len(data):
+                    data.extend(chunk)
+                elif start > len(data):
+                    raise DriveError(400, "Chunk starts past the uploaded range")
+            total = match.group(4)
+            if total != "*" and len(data) >= int(total):
+                del self.uploads[params["upload_id"]]
+                file = self._store_upload(session["fileId"], session["metadata"], session["mimeType"], bytes(data), params)
+                return 200, _select(self._public(file), session["fields"]), {}
+            extra = {"range": f"bytes=0-{len(data) - 1}"} if data else {}
+            return 308, None, extra
+        raw = body if isinstance(body, bytes) else (body or "").encode()
+        if method in ("POST", "PATCH") and upload_type == "multipart":
+            message = email.parser.BytesParser().parsebytes(
+                f"content-type: {headers['content-type']}\r\n\r\n".encode() + raw)
+            metadata_part, media_part = message.get_payload()
+            file = self._store_upload(file_id, json.loads(metadata_part.get_payload()), media_part.get_content_type(),
+                                      media_part.get_payload(decode=True) or b"", params)
+            return 200, _select(self._public(file), params.get("fields")), {}
+        if method in ("POST", "PATCH") and upload_type == "media":
+            file = self._store_upload(file_id, {}, headers.get("content-type"), raw, params)
+            return 200, _select(self._public(file), params.get("fields")), {}
+        raise DriveError(400, f"Unsupported upload: {method} uploadType={upload_type}")
+
+    def _store_upload(self, file_id, metadata, mime_type, content, params):
+        if file_id is None:
+            metadata = dict(metadata)
+            metadata.setdefault("mimeType", mime_type or "application/octet-stream")
+            return self._create(metadata, content)
+        file = self._update(file_id, metadata, params)
+        self._set_content(file, content)
+        return file
+
+    # --- permissions and changes ---
+
+    def _add_permission(self, file_id, body):
+        if body.get("role") not in ROLE_RANK or body.get("type") not in ("user", "group", "domain", "anyone"):
+            raise DriveError(400, "Invalid permission")
+        principal = body.get("emailAddress") or body.get("domain") or "anyone"
+        permission = {"kind": "drive#permission", "id": hashlib.sha1(principal.lower().encode()).hexdigest()[:20],
+                      **{k: body[k] for k in ("type", "role", "emailAddress", "domain") if k in body}}
+        existing = self.permissions.setdefault(file_id, [])
+        existing[:] = [p for p in existing if p["id"] != permission["id"]] + [permission]
+        self._record_change(file_id)
+        return permission
+
+    def _remove_permission(self, file_id, permission_id):
+        before = len(self.permissions.get(file_id, []))
+        self.permissions[file_id] = [p for p in self.permissions.get(file_id, []) if p["id"] != permission_id]
+        if len(self.permissions[file_id]) == before:
+            raise DriveError(404, f"Permission not found: {permission_id}.")
+        self._record_change(file_id)
+
+    def _watch(self, body, params):
+        if "pageToken" not in params:
+            raise DriveError(400, "Required parameter: pageToken")
+        if body.get("type") != "web_hook" or not body.get("address", "").startswith(("https://", "http://")):
+            raise DriveError(400, "Invalid channel")
+        channel = {"kind": "api#channel", "id": body["id"], "resourceId": self._new_id(20),
+                   "resourceUri": "https://www.googleapis.com/drive/v3/changes", "address": body["address"],
+                   "token": body.get("token"), "expiration": str(body.get("expiration") or int(time.time() * 1000) + 3600_000)}
+        self.channels[channel["id"]] = channel
+        threading.Thread(target=self._post_notification, args=(channel, "sync"), daemon=True).start()
+        return {k: v for k, v in channel.items() if k != "address"}
+
+    def _list_changes(self, params):
+        if "pageToken" not in params:
+            raise DriveError(400, "Required parameter: pageToken")
+        start = int(params["pageToken"]) - 1
+        page_size = max(1, min(int(params.get("pageSize", 100)), self.page_size_limit))
+        changes = []
+        for change in self.changes[start:start + page_size]:
+            file = self.files.get(change["fileId"])
+            item = {"kind": "drive#change", "changeType": "file", "time": change["time"],
+                    "fileId": change["fileId"], "removed": change["removed"] or file is None}
+            if file is not None and not change["removed"]:
+                item["file"] = self._public(file)
+            changes.append(item)
+        result = {"kind": "drive#changeList", "changes": changes}
+        if start + page_size < len(self.changes):
+            result["nextPageToken"] = str(start + page_size + 1)
+        else:
+            result["newStartPageToken"] = str(len(self.changes) + 1)
+        return _select(result, params.get("fields"))
+
+
+class FakeHttp:
+    # Enough of httplib2.Http for googleapiclient: request() and close().
+
+    def __init__(self, drive: FakeDrive):
+        self.drive = drive
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=5, connection_type=None):
+        if hasattr(body, "read"):
+            body = body.read()
+        return self.drive.handle(uri, method, body, headers)
+
+    def close(self):
+        pass
@@ -0,0 +1,184 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import tempfile
+import time
+
+import pytest
+
+from fake_drive import FakeDrive
+from main import GoogleDriveMCP
+
+DOC_MIME_TYPE = "application/vnd.google-apps.document"
+
+
+class Fixtures:
+    # Drive content shared by the cases. fresh() makes new files for tools that consume their target.
+
+    def __init__(self, drive: FakeDrive, download_size: int):
+        self.drive = drive
+        self.tmp = tempfile.mkdtemp(prefix="gdrive-bench-files-")
+        self.tree = drive.add_tree(depth=2, folders_per_level=3, files_per_folder=5, prefix="project")
+        self.flat = drive.add_folder("flat")
+        for i in range(500):
+            drive.add_file(f"report {i:03d}.txt", self.flat, content=f"quarterly numbers {i}".encode())
+        self.file = drive.add_file("notes.txt", self.flat, content=b"bench notes " * 100)
+        self.binary = drive.add_file("blob.bin", content=os.urandom(download_size), mime_type="application/octet-stream")
+        self.doc = drive.add_file("Plan", mime_type=DOC_MIME_TYPE, content=b"plan text " * 200)
+        self.destination = drive.add_folder("destination")
+        self.upload_path = os.path.join(self.tmp, "upload.bin")
+        with open(self.upload_path, "wb") as f:
+            f.write(os.urandom(512 * 1024))
+        self.sync_source = os.path.join(self.tmp, "sync")
+        for i in range(30):
+            os.makedirs(os.path.join(self.sync_source, f"dir {i % 3}"), exist_ok=True)
+            with open(os.path.join(self.sync_source, f"dir {i % 3}", f"file {i}.bin"), "wb") as f:
+                f.write(os.urandom(16 * 1024))
+        self.counter = 0
+
+    def fresh(self, count: int, folder: bool = False, trashed: bool = False):
+        ids = []
+        for _ in range(count):
+            self.counter += 1
+            if folder:
+                ids.append(self.drive.add_folder(f"scratch folder {self.counter}", self.destination))
+            else:
+                ids.append(self.drive.add_file(f"scratch {self.counter}.txt", self.destination, content=b"x" * 64,
+                                               trashed=trashed))
+        return ids
+
+    def path(self, name: str) -> str:
+        self.counter += 1
+        return os.path.join(self.tmp, f"{self.counter}-{name}")
+
+
+def cases(fx: Fixtures, job_id: str, watcher):
+    # tool name -> function building the arguments for call i; fresh targets are made before timing starts.
+    return {
+        "create_file": lambda i: {"name": f"bench doc {i}"},
+        "upload_file_in_parent": lambda i: {"content": "hello " * 100, "name": f"upload {i}.txt",
+                                            "mime_type": "text/plain", "parent_folder_id": fx.destination},
+        "upload_local_file": lambda i: {"local_path": fx.upload_path, "name": f"local {i}.bin",
+                                        "parent_folder_id": fx.destination},
+        "sync_directory": lambda i: {"local_path": fx.sync_source, "parent_folder_id": fx.destination},
+        "download_file": lambda i: {"file_id": fx.binary, "local_path": fx.path("blob.bin")},
+        "export_file": lambda i: {"file_id": fx.doc, "mime_type": "text/plain"},
+        "move_file_to_folder": lambda i: {"file_id": fx.fresh(1)[0], "parent_folder_id": fx.flat},
+        "create_folder": lambda i: {"name": f"bench folder {i}"},
+        "create_folder_in_parent": lambda i: {"name": f"bench subfolder {i}", "parent_folder_id": fx.destination},
+        "rename_file_or_folder": lambda i: {"file_id": fx.file, "new_name": f"notes {i}.txt"},
+        "copy_file": lambda i: {"file_id": fx.file, "destination_folder_id": fx.destination},
+        "get_file_metadata": lambda i: {"file_id": fx.file},
+        "delete_file_or_folder": lambda i: {"file_id": fx.fresh(1)[0]},
+        "permanently_delete_file_or_folder": lambda i: {"file_id": fx.fresh(1)[0]},
+        "restore_file_or_folder": lambda i: {"file_id": fx.fresh(1, trashed=True)[0]},
+        "list_files": lambda i: {"page_size": 100},
+        "search_files": lambda i: {"name": "report", "parent_folder_id": fx.flat, "limit": 50, "source": "api"},
+        "sync_file_index": lambda i: {},
+        "watch_folder": lambda i: {"folder_id": fx.flat},
+        "get_folder_changes": lambda i: {"subscription_id": watcher.subscribe(fx.flat).id},
+        "unwatch_folder": lambda i: {"subscription_id": watcher.subscribe(fx.destination).id},
+        "list_permissions": lambda i: {"file_id": fx.file},
+        "add_permission": lambda i: {"file_id": fx.fresh(1)[0], "email": f"user{i}@example.com"},
+        "audit_permissions": lambda i: {"folder_id": fx.tree},
+        "share_tree": lambda i: {"folder_id": fx.tree, "email": f"reader{i}@example.com"},
+        "batch_delete": lambda i: {"file_ids": fx.fresh(20)},
+        "batch_restore": lambda i: {"file_ids": fx.fresh(20, trashed=True)},
+        "batch_rename": lambda i: {"renames": [{"file_id": f, "new_name": f"renamed {f[:6]}"} for f in fx.fresh(20)]},
+        "batch_move": lambda i: {"file_ids": fx.fresh(20), "parent_folder_id": fx.flat},
+        "batch_add_permission": lambda i: {"permissions": [{"file_id": f, "email": "team@example.com"}
+                                                           for f in fx.fresh(20)]},
+        "list_folder_tree": lambda i: {"folder_id": fx.tree},
+        "folder_tree_size": lambda i: {"folder_id": fx.tree},
+        "copy_folder_tree": lambda i: {"source_folder_id": fx.tree, "destination_parent_id": fx.destination},
+        "get_folder_job_status": lambda i: {"job_id": job_id},
+        "get_cache_stats": lambda i: {},
+        "get_request_stats": lambda i: {},
+        "get_server_stats": lambda i: {}
+    }
+
+
+# Tools whose every call walks or rewrites a whole tree get fewer rounds.
+HEAVY_TOOLS = {"copy_folder_tree", "share_tree", "audit_permissions", "sync_directory"}
+TOOLS = list(cases(None, None, None))
+
+
+async def call(agent: GoogleDriveMCP, tool: str, arguments: dict):
+    started = time.perf_counter()
+    result = await agent.mcp.call_tool(tool, arguments)
+    elapsed = time.perf_counter() - started
+    content = result[0] if isinstance(result, tuple) else result
+    return elapsed, json.loads(content[0].text).get("status") == "success"
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@pytest.fixture(scope="module")
+def suite(request):
+    option = request.config.getoption
+    error_rate = option("--drive-error-rate")
+    error_rates = {429: error_rate / 2, 500: error_rate / 2} if error_rate else None
+    drive = FakeDrive(latency=option("--drive-latency"), error_rates=error_rates, seed=option("--drive-seed"))
+    fx = Fixtures(drive, option("--drive-download-size"))
+    agent = GoogleDriveMCP(service_factory=drive.service, max_workers=option("--drive-workers"))
+    logging.getLogger().setLevel(logging.ERROR)
+    loop = asyncio.new_event_loop()
+
+    loop.run_until_complete(call(agent, "sync_file_index", {"full_rescan": True}))
+    copy = loop.run_until_complete(agent.mcp.call_tool("copy_folder_tree", {
+        "source_folder_id": fx.tree, "destination_parent_id": fx.destination}))
+    content = copy[0] if isinstance(copy, tuple) else copy
+    job_id = json.loads(content[0].text)["data"]["jobId"]
+    yield agent, cases(fx, job_id, agent.watcher), loop, error_rate
+    agent.watcher.close()
+    agent.pool.shutdown()
+    loop.close()
+
+
+def test_every_tool_has_a_case(suite):
+    agent, table, loop, _ = suite
+    registered = {tool.name for tool in loop.run_until_complete(agent.mcp.list_tools())}
+    assert registered <= set(table)
+
+
+@pytest.mark.parametrize("mode", ["sequential", "concurrent"])
+@pytest.mark.parametrize("tool", TOOLS)
+def test_tool(benchmark, request, suite, latency_report, tool, mode):
+    # A sequential round is one call; a concurrent round is one call per worker, all in flight at
+    # once. Arguments, including fresh targets, are built outside the timing. pytest-benchmark times
+    # whole rounds, so per-call latency percentiles and ops/s go into extra_info.
+    agent, table, loop, error_rate = suite
+    calls = request.config.getoption("--drive-workers") if mode == "concurrent" else 1
+    counter = itertools.count()
+    outcomes = []
+
+    def setup():
+        return ([table[tool](next(counter)) for _ in range(calls)],), {}
+
+    async def gather(arguments):
+        return await asyncio.gather(*(call(agent, tool, a) for a in arguments))
+
+    def run(arguments):
+        outcomes.extend(loop.run_until_complete(gather(arguments)))
+
+    benchmark.group = mode
+    benchmark.pedantic(run, setup=setup, rounds=4 if tool in HEAVY_TOOLS else 20, iterations=1)
+    latencies = [elapsed for elapsed, _ in outcomes]
+    errors = sum(1 for _, ok in outcomes if not ok)
+    # Without timings (--benchmark-disable) the calls' own latencies stand in for the rounds.
+    timed = sum(benchmark.stats.stats.data) if benchmark.stats else sum(latencies) / calls
+    benchmark.extra_info.update({
+        "calls": calls,
+        "opsPerSecond": round(len(outcomes) / timed, 1),
+        "p50Ms": round(percentile(latencies, 0.5) * 1000, 2),
+        "p99Ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "errors": errors
+    })
+    latency_report.append({"name": request.node.name, **benchmark.extra_info})
+    if not error_rate:
+        assert errors == 0
@@ -1 +1,49 @@
+import os
+
 SCOPES = ['https://www.googleapis.com/auth/drive']
+
+MAX_WORKERS = int(os.environ.get("GDRIVE_MAX_WORKERS", "8"))
+
+METADATA_CACHE_SIZE = int(os.environ.get("GDRIVE_METADATA_CACHE_SIZE", "1024"))
+METADATA_CACHE_TTL = float(os.environ.get("GDRIVE_METADATA_CACHE_TTL", "300"))
+
+INDEX_PATH = os.environ.get("GDRIVE_INDEX_PATH")
+INDEX_SYNC_INTERVAL = float(os.environ.get("GDRIVE_INDEX_SYNC_INTERVAL", "30"))
+
+STATE_DIR = os.environ.get("GDRIVE_STATE_DIR", ".gdrive_state")
+DISCOVERY_CACHE_PATH = os.environ.get("GDRIVE_DISCOVERY_CACHE_PATH", os.path.join(STATE_DIR, "drive_v3_discovery.json"))
+CREDENTIAL_REFRESH_MARGIN = float(os.environ.get("GDRIVE_CREDENTIAL_REFRESH_MARGIN", "300"))
+UPLOAD_CHUNK_SIZE = int(os.environ.get("GDRIVE_UPLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+DOWNLOAD_CHUNK_SIZE = int(os.environ.get("GDRIVE_DOWNLOAD_CHUNK_SIZE", str(8 * 1024 * 1024)))
+DOWNLOAD_PARALLELISM = int(os.environ.get("GDRIVE_DOWNLOAD_PARALLELISM", "4"))
+TREE_CONCURRENCY = int(os.environ.get("GDRIVE_TREE_CONCURRENCY", "4"))
+SYNC_PARALLELISM = int(os.environ.get("GDRIVE_SYNC_PARALLELISM", "4"))
+
+TRANSPORT = os.environ.get("GDRIVE_TRANSPORT", "httplib2").lower()
+HTTP2 = os.environ.get("GDRIVE_HTTP2", "1").lower() not in ("0", "false", "no")
+HTTP_MAX_CONNECTIONS = int(os.environ.get("GDRIVE_HTTP_MAX_CONNECTIONS", "10"))
+HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("GDRIVE_HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_TIMEOUT = float(os.environ.get("GDRIVE_HTTP_TIMEOUT", "60"))
+
+QPS_LIMIT = float(os.environ.get("GDRIVE_QPS_LIMIT", "20"))
+QPS_BURST = float(os.environ.get("GDRIVE_QPS_BURST", "40"))
+MAX_RETRIES = int(os.environ.get("GDRIVE_MAX_RETRIES", "5"))
+RETRY_BASE_DELAY = float(os.environ.get("GDRIVE_RETRY_BASE_DELAY", "1"))
+RETRY_MAX_DELAY = float(os.environ.get("GDRIVE_RETRY_MAX_DELAY", "64"))
+
+ACCOUNTS_FILE = os.environ.get("GDRIVE_ACCOUNTS_FILE")
+ACCOUNT_MAX_CONCURRENCY = int(os.environ.get("GDRIVE_ACCOUNT_MAX_CONCURRENCY", "0"))
+ACCOUNT_QPS_LIMIT = float(os.environ.get("GDRIVE_ACCOUNT_QPS_LIMIT", "0"))
+DELEGATED_ACCOUNT_LIMIT = int(os.environ.get("GDRIVE_DELEGATED_ACCOUNT_LIMIT", "100"))
+
+WATCH_POLL_MIN_INTERVAL = float(os.environ.get("GDRIVE_WATCH_POLL_MIN_INTERVAL", "2"))
+WATCH_POLL_MAX_INTERVAL = float(os.environ.get("GDRIVE_WATCH_POLL_MAX_INTERVAL", "60"))
+WATCH_EVENT_BUFFER = int(os.environ.get("GDRIVE_WATCH_EVENT_BUFFER", "500"))
+WEBHOOK_URL = os.environ.get("GDRIVE_WEBHOOK_URL")
+WEBHOOK_HOST = os.environ.get("GDRIVE_WEBHOOK_HOST", "127.0.0.1")
+WEBHOOK_PORT = int(os.environ.get("GDRIVE_WEBHOOK_PORT", "8765"))
+WEBHOOK_CHANNEL_TTL = float(os.environ.get("GDRIVE_WEBHOOK_CHANNEL_TTL", "3600"))
+
+METRICS_PORT = int(os.environ["GDRIVE_METRICS_PORT"]) if os.environ.get("GDRIVE_METRICS_PORT") else None
+PROFILE_SAMPLE_RATE = float(os.environ.get("GDRIVE_PROFILE_SAMPLE_RATE", "0"))
+PROFILE_SLOW_THRESHOLD = float(os.environ.get("GDRIVE_PROFILE_SLOW_THRESHOLD", "1"))
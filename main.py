@@ -1,39 +1,100 @@
 from mcp.server.fastmcp import FastMCP
-from auth import authenticate_drive
-from tools import file_and_folder, search, permissions
+from accounts import AccountRegistry
+from config import MAX_WORKERS, METADATA_CACHE_SIZE, METADATA_CACHE_TTL, INDEX_PATH, INDEX_SYNC_INTERVAL, METRICS_PORT
+from tools import file_and_folder, search, permissions, batch, server, transfer, folder_tree, sync, watch
+from utils.metadata_cache import MetadataCache
+from utils.file_index import FileIndex
+from utils.change_watcher import ChangeWatcher
+from utils.http_transport import close_transport
+from utils.metrics import registry, start_metrics_server
+from utils.request_executor import default_executor
+from utils.service_pool import ServicePool
 import logging
 
 class GoogleDriveMCP:
-    def __init__(self):
-        self.service = authenticate_drive()
+    def __init__(self, service_factory=None, max_workers: int = MAX_WORKERS, accounts: AccountRegistry = None):
+        # Nothing here touches the network: credentials and services are created on the first tool call.
+        # A service_factory serves a single identity; otherwise accounts come from GDRIVE_ACCOUNTS_FILE,
+        # or are just the token.json user.
+        self.accounts = None
+        if service_factory is None:
+            self.accounts = accounts or AccountRegistry.from_config()
+            service_factory = self.accounts.service_factory
+        self.pool = ServicePool(service_factory, max_workers=max_workers, accounts=self.accounts)
+        self.service = self.pool.service
+        self.cache = MetadataCache(max_entries=METADATA_CACHE_SIZE, ttl=METADATA_CACHE_TTL)
+        self.index = FileIndex(INDEX_PATH, sync_interval=INDEX_SYNC_INTERVAL) if INDEX_PATH else None
+        # Starts polling (or opens a webhook channel) on the first watch_folder call.
+        self.watcher = ChangeWatcher(self.service, self.cache, self.index)
         self.mcp = FastMCP("gdrive")
         self._register_all_tools()
 
+    def _tool(self, fn):
+        self.mcp.tool()(self.pool.wrap(registry.instrument(fn)))
+
     def _register_all_tools(self):
-        self.mcp.tool()(file_and_folder.create_file(self.service))
-        self.mcp.tool()(file_and_folder.upload_file_in_parent(self.service))
-        self.mcp.tool()(file_and_folder.move_file_to_folder(self.service))
-        self.mcp.tool()(file_and_folder.create_folder(self.service))
-        self.mcp.tool()(file_and_folder.create_folder_in_parent(self.service))
-        self.mcp.tool()(file_and_folder.rename_file_or_folder(self.service))
-        self.mcp.tool()(file_and_folder.copy_and_paste_file(self.service))
-        self.mcp.tool()(file_and_folder.get_file_metadata(self.service))
-        self.mcp.tool()(file_and_folder.delete_file_or_folder(self.service))
-        self.mcp.tool()(file_and_folder.permanently_delete_file_or_folder(self.service))
-        self.mcp.tool()(file_and_folder.restore_file_or_folder(self.service))
-
-        self.mcp.tool()(search.list_files(self.service))
-        self.mcp.tool()(search.search_files(self.service))
-
-        self.mcp.tool()(permissions.list_permissions(self.service))
-        self.mcp.tool()(permissions.add_permission(self.service))
+        self._tool(file_and_folder.create_file(self.service))
+        self._tool(file_and_folder.upload_file_in_parent(self.service))
+        self._tool(transfer.upload_local_file(self.service))
+        self._tool(transfer.download_file(self.service, self.cache))
+        self._tool(transfer.export_file(self.service, self.cache))
+        self._tool(sync.sync_directory(self.service, self.cache))
+        self._tool(file_and_folder.move_file_to_folder(self.service, self.cache))
+        self._tool(file_and_folder.create_folder(self.service))
+        self._tool(file_and_folder.create_folder_in_parent(self.service))
+        self._tool(file_and_folder.rename_file_or_folder(self.service, self.cache))
+        self._tool(file_and_folder.copy_and_paste_file(self.service))
+        self._tool(file_and_folder.get_file_metadata(self.service, self.cache))
+        self._tool(file_and_folder.delete_file_or_folder(self.service, self.cache))
+        self._tool(file_and_folder.permanently_delete_file_or_folder(self.service, self.cache))
+        self._tool(file_and_folder.restore_file_or_folder(self.service, self.cache))
+
+        self._tool(search.list_files(self.service))
+        self._tool(search.search_files(self.service, self.index))
+        self._tool(search.sync_file_index(self.service, self.index))
+
+        self._tool(watch.watch_folder(self.watcher))
+        self._tool(watch.get_folder_changes(self.watcher))
+        self._tool(watch.unwatch_folder(self.watcher))
+        self.mcp.resource("gdrive://changes/{subscription_id}", mime_type="application/json")(
+            watch.changes_resource(self.watcher))
+
+        self._tool(permissions.list_permissions(self.service))
+        self._tool(permissions.add_permission(self.service, self.cache))
+        self._tool(permissions.audit_permissions(self.service))
+        self._tool(permissions.share_tree(self.service, self.cache))
+
+        self._tool(batch.batch_delete(self.service, self.cache))
+        self._tool(batch.batch_restore(self.service, self.cache))
+        self._tool(batch.batch_rename(self.service, self.cache))
+        self._tool(batch.batch_move(self.service, self.cache))
+        self._tool(batch.batch_add_permission(self.service, self.cache))
+
+        self._tool(folder_tree.list_folder_tree(self.service))
+        self._tool(folder_tree.folder_tree_size(self.service))
+        self._tool(folder_tree.copy_folder_tree(self.service))
+        self._tool(folder_tree.get_folder_job_status())
+
+        self._tool(server.get_cache_stats(self.cache))
+        self._tool(server.get_request_stats(default_executor))
+        self._tool(server.get_server_stats(registry, self.cache, default_executor))
+        if self.accounts:
+            self._tool(server.list_accounts(self.accounts))
 
     def run(self):
-        self.mcp.run()
+        if METRICS_PORT:
+            start_metrics_server(METRICS_PORT, lambda: server.prometheus_text(registry, self.cache, default_executor))
+        try:
+            self.mcp.run()
+        finally:
+            self.watcher.close()
+            self.pool.shutdown(wait=False)
+            if self.accounts:
+                self.accounts.close()
+            close_transport()
 
 if __name__ == "__main__":
     agent = GoogleDriveMCP()
     logging.basicConfig(level=logging.INFO)
     logging.info("Starting Google Drive MCP agent")
     agent.run()
-    
@@ -0,0 +1,33 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Configuration is read at import time, so it has to be in place before the server modules load.
+STATE_DIR = tempfile.mkdtemp(prefix="gdrive-tests-")
+os.environ.setdefault("GDRIVE_STATE_DIR", STATE_DIR)
+os.environ.setdefault("GDRIVE_QPS_LIMIT", "0")
+os.environ.setdefault("GDRIVE_RETRY_BASE_DELAY", "0.001")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from fake_drive import FakeDrive  # noqa: E402
+from utils.metadata_cache import MetadataCache  # noqa: E402
+
+
+@pytest.fixture
+def drive():
+    return FakeDrive()
+
+
+@pytest.fixture
+def service(drive):
+    return drive.service()
+
+
+@pytest.fixture
+def cache():
+    return MetadataCache()
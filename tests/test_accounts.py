@@ -0,0 +1,119 @@
+import asyncio
+import threading
+
+import pytest
+
+from accounts import Account, AccountRegistry
+from auth import CredentialManager
+from utils.service_pool import ServicePool, current_account
+
+DELEGATION = {"key_file": "workspace-sa.json", "domains": ["example.com"]}
+
+
+@pytest.fixture
+def registry():
+    # Credentials load lazily, so nothing here reads the key file or touches the network.
+    registry = AccountRegistry([Account("me", CredentialManager())], delegation=DELEGATION, http_factory=object,
+                               delegated_limit=2)
+    yield registry
+    registry.close()
+
+
+def delegated(registry):
+    return [account["name"] for account in registry.stats()["accounts"] if account["type"] == "delegated"]
+
+
+def test_delegated_accounts_are_reused(registry):
+    assert registry.get("Alice@example.com") is registry.get("alice@example.com")
+    assert delegated(registry) == ["alice@example.com"]
+
+
+def test_least_recently_used_delegated_account_is_dropped(registry):
+    alice, bob = registry.get("alice@example.com"), registry.get("bob@example.com")
+    registry.get("alice@example.com")
+    carol = registry.get("carol@example.com")
+    assert sorted(delegated(registry)) == ["alice@example.com", "carol@example.com"]
+    assert bob.retired and not alice.retired and not carol.retired
+    assert registry.get("bob@example.com") is not bob
+    assert registry.get("me").name == "me"
+
+
+def test_accounts_with_calls_in_flight_are_kept(registry):
+    alice = registry.get("alice@example.com")
+    bob = registry.get("bob@example.com")
+    alice.active = 1
+    registry.get("carol@example.com")
+    assert not alice.retired and bob.retired
+
+
+def test_accounts_with_calls_waiting_for_a_slot_are_kept(registry):
+    alice = registry.get("alice@example.com")
+    bob = registry.get("bob@example.com")
+    alice.waiting = 1
+    registry.get("carol@example.com")
+    assert not alice.retired and bob.retired
+
+
+def test_new_account_is_kept_when_every_other_one_is_busy(registry):
+    alice, bob = registry.get("alice@example.com"), registry.get("bob@example.com")
+    alice.active = bob.waiting = 1
+    carol = registry.get("carol@example.com")
+    assert not carol.retired
+    assert registry.get("carol@example.com") is carol
+    # Over the limit until one of them goes idle.
+    assert sorted(delegated(registry)) == ["alice@example.com", "bob@example.com", "carol@example.com"]
+    alice.active = 0
+    registry.get("dave@example.com")
+    assert alice.retired and carol.retired
+    assert sorted(delegated(registry)) == ["bob@example.com", "dave@example.com"]
+
+
+def test_calls_queued_on_a_busy_account_count_as_waiting(registry):
+    registry.delegation = {**DELEGATION, "max_concurrency": 1}
+    pool = ServicePool(object, max_workers=2, accounts=registry)
+    release = threading.Event()
+
+    async def scenario():
+        alice = registry.get("alice@example.com")
+        first = asyncio.ensure_future(pool.run_as(alice, release.wait, 5))
+        second = asyncio.ensure_future(pool.run_as(alice, lambda: "second"))
+        cancelled = asyncio.ensure_future(pool.run_as(alice, lambda: "cancelled"))
+        await asyncio.sleep(0.01)
+        assert (alice.active, alice.waiting) == (1, 2)
+        cancelled.cancel()
+        await asyncio.sleep(0)
+        assert alice.waiting == 1
+        registry.get("bob@example.com")
+        registry.get("carol@example.com")
+        assert not alice.retired
+        release.set()
+        assert await first is True
+        assert await second == "second"
+        assert (alice.active, alice.waiting) == (0, 0)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+def test_workers_drop_services_of_dropped_accounts(registry):
+    pool = ServicePool(object, max_workers=1, accounts=registry)
+
+    def service_for(name):
+        token = current_account.set(registry.get(name))
+        try:
+            return pool.local_service()
+        finally:
+            current_account.reset(token)
+
+    try:
+        alice = service_for("alice@example.com")
+        assert service_for("alice@example.com") is alice
+        service_for("bob@example.com")
+        service_for("carol@example.com")
+        assert set(pool._local.services) == {"bob@example.com", "carol@example.com"}
+        assert service_for("alice@example.com") is not alice
+    finally:
+        pool.shutdown()
@@ -0,0 +1,118 @@
+import datetime
+import json
+import threading
+
+import httplib2
+import pytest
+
+import auth
+from auth import CredentialManager
+
+DOCUMENT = {"kind": "discovery#restDescription", "name": "drive", "version": "v3"}
+
+
+@pytest.fixture
+def discovery(tmp_path, monkeypatch):
+    # No bundled copy, so load_discovery_document has to fetch; responses holds what the fetch returns.
+    path, responses = tmp_path / "state" / "discovery.json", []
+
+    class Http:
+        def request(self, uri):
+            return responses.pop(0)
+    monkeypatch.setattr(auth, "DISCOVERY_CACHE_PATH", str(path))
+    monkeypatch.setattr(auth, "get_static_doc", lambda api, version: None)
+    monkeypatch.setattr(auth, "build_http", Http)
+    auth.load_discovery_document.cache_clear()
+    yield path, responses
+    auth.load_discovery_document.cache_clear()
+
+
+def respond(status, body):
+    return httplib2.Response({"status": str(status)}), body.encode()
+
+
+def test_fetched_document_is_cached(discovery):
+    path, responses = discovery
+    responses.append(respond(200, json.dumps(DOCUMENT)))
+    assert auth.load_discovery_document() == DOCUMENT
+    assert json.loads(path.read_text()) == DOCUMENT
+    auth.load_discovery_document.cache_clear()
+    assert auth.load_discovery_document() == DOCUMENT
+    assert responses == []
+
+
+@pytest.mark.parametrize("status", [403, 500, 503])
+def test_error_responses_are_never_cached(discovery, status):
+    path, responses = discovery
+    responses.append(respond(status, '{"error": {"code": %d}}' % status))
+    with pytest.raises(RuntimeError):
+        auth.load_discovery_document()
+    assert not path.exists()
+    responses.append(respond(200, json.dumps(DOCUMENT)))
+    assert auth.load_discovery_document() == DOCUMENT
+
+
+def test_unreadable_cached_document_is_fetched_again(discovery):
+    path, responses = discovery
+    path.parent.mkdir()
+    path.write_text("<html>Service Unavailable</html>")
+    responses.append(respond(200, json.dumps(DOCUMENT)))
+    assert auth.load_discovery_document() == DOCUMENT
+    assert json.loads(path.read_text()) == DOCUMENT
+
+
+def utc_in(seconds):
+    # google-auth keeps expiry as a naive UTC datetime.
+    return datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None) + datetime.timedelta(seconds=seconds)
+
+
+class ExpiringCredentials:
+    # Stands in for google-auth credentials whose token expires shortly.
+
+    def __init__(self, expires_in: float, fail: bool = False):
+        self.expiry = utc_in(expires_in)
+        self.refresh_token = "refresh"
+        self.fail = fail
+        self.refreshed = threading.Event()
+
+    def refresh(self, request):
+        self.refreshed.set()
+        if self.fail:
+            raise RuntimeError("token endpoint unreachable")
+        self.expiry = utc_in(3600)
+
+
+def test_credentials_are_refreshed_before_they_expire():
+    creds, saved = ExpiringCredentials(expires_in=0.1), []
+    manager = CredentialManager(load=lambda: creds, save=saved.append, refresh_margin=0.05)
+    try:
+        assert manager.get() is creds
+        assert creds.refreshed.wait(timeout=5)
+        # get() waits for the refresh, which holds the manager's lock until it is saved.
+        assert manager.get() is creds
+        assert saved == [creds]
+        # The next refresh is scheduled against the new expiry.
+        assert manager._timer is not None and manager._timer.interval > 3000
+    finally:
+        manager.close()
+    assert manager._timer is None
+
+
+def test_failed_refresh_is_left_to_the_next_request():
+    creds = ExpiringCredentials(expires_in=0, fail=True)
+    manager = CredentialManager(load=lambda: creds, save=None, refresh_margin=0)
+    try:
+        manager.get()
+        assert creds.refreshed.wait(timeout=5)
+        assert manager.get() is creds
+        assert manager._timer is None or not manager._timer.is_alive()
+    finally:
+        manager.close()
+
+
+def test_credentials_without_a_refresh_token_are_not_scheduled():
+    creds = ExpiringCredentials(expires_in=60)
+    creds.refresh_token = None
+    manager = CredentialManager(load=lambda: creds, save=None)
+    manager.get()
+    assert manager._timer is None
@@ -0,0 +1,74 @@
+import pytest
+
+from utils import request_executor
+from utils.batch import execute_batch
+from utils.request_executor import default_executor
+
+
+@pytest.fixture(autouse=True)
+def retries(monkeypatch):
+    monkeypatch.setattr(default_executor, "max_retries", 2)
+    monkeypatch.setattr(request_executor.time, "sleep", lambda seconds: None)
+
+
+@pytest.fixture
+def batch_sizes(drive, monkeypatch):
+    # Items in each batch request the fake Drive receives.
+    handle, sizes = drive.handle, []
+
+    def counting(uri, method, body, headers):
+        if "/batch/" in uri:
+            sizes.append((body.decode() if isinstance(body, bytes) else body).count("Content-ID:"))
+        return handle(uri, method, body, headers)
+    monkeypatch.setattr(drive, "handle", counting)
+    return sizes
+
+
+def gets(drive, service, count):
+    ids = [drive.add_file(f"file {i}.txt") for i in range(count)]
+    return ids, [(i, service.files().get(fileId=file_id, fields="id, name")) for i, file_id in enumerate(ids)]
+
+
+def test_every_item_gets_a_result(drive, service, batch_sizes):
+    ids, requests = gets(drive, service, 5)
+    results = execute_batch(service, requests, batch_size=2)
+    assert [results[i]["data"]["id"] for i in range(5)] == ids
+    assert batch_sizes == [2, 2, 1]
+
+
+def test_rate_limited_items_are_retried_in_halved_batches(drive, service, batch_sizes):
+    ids, requests = gets(drive, service, 8)
+    drive.fail_next(429, count=6, match="GET /drive/v3/files/")
+    results = execute_batch(service, requests, batch_size=8)
+    assert all(results[i]["status"] == "success" for i in range(8))
+    assert batch_sizes == [8, 4, 2]
+
+
+@pytest.mark.parametrize("reason", ["rateLimitExceeded", "userRateLimitExceeded"])
+def test_rate_limited_403_items_are_retried(drive, service, batch_sizes, reason):
+    ids, requests = gets(drive, service, 3)
+    drive.fail_next(403, match=f"/files/{ids[1]}", reason=reason)
+    results = execute_batch(service, requests)
+    assert results[1]["status"] == "success"
+    assert batch_sizes == [3, 1]
+
+
+def test_item_still_rate_limited_after_the_last_retry_is_an_error(drive, service, batch_sizes):
+    ids, requests = gets(drive, service, 4)
+    drive.fail_next(429, count=100, match=f"/files/{ids[2]}")
+    results = execute_batch(service, requests, batch_size=4)
+    assert results[2]["status"] == "error"
+    assert results[2]["error"]["code"] == 429
+    assert all(results[i]["status"] == "success" for i in (0, 1, 3))
+    # The first pass and max_retries retries, each with half the batch size.
+    assert batch_sizes == [4, 1, 1]
+
+
+def test_other_item_errors_are_final(drive, service, batch_sizes):
+    ids, requests = gets(drive, service, 3)
+    drive.fail_next(500, match=f"/files/{ids[0]}")
+    requests.append((3, service.files().get(fileId="missing", fields="id")))
+    results = execute_batch(service, requests)
+    assert results[0]["error"]["code"] == 500
+    assert results[3]["error"]["code"] == 404
+    assert batch_sizes == [4]
@@ -0,0 +1,49 @@
+import threading
+
+import pytest
+
+from utils.change_watcher import ChangeWatcher, Subscription
+
+
+@pytest.fixture
+def watcher(service):
+    # A long interval, so the background thread stays out of the way and the tests poll themselves.
+    watcher = ChangeWatcher(service, webhook_url=None, min_interval=3600, max_interval=3600)
+    yield watcher
+    watcher.close()
+
+
+def test_folder_events(drive, service, watcher):
+    folder = drive.add_folder("inbox")
+    existing = drive.add_file("old.txt", folder)
+    subscription = watcher.subscribe(folder)
+    added = drive.add_file("new.txt", folder)
+    service.files().update(fileId=existing, body={"name": "renamed.txt"}).execute()
+    watcher.poll()
+    events = subscription.since(0)["events"]
+    assert [(event["type"], event["fileId"]) for event in events] == [("added", added), ("changed", existing)]
+    assert subscription.since(events[0]["seq"])["events"] == events[1:]
+
+
+def test_folder_ids_are_escaped_in_the_listing(watcher):
+    # An unescaped quote would end the literal early and make Drive reject the query.
+    subscription = watcher.subscribe("it's")
+    assert subscription.known_ids == set()
+
+
+def test_reading_while_events_are_recorded():
+    subscription = Subscription(None, set(), None)
+    stop = threading.Event()
+
+    def record():
+        while not stop.is_set():
+            subscription.record({"type": "changed", "fileId": "a"})
+    writer = threading.Thread(target=record)
+    writer.start()
+    try:
+        for _ in range(2000):
+            result = subscription.since(0)
+            assert result["lastSeq"] >= len(result["events"])
+    finally:
+        stop.set()
+        writer.join()
@@ -0,0 +1,71 @@
+import pytest
+
+from fake_drive import Query, QueryError
+from utils.query_builder import build_query_string
+
+OTHER_OWNER = [{"emailAddress": "colleague@example.com", "displayName": "Colleague", "me": False}]
+
+
+@pytest.fixture
+def files(drive):
+    # The benchmarks trust the fake to answer the queries the server builds, so these run the
+    # server's own clauses against a small, known Drive.
+    folder = drive.add_folder("reports")
+    drive.files[folder]["modifiedTime"] = "2020-01-01T00:00:00.000Z"
+    return {
+        "folder": folder,
+        "plan": drive.add_file("Plan 2024.txt", folder, modifiedTime="2024-03-01T00:00:00.000Z", starred=True),
+        "budget": drive.add_file("budget.csv", folder, mime_type="text/csv", modifiedTime="2023-06-01T00:00:00.000Z",
+                                 properties={"team": "finance"}),
+        "quote": drive.add_file("it's done.txt", modifiedTime="2024-05-01T00:00:00.000Z", owners=OTHER_OWNER),
+        "old": drive.add_file("old plan.txt", folder, modifiedTime="2022-01-01T00:00:00.000Z", trashed=True)
+    }
+
+
+def matching(drive, files, **filters):
+    query = Query(build_query_string(**filters))
+    return {key for key, file_id in files.items() if query.matches(drive, drive.files[file_id])}
+
+
+@pytest.mark.parametrize("filters, expected", [
+    ({"name": "plan"}, {"plan"}),
+    ({"name": "old plan"}, {"old"}),
+    ({"name": "Plan 2024.txt", "exact_name": True}, {"plan"}),
+    ({"name": "it's"}, {"quote"}),
+    ({"mime_type": "text/csv"}, {"budget"}),
+    ({"folders_only": True}, {"folder"}),
+    ({"exclude_folders": True, "trashed": False}, {"plan", "budget", "quote"}),
+    ({"modified_after": "2024-01-01T00:00:00"}, {"plan", "quote"}),
+    ({"modified_after": "2024-01-01T00:00:00", "modified_before": "2024-04-01T00:00:00"}, {"plan"}),
+    ({"starred": True}, {"plan"}),
+    ({"trashed": True}, {"old"}),
+    ({"shared_with_me": True}, {"quote"}),
+    ({"owner_email": "colleague@example.com"}, {"quote"}),
+    ({"custom_properties": {"team": "finance"}}, {"budget"}),
+    ({"any_of": [{"mime_type": "text/csv"}, {"name": "it's"}]}, {"budget", "quote"}),
+    ({"any_of": [{"name": "plan", "starred": True}, {"starred": True, "name": "budget"}]}, {"plan"}),
+    ({"name": "old", "exclude": {"starred": True}}, {"old"}),
+    ({"trashed": False, "exclude_folders": True, "exclude": {"mime_type": "text/csv"}}, {"plan", "quote"}),
+    ({"exclude": {"name": "plan"}, "exclude_folders": True}, {"budget", "quote", "old"})
+])
+def test_query_matches_the_clauses_the_server_builds(drive, files, filters, expected):
+    assert matching(drive, files, **filters) == expected
+
+
+def test_parent_clause(drive, files):
+    parent = {"parent_folder_id": files["folder"], "trashed": False}
+    assert matching(drive, files, **parent) == {"plan", "budget"}
+
+
+@pytest.mark.parametrize("text", [
+    "name = 'unterminated",
+    "name contains",
+    "(name = 'a'",
+    "name = 'a' 'b'",
+    "'a' in shortcuts",
+    "mimeType contains 'text'",
+    "name = 'a' ; trashed = false"
+])
+def test_invalid_queries_are_rejected(text):
+    with pytest.raises(QueryError):
+        Query(text)
@@ -0,0 +1,121 @@
+import threading
+
+import pytest
+
+from tools import batch, file_and_folder, search
+from utils.file_index import FileIndex
+
+
+@pytest.fixture
+def index(tmp_path, service):
+    # A long interval, so only this server's own writes can trigger a sync.
+    index = FileIndex(str(tmp_path / "index.sqlite"), sync_interval=3600)
+    index.seed(service)
+    yield index
+    index.close()
+
+
+@pytest.fixture
+def find(service, index):
+    tool = search.search_files(service, index)
+
+    def find(**filters):
+        response = tool(**filters)
+        assert response["status"] == "success", response
+        assert response["data"]["source"] == "index"
+        return {file["id"]: file for file in response["data"]["files"]}
+    return find
+
+
+def test_answers_from_the_index(drive, find):
+    file_id = drive.add_file("seeded later.txt")
+    # Written behind the server's back, so it only appears after the interval.
+    assert file_id not in find(name="seeded later")
+
+
+def test_create_is_visible_at_once(service, find):
+    created = file_and_folder.create_file(service)("fresh plan")["data"]
+    assert created["id"] in find(name="fresh plan")
+
+
+def test_rename_is_visible_at_once(drive, service, cache, index, find):
+    file_id = drive.add_file("draft.txt")
+    index.sync(service)
+    assert file_id in find(name="draft")
+    file_and_folder.rename_file_or_folder(service, cache)(file_id, "final.txt")
+    assert file_id not in find(name="draft")
+    assert find(name="final")[file_id]["name"] == "final.txt"
+
+
+def test_move_is_visible_at_once(drive, service, cache, index, find):
+    source, destination = drive.add_folder("source"), drive.add_folder("destination")
+    file_id = drive.add_file("report.txt", source)
+    index.sync(service)
+    file_and_folder.move_file_to_folder(service, cache)(file_id, destination)
+    assert file_id not in find(parent_folder_id=source)
+    assert file_id in find(parent_folder_id=destination)
+
+
+def test_trash_is_visible_at_once(drive, service, cache, index, find):
+    ids = [drive.add_file(f"old {i}.txt") for i in range(3)]
+    index.sync(service)
+    file_and_folder.delete_file_or_folder(service, cache)(ids[0])
+    batch.batch_delete(service, cache)(ids[1:])
+    assert not set(ids) & set(find(name="old"))
+    assert set(ids) <= set(find(name="old", trashed=True))
+
+
+def test_reads_do_not_force_a_sync(drive, service, cache, index, find):
+    file_id = drive.add_file("notes.txt")
+    index.sync(service)
+    file_and_folder.get_file_metadata(service, cache)(file_id)
+    before = drive.request_count
+    find(name="notes")
+    assert drive.request_count == before
+
+
+def test_name_matches_by_prefix_like_drive(drive, service, index, find):
+    ids = {name: drive.add_file(name) for name in ("plan.txt", "Plans 2024.txt", "old plan.txt")}
+    index.sync(service)
+    from_api = search.search_files(service, index)(name="plan", source="api")["data"]["files"]
+    assert set(find(name="plan")) == {file["id"] for file in from_api} == {ids["plan.txt"], ids["Plans 2024.txt"]}
+
+
+def test_index_results_page_with_a_cursor(drive, service, index):
+    folder = drive.add_folder("reports")
+    ids = {drive.add_file(f"report {i}.txt", folder) for i in range(5)}
+    index.sync(service)
+    tool = search.search_files(service, index)
+    seen, cursor, pages = [], None, 0
+    while True:
+        response = tool(parent_folder_id=folder, limit=2, cursor=cursor)["data"]
+        assert response["source"] == "index"
+        seen.extend(file["id"] for file in response["files"])
+        pages += 1
+        cursor = response["nextCursor"]
+        if cursor is None:
+            break
+    assert pages == 3
+    assert sorted(seen) == sorted(ids)
+
+
+def test_searches_are_not_blocked_by_a_seed(tmp_path, drive, service):
+    # Each page of the crawl checks from another thread that the index still answers at once.
+    index = FileIndex(str(tmp_path / "index.sqlite"), sync_interval=3600)
+    answered = []
+
+    def latency(method, path, params):
+        if path.endswith("/files") and method == "GET":
+            reader = threading.Thread(target=lambda: answered.append((index.is_seeded(), index.count())))
+            reader.start()
+            reader.join(timeout=2)
+        return 0
+    for i in range(3):
+        drive.add_file(f"file {i}.txt")
+    drive.latency = latency
+    try:
+        index.seed(service)
+    finally:
+        drive.latency = 0
+        index.close()
+    assert answered and all(seeded is False for seeded, _ in answered)
@@ -0,0 +1,80 @@
+from fake_drive import FOLDER_MIME_TYPE
+from tools import folder_tree
+
+
+def snapshot(drive, folder_id, path=""):
+    # {relative path: content} for everything under folder_id, with folders mapped to None.
+    items = {}
+    for file in list(drive.files.values()):
+        if folder_id in file.get("parents", []) and not file.get("trashed"):
+            relative = f"{path}/{file['name']}"
+            if file["mimeType"] == FOLDER_MIME_TYPE:
+                items[relative] = None
+                items.update(snapshot(drive, file["id"], relative))
+            else:
+                items[relative] = drive.content.get(file["id"])
+    return items
+
+
+def count_batches(drive, monkeypatch):
+    handle, batches = drive.handle, []
+
+    def counting(uri, method, body, headers):
+        if "/batch/" in uri:
+            batches.append(body)
+        return handle(uri, method, body, headers)
+    monkeypatch.setattr(drive, "handle", counting)
+    return batches
+
+
+def test_copy_matches_the_source(drive, service):
+    source = drive.add_tree(depth=2, folders_per_level=2, files_per_folder=3)
+    destination = drive.add_folder("destination")
+    response = folder_tree.copy_folder_tree(service)(source, destination)
+    assert response["data"]["status"] == "completed", response
+    assert snapshot(drive, response["data"]["rootFolderId"]) == snapshot(drive, source)
+
+
+def test_folders_are_created_one_batch_per_level(drive, service, monkeypatch):
+    # 3 + 9 + 27 folders: one batch per parent would take 13 round trips, one per level takes 3.
+    source = drive.add_tree(depth=3, folders_per_level=3, files_per_folder=0)
+    batches = count_batches(drive, monkeypatch)
+    response = folder_tree.copy_folder_tree(service)(source, drive.add_folder("destination"))
+    assert response["data"]["status"] == "completed", response
+    assert len(response["data"]["folders"]) == 1 + 3 + 9 + 27
+    assert len(batches) == 3
+
+
+def test_interrupted_copy_resumes(drive, service, monkeypatch):
+    source = drive.add_tree(depth=2, folders_per_level=2, files_per_folder=3)
+    handle, batches = drive.handle, []
+
+    def dropping(uri, method, body, headers):
+        if "/batch/" in uri:
+            batches.append(body)
+            if len(batches) == 2:
+                raise RuntimeError("connection dropped")
+        return handle(uri, method, body, headers)
+    monkeypatch.setattr(drive, "handle", dropping)
+    copy = folder_tree.copy_folder_tree(service)
+    failed = copy(source, drive.add_folder("destination"))
+    assert failed["status"] == "error"
+    job_id = failed["error"]["details"]["jobId"]
+    assert folder_tree.get_folder_job_status()(job_id)["data"]["status"] == "interrupted"
+
+    response = copy(job_id=job_id)
+    assert response["data"]["status"] == "completed", response
+    assert snapshot(drive, response["data"]["rootFolderId"]) == snapshot(drive, source)
+
+
+def test_failed_items_are_retried_on_resume(drive, service):
+    source = drive.add_tree(depth=1, folders_per_level=2, files_per_folder=3)
+    copy = folder_tree.copy_folder_tree(service)
+    drive.fail_next(400, count=2, match="/copy")
+    response = copy(source, drive.add_folder("destination"))
+    assert response["data"]["status"] == "completed_with_errors"
+    assert len(response["data"]["failed"]) == 2
+
+    response = copy(job_id=response["data"]["jobId"])
+    assert response["data"]["status"] == "completed", response
+    assert snapshot(drive, response["data"]["rootFolderId"]) == snapshot(drive, source)
@@ -0,0 +1,91 @@
+import gzip
+
+import httplib2
+import httpx
+import pytest
+
+from utils.http_transport import HttpxHttp, HttpxTransport
+
+
+@pytest.fixture
+def transport():
+    # HttpxTransport on an httpx.MockTransport; routes maps (method, path) to a handler.
+    routes, sent = {}, []
+
+    def handle(request):
+        sent.append(request)
+        return routes[(request.method, request.url.path)](request)
+    transport = HttpxTransport(http2=False)
+    transport._options["transport"] = httpx.MockTransport(handle)
+    transport.routes, transport.sent = routes, sent
+    yield transport
+    transport.close()
+
+
+def test_status_headers_and_body_are_translated(transport):
+    transport.routes["GET", "/files/a"] = lambda request: httpx.Response(
+        404, headers=[("Content-Type", "application/json"), ("Vary", "Origin"), ("Vary", "X-Origin")],
+        content=b'{"error": {"code": 404}}')
+    response, content = HttpxHttp(transport).request("https://drive.test/files/a")
+    assert isinstance(response, httplib2.Response)
+    assert response.status == 404
+    assert response["status"] == "404"
+    assert response.reason == "Not Found"
+    assert response.version == 11
+    # Header names are lower-cased and repeated headers folded, as httplib2 does.
+    assert response["content-type"] == "application/json"
+    assert response["vary"] == "Origin, X-Origin"
+    assert content == b'{"error": {"code": 404}}'
+    assert transport.stats()["requests"] == 1
+    assert transport.stats()["httpVersions"] == {"HTTP/1.1": 1}
+
+
+def test_decoded_bodies_report_their_decoded_length(transport):
+    body = b"hello " * 100
+    transport.routes["GET", "/files/a"] = lambda request: httpx.Response(
+        200, headers={"Content-Encoding": "gzip"}, content=gzip.compress(body))
+    response, content = transport.request("GET", "https://drive.test/files/a")
+    assert content == body
+    assert "content-encoding" not in response
+    assert response["-content-encoding"] == "gzip"
+    assert response["content-length"] == str(len(body))
+
+
+def test_request_body_and_headers_are_sent(transport):
+    transport.routes["POST", "/upload"] = lambda request: httpx.Response(200, json={"id": "new"})
+    response, content = HttpxHttp(transport).request("https://drive.test/upload", "POST", body="payload",
+                                                     headers={"content-type": "text/plain", "x-count": 3})
+    assert response.status == 200
+    assert content == b'{"id":"new"}'
+    request = transport.sent[0]
+    assert request.content == b"payload"
+    assert request.headers["content-type"] == "text/plain"
+    assert request.headers["x-count"] == "3"
+
+
+def test_only_safe_requests_follow_redirects(transport):
+    transport.routes["GET", "/old"] = lambda request: httpx.Response(302, headers={"Location": "/new"})
+    transport.routes["GET", "/new"] = lambda request: httpx.Response(200, content=b"moved")
+    transport.routes["PUT", "/upload"] = lambda request: httpx.Response(308, headers={"Location": "/elsewhere",
+                                                                                      "Range": "bytes=0-99"})
+    response, content = transport.request("GET", "https://drive.test/old")
+    assert (response.status, content) == (200, b"moved")
+    # A resumable upload's 308 is a progress report, returned as is.
+    response, content = transport.request("PUT", "https://drive.test/upload", body=b"x" * 100)
+    assert response.status == 308
+    assert response["range"] == "bytes=0-99"
+
+
+def test_transport_errors_become_connection_errors(transport):
+    def refuse(request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    def stall(request):
+        raise httpx.ReadTimeout("timed out", request=request)
+    transport.routes["GET", "/refused"], transport.routes["GET", "/stalled"] = refuse, stall
+    with pytest.raises(ConnectionError):
+        transport.request("GET", "https://drive.test/refused")
+    with pytest.raises(TimeoutError):
+        transport.request("GET", "https://drive.test/stalled")
+    assert transport.stats()["errors"] == 2
+    assert transport.stats()["inFlight"] == 0
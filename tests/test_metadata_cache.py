@@ -0,0 +1,139 @@
+import pytest
+
+from tools import batch, file_and_folder, permissions
+from utils.metadata_cache import MetadataCache
+
+
+@pytest.fixture
+def get_metadata(service, cache, drive):
+    tool = file_and_folder.get_file_metadata(service, cache)
+
+    def get(file_id, fields="id, name, parents, trashed"):
+        before = drive.request_count
+        response = tool(file_id, fields=fields)
+        assert response["status"] == "success", response
+        return response["data"], drive.request_count > before
+    return get
+
+
+def emails(file):
+    return {p.get("emailAddress") for p in file["permissions"]}
+
+
+def test_repeated_lookup_is_served_from_cache(drive, get_metadata):
+    file_id = drive.add_file("notes.txt")
+    first, fetched = get_metadata(file_id)
+    second, fetched_again = get_metadata(file_id)
+    assert fetched and not fetched_again
+    assert first == second
+
+
+def test_rename_is_never_served_stale(drive, service, cache, get_metadata):
+    file_id = drive.add_file("before.txt")
+    get_metadata(file_id)
+    assert file_and_folder.rename_file_or_folder(service, cache)(file_id, "after.txt")["status"] == "success"
+    file, fetched = get_metadata(file_id)
+    assert fetched
+    assert file["name"] == "after.txt"
+
+
+def test_move_is_never_served_stale(drive, service, cache, get_metadata):
+    source, destination = drive.add_folder("source"), drive.add_folder("destination")
+    file_id = drive.add_file("report.txt", source)
+    get_metadata(file_id)
+    assert file_and_folder.move_file_to_folder(service, cache)(file_id, destination)["status"] == "success"
+    file, fetched = get_metadata(file_id)
+    assert fetched
+    assert file["parents"] == [destination]
+
+
+def test_trash_and_restore_are_never_served_stale(drive, service, cache, get_metadata):
+    file_id = drive.add_file("old.txt")
+    assert get_metadata(file_id)[0]["trashed"] is False
+    assert file_and_folder.delete_file_or_folder(service, cache)(file_id)["status"] == "success"
+    assert get_metadata(file_id)[0]["trashed"] is True
+    assert file_and_folder.restore_file_or_folder(service, cache)(file_id)["status"] == "success"
+    assert get_metadata(file_id)[0]["trashed"] is False
+
+
+def test_permanent_delete_is_never_served_stale(drive, service, cache):
+    file_id = drive.add_file("gone.txt")
+    get = file_and_folder.get_file_metadata(service, cache)
+    assert get(file_id)["status"] == "success"
+    assert file_and_folder.permanently_delete_file_or_folder(service, cache)(file_id)["status"] == "success"
+    assert get(file_id)["error"]["code"] == 404
+
+
+def test_batch_mutations_are_never_served_stale(drive, service, cache, get_metadata):
+    destination = drive.add_folder("destination")
+    ids = [drive.add_file(f"file {i}.txt") for i in range(3)]
+    for file_id in ids:
+        get_metadata(file_id)
+    batch.batch_rename(service, cache)([{"file_id": ids[0], "new_name": "renamed.txt"}])
+    batch.batch_move(service, cache)([ids[1]], destination)
+    batch.batch_delete(service, cache)([ids[2]])
+    assert get_metadata(ids[0])[0]["name"] == "renamed.txt"
+    assert get_metadata(ids[1])[0]["parents"] == [destination]
+    assert get_metadata(ids[2])[0]["trashed"] is True
+
+
+def test_add_permission_is_never_served_stale(drive, service, cache, get_metadata):
+    file_id = drive.add_file("shared.txt")
+    assert "friend@example.com" not in emails(get_metadata(file_id, "id, permissions")[0])
+    assert permissions.add_permission(service, cache)(file_id, "friend@example.com")["status"] == "success"
+    file, fetched = get_metadata(file_id, "id, permissions")
+    assert fetched
+    assert "friend@example.com" in emails(file)
+
+
+def test_batch_add_permission_is_never_served_stale(drive, service, cache, get_metadata):
+    file_id = drive.add_file("shared.txt")
+    get_metadata(file_id, "id, permissions")
+    result = batch.batch_add_permission(service, cache)([{"file_id": file_id, "email": "team@example.com"}])
+    assert result["status"] == "success", result
+    assert "team@example.com" in emails(get_metadata(file_id, "id, permissions")[0])
+
+
+def test_sharing_a_folder_drops_its_cached_descendants(drive, service, cache, get_metadata):
+    # Inherited access changes every descendant's permissions, not only the folder's.
+    folder = drive.add_folder("project")
+    child = drive.add_file("plan.txt", folder)
+    get_metadata(folder, "id, parents, permissions")
+    get_metadata(child, "id, parents, permissions")
+    assert permissions.share_tree(service, cache)(folder, "reader@example.com")["status"] == "success"
+    file, fetched = get_metadata(child, "id, parents, permissions")
+    assert fetched
+    assert "reader@example.com" in emails(file)
+
+
+def test_failed_mutation_still_invalidates(drive, service, cache, get_metadata):
+    file_id = drive.add_file("flaky.txt")
+    get_metadata(file_id)
+    drive.fail_next(400, match="PATCH")
+    assert file_and_folder.rename_file_or_folder(service, cache)(file_id, "new.txt")["status"] == "error"
+    assert get_metadata(file_id)[1]
+
+
+def test_wildcard_mask_is_cached_in_full(drive, get_metadata):
+    file_id = drive.add_file("everything.txt")
+    first, fetched = get_metadata(file_id, "*")
+    second, fetched_again = get_metadata(file_id, "*")
+    assert fetched and not fetched_again
+    assert second == first
+    assert second["name"] == "everything.txt"
+
+
+def test_wildcard_entry_answers_plain_fields_only():
+    cache = MetadataCache()
+    cache.put("a", "*", {"id": "a", "name": "x", "owners": [{"emailAddress": "me@example.com", "me": True}]},
+              cache.version())
+    assert cache.get("a", "id, name") == {"id": "a", "name": "x"}
+    assert cache.get("a", "owners(emailAddress)") is None
+
+
+def test_fetch_racing_an_invalidation_is_not_stored():
+    cache = MetadataCache()
+    version = cache.version()
+    cache.invalidate("a")
+    cache.put("a", "id, name", {"id": "a", "name": "old"}, version)
+    assert cache.get("a", "id, name") is None
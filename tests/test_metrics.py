@@ -0,0 +1,116 @@
+import urllib.error
+import urllib.request
+
+import pytest
+
+from utils.metrics import LATENCY_BUCKETS, Histogram, MetricsRegistry, start_metrics_server
+
+
+@pytest.fixture
+def metrics():
+    return MetricsRegistry(profile_sample_rate=0)
+
+
+def test_observations_land_in_the_first_bucket_that_holds_them():
+    histogram = Histogram((1, 5, 10))
+    for value in (0, 1, 1.5, 5, 10, 11, 1000):
+        histogram.observe(value)
+    # Bounds are inclusive; the last slot is +Inf.
+    assert histogram.counts == [2, 2, 1, 2]
+    assert histogram.count == 7
+    assert histogram.sum == 1028.5
+
+
+def test_quantiles_interpolate_inside_the_bucket():
+    histogram = Histogram((1, 5, 10))
+    assert histogram.quantile(0.5) is None
+    for value in (0.5, 2, 3, 4, 8):
+        histogram.observe(value)
+    assert histogram.quantile(0.2) == 1
+    assert histogram.quantile(0.5) == pytest.approx(1 + 4 * 1.5 / 3)
+    assert histogram.quantile(1) == 10
+    histogram.observe(50)
+    # Past the last bound there is nothing to interpolate against.
+    assert histogram.quantile(1) == 10
+
+
+def test_summary():
+    histogram = Histogram(LATENCY_BUCKETS)
+    assert histogram.summary() == {"count": 0, "sum": 0.0, "avg": None, "p50": None, "p95": None, "p99": None}
+    for value in (0.002, 0.004):
+        histogram.observe(value)
+    summary = histogram.summary()
+    assert (summary["count"], summary["sum"], summary["avg"]) == (2, 0.006, 0.003)
+    assert summary["p50"] == 0.0025
+
+
+def test_instrument_counts_error_responses(metrics):
+    @metrics.instrument
+    def lookup(file_id):
+        metrics.record_drive_call("drive.files.get", 0.02, response_bytes=100)
+        if file_id == "missing":
+            return {"status": "error", "error": {"message": "File not found", "code": 404}}
+        return {"status": "success", "data": {"id": file_id}}
+
+    assert lookup(file_id="a")["status"] == "success"
+    assert lookup(file_id="missing")["status"] == "error"
+    assert lookup.__name__ == "lookup"
+    stats = metrics.snapshot()["tools"]["lookup"]
+    assert stats["errors"] == 1
+    assert stats["latencySeconds"]["count"] == 2
+    assert stats["driveCallsPerInvocation"]["sum"] == 2
+    assert stats["requestBytes"]["sum"] == len('{"file_id": "a"}') + len('{"file_id": "missing"}')
+    drive = metrics.snapshot()["driveMethods"]["drive.files.get"]
+    assert (drive["errors"], drive["responseBytes"]) == (0, 200)
+
+
+def test_instrument_reraises_without_recording(metrics):
+    @metrics.instrument
+    def broken():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        broken()
+    assert metrics.snapshot()["tools"] == {}
+
+
+def test_drive_calls_outside_a_tool_are_not_attributed(metrics):
+    metrics.record_drive_call("drive.files.list", 0.1, request_bytes=10, error=True)
+    assert metrics.snapshot()["driveMethods"]["drive.files.list"]["errors"] == 1
+    assert metrics.snapshot()["tools"] == {}
+
+
+def test_prometheus_text_exposition(metrics):
+    @metrics.instrument
+    def fail():
+        return {"status": "error", "error": {"message": "nope", "code": 500}}
+
+    fail()
+    metrics.record_drive_call('drive.files."get"', 0.003, error=True)
+    lines = metrics.prometheus_text({"gdrive_cache_entries": 3}).splitlines()
+    assert "# TYPE gdrive_tool_latency_seconds histogram" in lines
+    assert "# TYPE gdrive_tool_errors_total counter" in lines
+    assert 'gdrive_tool_errors_total{tool="fail"} 1' in lines
+    # Buckets are cumulative and end with +Inf equal to the count.
+    buckets = [line for line in lines if line.startswith('gdrive_drive_request_latency_seconds_bucket{')]
+    assert len(buckets) == len(LATENCY_BUCKETS) + 1
+    assert buckets[0] == 'gdrive_drive_request_latency_seconds_bucket{method="drive.files.\\"get\\"",le="0.005"} 1'
+    assert all(line.endswith(" 1") for line in buckets)
+    assert buckets[-1].endswith('le="+Inf"} 1')
+    assert 'gdrive_drive_request_latency_seconds_count{method="drive.files.\\"get\\""} 1' in lines
+    assert 'gdrive_drive_errors_total{method="drive.files.\\"get\\""} 1' in lines
+    assert lines[-2:] == ["# TYPE gdrive_cache_entries gauge", "gdrive_cache_entries 3"]
+
+
+def test_metrics_server_serves_the_exposition():
+    server = start_metrics_server(0, lambda: "gdrive_up 1\n")
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with urllib.request.urlopen(f"{url}/metrics") as response:
+            assert response.read() == b"gdrive_up 1\n"
+            assert response.headers["Content-Type"].startswith("text/plain")
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"{url}/other")
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,63 @@
+import base64
+import json
+
+import pytest
+
+from fake_drive import FakeDrive
+from tools import search
+from utils.pagination import decode_cursor, encode_cursor
+
+STATE = {"q": "name contains 'it\\'s'", "fields": ["id", "name"], "pageSize": 20, "pageToken": "40", "offset": 3}
+
+
+def raw_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(STATE)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == STATE
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor!",
+    base64.urlsafe_b64encode(b"{not json").decode(),
+    raw_cursor([1, 2]),
+    raw_cursor({"fields": ["id"]}),
+    raw_cursor({**STATE, "pageSize": 0}),
+    raw_cursor({**STATE, "pageSize": "20"}),
+    raw_cursor({**STATE, "fields": "id"}),
+    raw_cursor({**STATE, "offset": -1}),
+    raw_cursor({**STATE, "source": "index"})
+])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("cursor", ["not a cursor!", raw_cursor({**STATE, "offset": -1}),
+                                    raw_cursor({**STATE, "source": "index", "filters": {"query": "x"}})])
+def test_search_rejects_a_bad_cursor_with_400(service, cursor):
+    response = search.search_files(service)(cursor=cursor)
+    assert response["error"]["code"] == 400
+    assert "cursor" in response["error"]["message"]
+
+
+def test_cursor_walk_covers_every_file_once():
+    # Drive returns at most 2 files a page here, so cursors also have to point inside a page.
+    drive = FakeDrive(page_size_limit=2)
+    folder = drive.add_folder("reports")
+    ids = [drive.add_file(f"report {i}.txt", folder) for i in range(8)]
+    tool = search.search_files(drive.service())
+    seen, cursor, pages = [], None, 0
+    while True:
+        response = tool(parent_folder_id=folder, limit=3, source="api", cursor=cursor)["data"]
+        assert len(response["files"]) == (3 if response["nextCursor"] else 2)
+        seen.extend(file["id"] for file in response["files"])
+        pages += 1
+        cursor = response["nextCursor"]
+        if cursor is None:
+            break
+    assert pages == 3
+    assert seen == ids
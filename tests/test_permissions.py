@@ -0,0 +1,69 @@
+from tools import permissions
+
+
+def explicit_emails(drive, file_id):
+    return {p.get("emailAddress") for p in drive.permissions.get(file_id, [])}
+
+
+def hide_permissions(drive, monkeypatch, file_ids):
+    # Drive leaves permissions out of listings for items the caller cannot share, such as some
+    # shared drive items, so share_tree has to fetch them separately.
+    public = drive._public
+
+    def without_permissions(file):
+        resource = public(file)
+        if file["id"] in file_ids:
+            del resource["permissions"]
+        return resource
+    monkeypatch.setattr(drive, "_public", without_permissions)
+
+
+def test_share_tree_grants_on_the_folder_only(drive, service, cache):
+    folder = drive.add_folder("project")
+    child_folder = drive.add_folder("docs", folder)
+    files = [drive.add_file("plan.txt", folder), drive.add_file("notes.txt", child_folder)]
+    response = permissions.share_tree(service, cache)(folder, "reader@example.com")
+    assert response["status"] == "success", response
+    assert response["data"]["inheritingFiles"] == 3
+    assert response["data"]["explicitlyShared"] == 0
+    assert "reader@example.com" in explicit_emails(drive, folder)
+    assert all("reader@example.com" not in explicit_emails(drive, f) for f in files + [child_folder])
+
+
+def test_share_tree_reads_missing_permissions_in_batches(drive, service, cache, monkeypatch):
+    folder = drive.add_folder("project")
+    hidden = drive.add_file("shared drive item.txt", folder)
+    hide_permissions(drive, monkeypatch, {hidden})
+    response = permissions.share_tree(service, cache)(folder, "reader@example.com")
+    assert response["data"]["inheritingFiles"] == 1
+    assert response["data"]["unreadableFileIds"] == []
+
+
+def test_share_tree_never_grants_on_unreadable_items(drive, service, cache, monkeypatch):
+    folder = drive.add_folder("project")
+    hidden_folder = drive.add_folder("restricted", folder)
+    hidden_file = drive.add_file("secret.txt", folder)
+    nested = drive.add_file("nested.txt", hidden_folder)
+    hide_permissions(drive, monkeypatch, {hidden_folder, hidden_file})
+    drive.fail_next(403, match=f"/files/{hidden_folder}/permissions")
+    drive.fail_next(403, match=f"/files/{hidden_file}/permissions")
+
+    response = permissions.share_tree(service, cache)(folder, "reader@example.com")
+    assert response["status"] == "success", response
+    # nested.txt can be read, but its parent cannot, so whether it inherits is unknown too.
+    assert sorted(response["data"]["unreadableFileIds"]) == sorted([hidden_folder, hidden_file, nested])
+    assert response["data"]["explicitlyShared"] == 0
+    for file_id in (hidden_folder, hidden_file, nested):
+        assert "reader@example.com" not in explicit_emails(drive, file_id)
+
+
+def test_audit_reports_unreadable_items(drive, service, monkeypatch):
+    folder = drive.add_folder("project")
+    hidden = drive.add_file("secret.txt", folder)
+    drive.add_file("plan.txt", folder)
+    hide_permissions(drive, monkeypatch, {hidden})
+    drive.fail_next(403, match=f"/files/{hidden}/permissions")
+    response = permissions.audit_permissions(service)(folder)
+    assert response["data"]["unreadableFileIds"] == [hidden]
+    assert response["data"]["inheritingFiles"] == 1
+    assert response["data"]["restrictedAccess"] == []
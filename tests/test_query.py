@@ -0,0 +1,105 @@
+import pytest
+
+from utils.query_builder import FOLDER_MIME_TYPE, build_query_string, query_terms
+from utils.query_planner import plan_query
+
+
+@pytest.mark.parametrize("exclude, clause", [
+    ({"name": "draft"}, "not name contains 'draft'"),
+    ({"name": "draft.txt", "exact_name": True}, "name != 'draft.txt'"),
+    ({"mime_type": "text/csv"}, "mimeType != 'text/csv'"),
+    ({"folders_only": True}, f"mimeType != '{FOLDER_MIME_TYPE}'"),
+    ({"modified_after": "2024-01-01"}, "modifiedTime <= '2024-01-01'"),
+    ({"modified_before": "2024-01-01"}, "modifiedTime >= '2024-01-01'"),
+    ({"starred": True}, "starred != true"),
+    ({"parent_folder_id": "abc"}, "not 'abc' in parents"),
+    ({"owner_email": "me@example.com"}, "not 'me@example.com' in owners"),
+    ({"contains_text": "secret"}, "not fullText contains 'secret'")
+])
+def test_exclude_negates_each_clause(exclude, clause):
+    assert query_terms(exclude=exclude)[-1][1] == clause
+
+
+def test_exclude_drops_files_matching_any_filter():
+    terms = query_terms(name="report", exclude={"mime_type": "text/csv", "starred": True})
+    assert terms == [("nameContains", "name contains 'report'"), ("exclude", "mimeType != 'text/csv'"),
+                     ("exclude", "starred != true")]
+
+
+def test_excluded_text_stays_a_full_text_clause():
+    # The planner must keep it with the fullText clauses rather than in its metadata probe.
+    assert query_terms(exclude={"contains_text": "secret"})[0][0] == "fullText"
+
+
+def test_any_of_groups_are_or_ed_and_their_filters_and_ed():
+    query = build_query_string(trashed=False, any_of=[{"mime_type": "text/csv"},
+                                                      {"name": "plan", "starred": True}])
+    assert query == "trashed = false and (mimeType = 'text/csv' or (name contains 'plan' and starred = true))"
+
+
+def test_single_any_of_group_needs_no_parentheses():
+    assert query_terms(any_of=[{"name": "plan"}]) == [("anyOf", "name contains 'plan'")]
+
+
+def test_any_of_with_text_is_a_full_text_clause():
+    assert query_terms(any_of=[{"contains_text": "budget"}, {"name": "budget"}])[0][0] == "fullText"
+
+
+@pytest.mark.parametrize("filters", [
+    {"any_of": [{}]},
+    {"any_of": [{"trashed": True}]},
+    {"any_of": [{"starred": None}]},
+    {"exclude": {"custom_properties": {"team": "finance"}}}
+])
+def test_invalid_groups_are_rejected(filters):
+    with pytest.raises(ValueError):
+        query_terms(**filters)
+
+
+def test_literals_are_escaped():
+    assert build_query_string(name="it's a \\ path") == "name contains 'it\\'s a \\\\ path'"
+
+
+def listed(service, query):
+    return {file["id"] for file in service.files().list(q=query, fields="files(id)").execute()["files"]}
+
+
+def test_plan_without_full_text_is_a_single_query(drive, service):
+    before = drive.request_count
+    query, plan = plan_query(service, query_terms(name="plan", starred=True))
+    assert plan["strategy"] == "single"
+    assert query == "name contains 'plan' and starred = true"
+    assert drive.request_count == before
+
+
+def test_plan_with_unselective_filters_runs_unscoped(drive, service):
+    before = drive.request_count
+    query, plan = plan_query(service, query_terms(contains_text="budget", trashed=False))
+    assert plan["strategy"] == "single"
+    assert plan["steps"] == []
+    assert drive.request_count == before
+
+
+def test_plan_is_empty_when_no_file_matches_the_metadata_filters(drive, service):
+    drive.add_file("notes.txt", content=b"budget")
+    query, plan = plan_query(service, query_terms(name="plan.txt", exact_name=True, contains_text="budget"))
+    assert query is None
+    assert plan["strategy"] == "empty"
+    assert plan["steps"][0]["candidates"] == 0
+
+
+def test_scoped_plan_matches_the_same_files(drive, service):
+    folders = [drive.add_folder(f"team {i}") for i in range(3)]
+    for folder in folders:
+        drive.add_file("plan.txt", folder, content=b"budget for the year")
+        drive.add_file("plan.txt", folder, content=b"holiday rota")
+        drive.add_file("other.txt", folder, content=b"budget")
+    drive.add_file("plan.txt", content=b"budget", starred=True)
+    terms = query_terms(name="plan.txt", exact_name=True, contains_text="budget", exclude={"starred": True})
+
+    query, plan = plan_query(service, terms)
+    assert plan["strategy"] == "scoped"
+    assert all(f"'{folder}' in parents" in query for folder in folders)
+    assert listed(service, query) == listed(service, build_query_string(
+        name="plan.txt", exact_name=True, contains_text="budget", exclude={"starred": True}))
+    assert len(listed(service, query)) == 3
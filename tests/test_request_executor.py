@@ -0,0 +1,133 @@
+import email.utils
+import time
+
+import pytest
+from googleapiclient.errors import HttpError
+
+from utils import request_executor
+from utils.request_executor import RequestExecutor, TokenBucket
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    # Backoff waits are recorded instead of slept.
+    sleeps = []
+    monkeypatch.setattr(request_executor.time, "sleep", sleeps.append)
+    return sleeps
+
+
+@pytest.fixture
+def executor(sleeps):
+    return RequestExecutor(qps=0, max_retries=3, base_delay=1, max_delay=30)
+
+
+@pytest.fixture
+def file_id(drive):
+    return drive.add_file("notes.txt")
+
+
+def get(service, file_id):
+    return service.files().get(fileId=file_id, fields="id, name")
+
+
+@pytest.mark.parametrize("status", [429, 500, 502, 503])
+def test_retryable_statuses_are_retried(drive, service, executor, sleeps, file_id, status):
+    drive.fail_next(status, count=2)
+    assert executor.execute(get(service, file_id))["name"] == "notes.txt"
+    assert len(sleeps) == 2
+    metrics = executor.metrics()
+    assert metrics["retries"] == 2
+    assert metrics["retriesByStatus"] == {str(status): 2}
+    assert metrics["failures"] == 0
+
+
+def test_backoff_is_jittered_and_doubles(drive, service, executor, file_id, monkeypatch):
+    bounds = []
+
+    def uniform(low, high):
+        bounds.append((low, high))
+        return high / 2
+    monkeypatch.setattr(request_executor.random, "uniform", uniform)
+    drive.fail_next(503, count=3)
+    executor.execute(get(service, file_id))
+    assert bounds == [(0, 1), (0, 2), (0, 4)]
+
+
+def test_backoff_is_capped(executor, monkeypatch):
+    monkeypatch.setattr(request_executor.random, "uniform", lambda low, high: high)
+    assert executor.backoff_delay(10) == 30
+
+
+def test_gives_up_after_the_last_retry(drive, service, executor, sleeps, file_id):
+    drive.fail_next(500, count=10)
+    before = drive.request_count
+    with pytest.raises(HttpError) as raised:
+        executor.execute(get(service, file_id))
+    assert raised.value.resp.status == 500
+    assert drive.request_count - before == 4
+    assert len(sleeps) == 3
+    assert executor.metrics()["failures"] == 1
+
+
+@pytest.mark.parametrize("retry_after", ["7", "http-date"])
+def test_retry_after_is_honoured(drive, service, executor, sleeps, file_id, monkeypatch, retry_after):
+    monkeypatch.setattr(request_executor.random, "uniform", lambda low, high: 0.0)
+    if retry_after == "http-date":
+        retry_after = email.utils.formatdate(time.time() + 7, usegmt=True)
+    drive.fail_next(429, headers={"retry-after": retry_after})
+    executor.execute(get(service, file_id))
+    assert 5 < sleeps[0] <= 7
+
+
+def test_retry_after_is_capped(drive, service, executor, sleeps, file_id):
+    drive.fail_next(503, headers={"retry-after": "3600"})
+    executor.execute(get(service, file_id))
+    assert sleeps == [30]
+
+
+@pytest.mark.parametrize("reason", ["rateLimitExceeded", "userRateLimitExceeded"])
+def test_rate_limited_403_is_retried(drive, service, executor, sleeps, file_id, reason):
+    drive.fail_next(403, reason=reason)
+    assert executor.execute(get(service, file_id))["id"] == file_id
+    assert executor.metrics()["retriesByStatus"] == {"403": 1}
+
+
+def test_other_errors_are_not_retried(drive, service, executor, sleeps, file_id):
+    drive.fail_next(403)
+    with pytest.raises(HttpError):
+        executor.execute(get(service, file_id))
+    with pytest.raises(HttpError):
+        executor.execute(get(service, "missing"))
+    assert sleeps == []
+    assert executor.metrics()["failures"] == 2
+
+
+def test_token_bucket_throttles_past_the_burst():
+    bucket = TokenBucket(rate=20, capacity=2)
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    started = time.monotonic()
+    assert 0.03 < bucket.acquire() <= 0.05
+    assert time.monotonic() - started >= 0.03
+
+
+def test_executor_reports_throttling(drive, service, file_id, sleeps):
+    executor = RequestExecutor(qps=10, burst=1, max_retries=0)
+    for _ in range(3):
+        executor.execute(get(service, file_id))
+    metrics = executor.metrics()
+    assert metrics["qpsLimit"] == 10
+    assert metrics["throttledRequests"] == 2
+    assert sleeps and all(0 < wait <= 0.2 for wait in sleeps)
+
+
+def test_writes_are_counted_even_when_they_fail(drive, service, executor, file_id):
+    executor.execute(get(service, file_id))
+    assert executor.writes == 0
+    executor.execute(service.files().update(fileId=file_id, body={"name": "renamed.txt"}))
+    assert executor.writes == 1
+    drive.fail_next(400, match="PATCH")
+    with pytest.raises(HttpError):
+        executor.execute(service.files().update(fileId=file_id, body={"name": "again.txt"}))
+    assert executor.writes == 2
+    assert executor.metrics()["writes"] == 2
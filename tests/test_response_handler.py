@@ -0,0 +1,107 @@
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from tools import file_and_folder, search
+from utils.response_handler import FIELD_PROFILES, resolve_fields, shape_items, split_fields
+
+PROFILE_KEYS = {
+    "minimal": ["id", "name", "mimeType"],
+    "standard": ["id", "name", "mimeType", "size", "modifiedTime", "parents"],
+    "full": ["id", "name", "mimeType", "size", "createdTime", "modifiedTime", "owners", "parents", "webViewLink",
+             "md5Checksum", "starred", "trashed"]
+}
+
+
+@pytest.fixture
+def masks(drive, monkeypatch):
+    # The fields parameter of every request the fake Drive receives.
+    handle, masks = drive.handle, []
+
+    def recording(uri, method, body, headers):
+        masks.extend(parse_qs(urlsplit(uri).query).get("fields", []))
+        return handle(uri, method, body, headers)
+    monkeypatch.setattr(drive, "handle", recording)
+    return masks
+
+
+@pytest.fixture
+def files(drive):
+    folder = drive.add_folder("reports")
+    return [drive.add_file(f"report {i}.txt", folder, content=b"x" * i) for i in range(3)]
+
+
+def test_profiles_grow_from_minimal_to_full():
+    assert set(FIELD_PROFILES["minimal"]) < set(FIELD_PROFILES["standard"]) < set(FIELD_PROFILES["full"])
+    assert "owners(displayName, emailAddress)" in FIELD_PROFILES["full"]
+
+
+def test_resolve_fields():
+    assert resolve_fields(None, "minimal") == FIELD_PROFILES["minimal"]
+    assert resolve_fields("id, owners(emailAddress, me), name", "full") == ["id", "owners(emailAddress, me)", "name"]
+    assert resolve_fields(["id"], "full") == ["id"]
+    assert resolve_fields() == FIELD_PROFILES["standard"]
+    assert resolve_fields(default=["id", "name"]) == ["id", "name"]
+    resolve_fields(None, "minimal").append("size")
+    assert FIELD_PROFILES["minimal"] == ["id", "name", "mimeType"]
+    with pytest.raises(ValueError):
+        resolve_fields(None, "everything")
+
+
+def test_split_fields_keeps_nested_masks_whole():
+    assert split_fields("id,owners(displayName, emailAddress), permissions(role,emailAddress) ,name") == \
+        ["id", "owners(displayName, emailAddress)", "permissions(role,emailAddress)", "name"]
+
+
+@pytest.mark.parametrize("profile", list(FIELD_PROFILES))
+def test_list_files_requests_and_returns_the_profile(service, files, masks, profile):
+    response = search.list_files(service)(page_size=100, profile=profile)
+    assert response["status"] == "success", response
+    assert masks == [f"nextPageToken, files({', '.join(FIELD_PROFILES[profile])})"]
+    assert len(response["data"]["files"]) == 4
+    for file in response["data"]["files"]:
+        assert set(file) <= set(PROFILE_KEYS[profile])
+        assert {"id", "name", "mimeType"} <= set(file)
+
+
+@pytest.mark.parametrize("profile", list(FIELD_PROFILES))
+def test_metadata_requests_the_profile(service, cache, files, masks, profile):
+    response = file_and_folder.get_file_metadata(service, cache)(files[2], profile=profile)
+    assert masks == [", ".join(FIELD_PROFILES[profile])]
+    assert set(response["data"]) == set(PROFILE_KEYS[profile])
+    if profile == "full":
+        assert set(response["data"]["owners"][0]) == {"displayName", "emailAddress"}
+
+
+def test_unknown_profile_is_a_400(service, cache, files, masks):
+    assert file_and_folder.get_file_metadata(service, cache)(files[0], profile="huge")["error"]["code"] == 400
+    assert search.list_files(service)(profile="huge")["error"]["code"] == 400
+    assert masks == []
+
+
+def test_columns_layout_matches_records(service, files):
+    tool = search.search_files(service)
+    records = tool(name="report", profile="standard", source="api")["data"]["files"]
+    columns = tool(name="report", profile="standard", source="api", layout="columns")["data"]["files"]
+    assert columns["columns"] == PROFILE_KEYS["standard"]
+    assert [dict(zip(columns["columns"], row)) for row in columns["rows"]] == \
+        [{key: record.get(key) for key in PROFILE_KEYS["standard"]} for record in records]
+
+
+def test_shape_items():
+    items = [{"id": "a", "name": "x", "owners": [{"emailAddress": "me@example.com"}]}, {"id": "b"}]
+    assert shape_items(items) is items
+    assert shape_items(items, "columns", ["id", "owners(emailAddress)", "size"]) == {
+        "columns": ["id", "owners", "size"],
+        "rows": [["a", [{"emailAddress": "me@example.com"}], None], ["b", None, None]]
+    }
+    assert shape_items(items, "columns")["columns"] == ["id", "name", "owners"]
+    assert shape_items([], "columns", ["id"]) == {"columns": ["id"], "rows": []}
+    with pytest.raises(ValueError):
+        shape_items(items, "table")
+
+
+def test_unknown_layout_is_a_400(service, files, masks):
+    assert search.list_files(service)(layout="table")["error"]["code"] == 400
+    assert search.search_files(service)(layout="table")["error"]["code"] == 400
+    assert masks == []
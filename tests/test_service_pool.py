@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import time
+
+from utils.service_pool import ServicePool
+
+
+class Service:
+    # Stands in for a googleapiclient service; remembers the thread that built it.
+
+    def __init__(self):
+        self.thread = threading.get_ident()
+
+
+def run_concurrently(pool, fn, calls):
+    async def run():
+        return await asyncio.gather(*(pool.run(fn, i) for i in range(calls)))
+    return asyncio.run(run())
+
+
+def test_each_worker_thread_builds_and_keeps_its_own_service():
+    built, lock = [], threading.Lock()
+
+    def factory():
+        service = Service()
+        with lock:
+            built.append(service)
+        return service
+    pool = ServicePool(factory, max_workers=4)
+
+    def call(i):
+        time.sleep(0.01)
+        return threading.get_ident(), pool.local_service(), pool.service.thread
+
+    try:
+        results = run_concurrently(pool, call, 40)
+    finally:
+        pool.shutdown()
+    services = {}
+    for thread, service, built_on in results:
+        # The same thread always gets the same service, built on that thread.
+        assert services.setdefault(thread, service) is service
+        assert built_on == service.thread == thread
+    assert len(services) == len(built) <= 4
+    assert len({id(service) for service in services.values()}) == len(services)
+
+
+def test_concurrent_calls_never_exceed_the_pool_size():
+    lock, state = threading.Lock(), {"in_flight": 0, "max_in_flight": 0}
+    pool = ServicePool(Service, max_workers=3)
+
+    def call(i):
+        with lock:
+            state["in_flight"] += 1
+            state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        time.sleep(0.01)
+        with lock:
+            state["in_flight"] -= 1
+        return i
+
+    try:
+        assert run_concurrently(pool, call, 30) == list(range(30))
+    finally:
+        pool.shutdown()
+    assert state["max_in_flight"] == 3
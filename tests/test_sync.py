@@ -0,0 +1,140 @@
+import os
+
+import pytest
+
+from fake_drive import FOLDER_MIME_TYPE
+from tools import sync
+from utils import hashing
+from utils.request_executor import default_executor
+
+FILES = {"a.txt": b"alpha", "docs/b.txt": b"bravo", "docs/deeper/c.txt": b"charlie"}
+
+
+@pytest.fixture
+def local(tmp_path):
+    root = tmp_path / "local"
+    for relative, content in FILES.items():
+        path = root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(content)
+    return root
+
+
+@pytest.fixture
+def destination(drive):
+    return drive.add_folder("backup")
+
+
+@pytest.fixture
+def run(service, cache, local, destination):
+    tool = sync.sync_directory(service, cache)
+
+    def run(**kwargs):
+        response = tool(str(local), destination, **kwargs)
+        assert response["status"] == "success", response
+        assert response["data"]["failed"] == {}
+        return response["data"]
+    return run
+
+
+@pytest.fixture
+def hashed(monkeypatch):
+    # Paths whose MD5 was computed from the file rather than taken from the hash cache.
+    paths, md5_file = [], hashing.md5_file
+
+    def counting(path):
+        paths.append(os.path.basename(path))
+        return md5_file(path)
+    monkeypatch.setattr(hashing, "md5_file", counting)
+    return paths
+
+
+def remote(drive, folder_id, path=""):
+    # {relative path: content} under folder_id, with folders mapped to None.
+    items = {}
+    for file in list(drive.files.values()):
+        if folder_id in file.get("parents", []):
+            relative = f"{path}/{file['name']}" if path else file["name"]
+            if file["mimeType"] == FOLDER_MIME_TYPE:
+                items[relative] = None
+                items.update(remote(drive, file["id"], relative))
+            else:
+                items[relative] = drive.content[file["id"]]
+    return items
+
+
+def touch(path, content):
+    stat = path.stat()
+    path.write_bytes(content)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+def test_first_run_uploads_everything_and_creates_folders(drive, destination, run):
+    result = run()
+    assert result["uploaded"] == 3
+    assert result["foldersCreated"] == 2
+    assert remote(drive, destination) == {"docs": None, "docs/deeper": None, **FILES}
+
+
+def test_unchanged_files_are_skipped_without_writes(drive, destination, run, hashed):
+    run()
+    hashed.clear()
+    writes = default_executor.writes
+    result = run()
+    assert result["skipped"] == 3
+    assert result["uploaded"] == result["updated"] == 0
+    assert default_executor.writes == writes
+    # The digests computed after the first run's uploads are reused while size and mtime hold.
+    assert result["hashCacheHits"] == 3
+    assert hashed == []
+
+
+def test_files_matching_by_md5_are_skipped(drive, destination, run, hashed):
+    # Nothing is in the hash cache, so the skip comes from comparing the local MD5 with Drive's.
+    docs = drive.add_folder("docs", destination)
+    deeper = drive.add_folder("deeper", docs)
+    drive.add_file("a.txt", destination, content=FILES["a.txt"])
+    drive.add_file("b.txt", docs, content=FILES["docs/b.txt"])
+    drive.add_file("c.txt", deeper, content=b"changed")
+    result = run()
+    assert result["skipped"] == 2
+    assert result["updated"] == 1
+    assert result["foldersCreated"] == 0
+    # Each file is read once; checking c.txt after its upload reuses the digest.
+    assert sorted(hashed) == ["a.txt", "b.txt", "c.txt"]
+    assert result["hashCacheHits"] == 1
+    assert remote(drive, destination)["docs/deeper/c.txt"] == FILES["docs/deeper/c.txt"]
+
+
+def test_changed_file_is_hashed_again_and_updated(drive, destination, local, run, hashed):
+    run()
+    hashed.clear()
+    touch(local / "a.txt", b"ALPHA")
+    result = run()
+    assert result["updated"] == 1
+    assert result["skipped"] == 2
+    assert hashed == ["a.txt"]
+    assert remote(drive, destination)["a.txt"] == b"ALPHA"
+
+
+def test_new_subdirectories_get_remote_folders(drive, destination, local, run):
+    run()
+    (local / "docs" / "new" / "newer").mkdir(parents=True)
+    (local / "docs" / "new" / "newer" / "d.txt").write_bytes(b"delta")
+    result = run()
+    assert result["foldersCreated"] == 2
+    assert result["uploaded"] == 1
+    assert remote(drive, destination)["docs/new/newer/d.txt"] == b"delta"
+
+
+def test_dry_run_makes_no_writes(drive, destination, local, run):
+    run()
+    touch(local / "a.txt", b"ALPHA")
+    (local / "extra").mkdir()
+    (local / "extra" / "e.txt").write_bytes(b"echo")
+    before, writes = remote(drive, destination), default_executor.writes
+    result = run(dry_run=True)
+    assert result["dryRun"] is True
+    assert (result["uploaded"], result["updated"], result["skipped"], result["foldersCreated"]) == (1, 1, 2, 1)
+    assert default_executor.writes == writes
+    assert remote(drive, destination) == before
@@ -0,0 +1,166 @@
+import os
+
+import pytest
+
+from tools import transfer
+
+CHUNK = transfer.CHUNK_ALIGNMENT
+
+
+@pytest.fixture
+def local_file(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(os.urandom(4 * CHUNK))
+    return path
+
+
+def fail_put(drive, monkeypatch, number, status=400):
+    # Fails the number-th PUT once, the way a dropped connection would end an upload midway.
+    handle, puts, seen = drive.handle, [], []
+
+    def failing(uri, method, body, headers):
+        if method == "PUT":
+            puts.append(uri)
+            seen.append(uri)
+            if len(seen) == number:
+                drive.fail_next(status, match="PUT")
+        return handle(uri, method, body, headers)
+    monkeypatch.setattr(drive, "handle", failing)
+    return puts
+
+
+def uploaded(drive, response):
+    return drive.content[response["data"]["id"]]
+
+
+def test_upload_in_chunks(drive, service, local_file):
+    response = transfer.upload_local_file(service)(str(local_file), chunk_size=CHUNK)
+    assert response["status"] == "success", response
+    assert response["data"]["resumedFromByte"] == 0
+    assert uploaded(drive, response) == local_file.read_bytes()
+
+
+def test_interrupted_upload_resumes_from_the_server_offset(drive, service, local_file, monkeypatch):
+    upload = transfer.upload_local_file(service)
+    puts = fail_put(drive, monkeypatch, 3)
+    assert upload(str(local_file), chunk_size=CHUNK)["status"] == "error"
+    assert len(drive.uploads) == 1
+
+    puts.clear()
+    response = upload(str(local_file), chunk_size=CHUNK)
+    assert response["status"] == "success", response
+    assert response["data"]["resumedFromByte"] == 2 * CHUNK
+    assert response["data"]["bytesUploaded"] == 2 * CHUNK
+    # One status query, then only the two chunks Drive did not have yet.
+    assert len(puts) == 3
+    assert uploaded(drive, response) == local_file.read_bytes()
+    assert not drive.uploads
+
+
+def test_expired_session_starts_over(drive, service, local_file, monkeypatch):
+    upload = transfer.upload_local_file(service)
+    fail_put(drive, monkeypatch, 2)
+    assert upload(str(local_file), chunk_size=CHUNK)["status"] == "error"
+    drive.uploads.clear()
+
+    # The same call notices the session is gone and uploads everything in a new one.
+    response = upload(str(local_file), chunk_size=CHUNK)
+    assert response["status"] == "success", response
+    assert response["data"]["resumedFromByte"] == 0
+    assert response["data"]["bytesUploaded"] == 4 * CHUNK
+    assert uploaded(drive, response) == local_file.read_bytes()
+    assert not drive.uploads
+
+
+def test_session_expiring_after_the_status_query_starts_over(drive, service, local_file, monkeypatch):
+    upload = transfer.upload_local_file(service)
+    fail_put(drive, monkeypatch, 3)
+    assert upload(str(local_file), chunk_size=CHUNK)["status"] == "error"
+    # The status query succeeds, then the session is gone by the next chunk.
+    fail_put(drive, monkeypatch, 2, status=404)
+    response = upload(str(local_file), chunk_size=CHUNK)
+    assert response["status"] == "success", response
+    assert response["data"]["resumedFromByte"] == 0
+    assert uploaded(drive, response) == local_file.read_bytes()
+
+
+DOC_MIME_TYPE = "application/vnd.google-apps.document"
+
+
+def test_download_to_a_path(drive, service, cache, tmp_path):
+    file_id = drive.add_file("blob.bin", content=b"remote bytes", mime_type="application/octet-stream")
+    path = tmp_path / "blob.bin"
+    response = transfer.download_file(service, cache)(file_id, str(path))
+    assert response["status"] == "success", response
+    assert path.read_bytes() == b"remote bytes"
+
+
+def test_download_skips_a_matching_local_copy(drive, service, cache, tmp_path):
+    file_id = drive.add_file("blob.bin", content=b"remote bytes", mime_type="application/octet-stream")
+    path = tmp_path / "blob.bin"
+    path.write_bytes(b"remote bytes")
+    assert transfer.download_file(service, cache)(file_id, str(path))["data"]["skipped"] is True
+
+
+def test_download_never_replaces_a_different_file_without_overwrite(drive, service, cache, tmp_path):
+    file_id = drive.add_file("blob.bin", content=b"remote bytes", mime_type="application/octet-stream")
+    path = tmp_path / "blob.bin"
+    path.write_bytes(b"local edits")
+    download = transfer.download_file(service, cache)
+    assert download(file_id, str(path))["error"]["code"] == 409
+    assert path.read_bytes() == b"local edits"
+    assert download(file_id, str(path), overwrite=True)["status"] == "success"
+    assert path.read_bytes() == b"remote bytes"
+
+
+def test_export_never_replaces_an_older_file_without_overwrite(drive, service, cache, tmp_path):
+    file_id = drive.add_file("Plan", mime_type=DOC_MIME_TYPE, content=b"plan text")
+    path = tmp_path / "plan.txt"
+    path.write_bytes(b"local notes")
+    os.utime(path, (0, 0))
+    export = transfer.export_file(service, cache)
+    assert export(file_id, "text/plain", str(path))["error"]["code"] == 409
+    assert path.read_bytes() == b"local notes"
+    assert export(file_id, "text/plain", str(path), overwrite=True)["status"] == "success"
+    assert path.read_bytes() != b"local notes"
+    assert export(file_id, "text/plain", str(path))["data"]["skipped"] is True
+
+
+def test_peek_returns_the_requested_range(drive, service, cache):
+    file_id = drive.add_file("digits.txt", content=b"0123456789")
+    response = transfer.download_file(service, cache)(file_id, byte_range_start=2, byte_range_end=5)
+    assert response["data"]["content"] == "2345"
+
+
+@pytest.mark.parametrize("arguments", [
+    {"byte_range_start": 10, "byte_range_end": 5},
+    {"byte_range_start": -1},
+    {"byte_range_end": -1},
+    {"max_bytes": 0}
+])
+def test_peek_rejects_invalid_ranges_before_any_request(drive, service, cache, arguments):
+    file_id = drive.add_file("digits.txt", content=b"0123456789")
+    before = drive.request_count
+    assert transfer.download_file(service, cache)(file_id, **arguments)["error"]["code"] == 400
+    assert drive.request_count == before
+
+
+@pytest.mark.parametrize("arguments", [
+    {"byte_range_start": 2},
+    {"byte_range_end": 5},
+    {"max_bytes": 4}
+])
+def test_ranges_cannot_be_combined_with_a_local_path(drive, service, cache, tmp_path, arguments):
+    file_id = drive.add_file("digits.txt", content=b"0123456789")
+    path = tmp_path / "digits.txt"
+    before = drive.request_count
+    assert transfer.download_file(service, cache)(file_id, str(path), **arguments)["error"]["code"] == 400
+    assert drive.request_count == before
+    assert not path.exists()
+
+
+def test_export_max_bytes_cannot_be_combined_with_a_local_path(drive, service, cache, tmp_path):
+    file_id = drive.add_file("Plan", mime_type=DOC_MIME_TYPE, content=b"plan text")
+    path = tmp_path / "plan.txt"
+    assert transfer.export_file(service, cache)(file_id, "text/plain", str(path), max_bytes=4)["error"]["code"] == 400
+    assert not path.exists()
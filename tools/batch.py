@@ -0,0 +1,159 @@
+from utils.response_handler import success_response, error_response
+from utils.batch import execute_batch, batch_summary
+from googleapiclient.errors import HttpError
+import logging
+
+
+def _invalidate(cache, file_ids, tree=True):
+    for file_id in file_ids:
+        if tree:
+            cache.invalidate_tree(file_id)
+        else:
+            cache.invalidate(file_id)
+
+
+def _set_trashed(service, cache, file_ids, trashed, is_shared_drive_file):
+    requests = []
+    for i, file_id in enumerate(file_ids):
+        request = service.files().update(fileId=file_id, body={"trashed": trashed}, fields="id, trashed")
+        if is_shared_drive_file:
+            request.supportsAllDrives(True)
+        requests.append((i, request))
+    try:
+        return batch_summary(file_ids, execute_batch(service, requests))
+    finally:
+        _invalidate(cache, file_ids)
+
+
+def batch_delete(service, cache):
+    def batch_delete(file_ids: list[str], is_shared_drive_file: bool = False):
+        logging.info(f"Trashing {len(file_ids)} files/folders in batch")
+        try:
+            summary = _set_trashed(service, cache, file_ids, True, is_shared_drive_file)
+            logging.info(f"Batch trash finished: {summary['succeeded']} succeeded, {summary['failed']} failed")
+            return success_response(summary)
+        except HttpError as e:
+            logging.error(f"Google Drive API error during batch trash: {e.resp.status} - {e.content.decode()}")
+            return error_response(f"Google Drive API error: {e.content.decode()}", e.resp.status)
+        except Exception as e:
+            logging.error(f"An unexpected error occurred during batch trash: {e}")
+            return error_response(f"An unexpected error occurred: {e}")
+    return batch_delete
+
+
+def batch_restore(service, cache):
+    def batch_restore(file_ids: list[str], is_shared_drive_file: bool = False):
+        logging.info(f"Restoring {len(file_ids)} files/folders from trash in batch")
+        try:
+            summary = _set_trashed(service, cache, file_ids, False, is_shared_drive_file)
+            logging.info(f"Batch restore finished: {summary['succeeded']} succeeded, {summary['failed']} failed")
+            return success_response(summary)
+        except HttpError as e:
+            logging.error(f"Google Drive API error during batch restore: {e.resp.status} - {e.content.decode()}")
+            return error_response(f"Google Drive API error: {e.content.decode()}", e.resp.status)
+        except Exception as e:
+            logging.error(f"An unexpected error occurred during batch restore: {e}")
+            return error_response(f"An unexpected error occurred: {e}")
+    return batch_restore
+
+
+def batch_rename(service, cache):
+    def batch_rename(renames: list[dict]):
+        # Each item: {"file_id": "...", "new_name": "..."}
+        logging.info(f"Renaming {len(renames)} files/folders in batch")
+        try:
+            file_ids = [item["file_id"] for item in renames]
+            requests = [
+                (i, service.files().update(fileId=item["file_id"], body={"name": item["new_name"]}, fields="id, name"))
+                for i, item in enumerate(renames)
+            ]
+            try:
+                summary = batch_summary(file_ids, execute_batch(service, requests))
+            finally:
+                _invalidate(cache, file_ids, tree=False)
+            logging.info(f"Batch rename finished: {summary['succeeded']} succeeded, {summary['failed']} failed")
+            return success_response(summary)
+        except KeyError as e:
+            return error_response(f"Each rename needs 'file_id' and 'new_name', missing {e}", 400)
+        except HttpError as e:
+            logging.error(f"Google Drive API error during batch rename: {e.resp.status} - {e.content.decode()}")
+            return error_response(f"Google Drive API error: {e.content.decode()}", e.resp.status)
+        except Exception as e:
+            logging.error(f"An unexpected error occurred during batch rename: {e}")
+            return error_response(f"An unexpected error occurred: {e}")
+    return batch_rename
+
+
+def batch_move(service, cache):
+    def batch_move(file_ids: list[str], parent_folder_id: str):
+        logging.info(f"Moving {len(file_ids)} files/folders to parent folder {parent_folder_id} in batch")
+        try:
+            parents, lookups = {}, []
+            for i, file_id in enumerate(file_ids):
+                cached = cache.get(file_id, "parents")
+                if cached is not None:
+                    parents[i] = success_response(cached)
+                else:
+                    lookups.append((i, service.files().get(fileId=file_id, fields="parents")))
+            parents.update(execute_batch(service, lookups))
+
+            results = {i: parents[i] for i in parents if parents[i]["status"] != "success"}
+            updates = []
+            for i, file_id in enumerate(file_ids):
+                if i in results:
+                    continue
+                previous_parents = ",".join(parents[i]["data"].get("parents", []))
+                updates.append((i, service.files().update(
+                    fileId=file_id,
+                    addParents=parent_folder_id,
+                    removeParents=previous_parents,
+                    fields="id, parents"
+                )))
+            try:
+                results.update(execute_batch(service, updates))
+            finally:
+                _invalidate(cache, file_ids)
+
+            summary = batch_summary(file_ids, results)
+            logging.info(f"Batch move finished: {summary['succeeded']} succeeded, {summary['failed']} failed")
+            return success_response(summary)
+        except HttpError as e:
+            logging.error(f"Google Drive API error during batch move: {e.resp.status} - {e.content.decode()}")
+            return error_response(f"Google Drive API error: {e.content.decode()}", e.resp.status)
+        except Exception as e:
+            logging.error(f"An unexpected error occurred during batch move: {e}")
+            return error_response(f"An unexpected error occurred: {e}")
+    return batch_move
+
+
+def batch_add_permission(service, cache):
+    def batch_add_permission(permissions: list[dict]):
+        # Each item: {"file_id": "...", "email": "...", "role": "reader", "permission_type": "user"}
+        logging.info(f"Adding {len(permissions)} permissions in batch")
+        try:
+            file_ids = [item["file_id"] for item in permissions]
+            requests = []
+            for i, item in enumerate(permissions):
+                body = {
+                    "type": item.get("permission_type", "user"),
+                    "role": item.get("role", "reader"),
+                    "emailAddress": item["email"]
+                }
+                requests.append((i, service.permissions().create(
+                    fileId=item["file_id"], body=body, fields="id, type, role, emailAddress"
+                )))
+            try:
+                summary = batch_summary(file_ids, execute_batch(service, requests))
+            finally:
+                _invalidate(cache, file_ids)
+            logging.info(f"Batch permission add finished: {summary['succeeded']} succeeded, {summary['failed']} failed")
+            return success_response(summary)
+        except KeyError as e:
+            return error_response(f"Each permission needs 'file_id' and 'email', missing {e}", 400)
+        except HttpError as e:
+            logging.error(f"Google Drive API error during batch permission add: {e.resp.status} - {e.content.decode()}")
+            return error_response(f"Google Drive API error: {e.content.decode()}", e.resp.status)
+        except Exception as e:
+            logging.error(f"An unexpected error occurred during batch permission add: {e}")
+            return error_response(f"An unexpected error occurred: {e}")
+    return batch_add_permission
@@ -1,4 +1,5 @@
-from utils.response_handler import success_response, error_response
+from utils.response_handler import success_response, error_response, resolve_fields, field_mask
+from utils.request_executor import execute
 from googleapiclient.http import MediaIoBaseUpload
 from googleapiclient.errors import HttpError
 import logging
@@ -10,7 +11,7 @@ def create_file(service):
         logging.info(f"Creating a new file with name: {name} and mime_type: {mime_type}")
         try:
             metadata = {"name": name, "mimeType": mime_type}
-            file = service.files().create(body=metadata, fields="id, name, mimeType").execute()
+            file = execute(service.files().create(body=metadata, fields="id, name, mimeType"))
             logging.info(f"File created with ID: {file['id']}")
             return success_response(file)
         except HttpError as e:
@@ -30,9 +31,9 @@ def upload_file_in_parent(service):
             if parent_folder_id:
                 metadata["parents"] = [parent_folder_id]
             media = MediaIoBaseUpload(io.BytesIO(content), mimetype=mime_type, resumable=True)
-            file = service.files().create(
+            file = execute(service.files().create(
                 body=metadata, media_body=media, fields="id, name, mimeType, parents, size"
-            ).execute()
+            ))
             logging.info(f"File '{name}' created with ID: {file['id']} in parent {parent_folder_id}")
             return success_response(file)
         except HttpError as e:
@@ -44,18 +45,23 @@ def upload_file_in_parent(service):
     return upload_file_in_parent
 
 
-def move_file_to_folder(service):
+def move_file_to_folder(service, cache):
     def move_file_to_folder(file_id: str, parent_folder_id: str):
         logging.info(f"Moving file with ID: {file_id} to parent folder with ID: {parent_folder_id}")
         try:
-            file = service.files().get(fileId=file_id, fields="parents").execute()
+            file = cache.get(file_id, "parents")
+            if file is None:
+                file = execute(service.files().get(fileId=file_id, fields="parents"))
             previous_parents = ",".join(file.get("parents", []))
-            service.files().update(
-                fileId=file_id,
-                addParents=parent_folder_id,
-                removeParents=previous_parents,
-                fields="id, parents"
-            ).execute()
+            try:
+                execute(service.files().update(
+                    fileId=file_id,
+                    addParents=parent_folder_id,
+                    removeParents=previous_parents,
+                    fields="id, parents"
+                ))
+            finally:
+                cache.invalidate_tree(file_id)
             logging.info(f"File {file_id} moved to folder {parent_folder_id}")
             return success_response({"id": file_id, "parents": [parent_folder_id]})
         except HttpError as e:
@@ -67,14 +73,17 @@ def move_file_to_folder(service):
     return move_file_to_folder
 
 
-def delete_file_or_folder(service):
+def delete_file_or_folder(service, cache):
     def delete_file_or_folder(file_id: str, is_shared_drive_file: bool = False):
         logging.info(f"Trashing file/folder with ID: {file_id}")
         try:
             request = service.files().update(fileId=file_id, body={"trashed": True}, fields="id, trashed, explicitlyTrashed")
             if is_shared_drive_file:
                 request.supportsAllDrives(True)
-            response = request.execute()
+            try:
+                response = execute(request)
+            finally:
+                cache.invalidate_tree(file_id)
             logging.info(f"File/folder {file_id} trashed successfully. Trashed status: {response.get('trashed')}")
             return success_response(response)
         except HttpError as e:
@@ -85,14 +94,17 @@ def delete_file_or_folder(service):
             return error_response(f"An unexpected error occurred: {e}")
     return delete_file_or_folder
 
-def permanently_delete_file_or_folder(service):
+def permanently_delete_file_or_folder(service, cache):
     def permanently_delete_file_or_folder(file_id: str, is_shared_drive_file: bool = False):
         logging.info(f"Permanently deleting file/folder with ID: {file_id}")
         try:
             request = service.files().delete(fileId=file_id)
             if is_shared_drive_file:
                 request.supportsAllDrives(True)
-            request.execute()
+            try:
+                execute(request)
+            finally:
+                cache.invalidate_tree(file_id)
             logging.info(f"File/folder {file_id} permanently deleted successfully.")
             return success_response({"message": f"File/folder {file_id} permanently deleted."})
         except HttpError as e:
@@ -103,14 +115,17 @@ def permanently_delete_file_or_folder(service):
             return error_response(f"An unexpected error occurred: {e}")
     return permanently_delete_file_or_folder
 
-def restore_file_or_folder(service):
+def restore_file_or_folder(service, cache):
     def restore_file_or_folder(file_id: str, is_shared_drive_file: bool = False):
         logging.info(f"Restoring file/folder with ID: {file_id} from trash")
         try:
             request = service.files().update(fileId=file_id, body={"trashed": False}, fields="id, trashed")
             if is_shared_drive_file:
                 request.supportsAllDrives(True)
-            response = request.execute()
+            try:
+                response = execute(request)
+            finally:
+                cache.invalidate_tree(file_id)
             logging.info(f"File/folder {file_id} restored successfully. Trashed status: {response.get('trashed')}")
             return success_response(response)
         except HttpError as e:
@@ -126,7 +141,7 @@ def create_folder(service):
         logging.info(f"Creating a new folder with name: {name}")
         metadata = {"name": name, "mimeType": "application/vnd.google-apps.folder"}
         try:
-            folder = service.files().create(body=metadata, fields="id").execute()
+            folder = execute(service.files().create(body=metadata, fields="id"))
             logging.info(f"Folder created with ID: {folder['id']}")
             return success_response({"id": folder["id"], "name": name, "mimeType": metadata["mimeType"]})
         except HttpError as e:
@@ -147,7 +162,7 @@ def create_folder_in_parent(service):
             "parents": [parent_folder_id]
         }
         try:
-            folder = service.files().create(body=metadata, fields="id, name, mimeType, parents").execute()
+            folder = execute(service.files().create(body=metadata, fields="id, name, mimeType, parents"))
             logging.info(f"Folder '{name}' created with ID: {folder['id']} in parent {parent_folder_id}")
             return success_response(folder)
         except HttpError as e:
@@ -158,12 +173,22 @@ def create_folder_in_parent(service):
             return error_response(f"An unexpected error occurred: {e}")
     return create_folder_in_parent
 
-def get_file_metadata(service):
-    def get_file_metadata(file_id: str, 
-        fields: str = "id, name, mimeType, size, createdTime, modifiedTime, owners, parents, webViewLink"):
+def get_file_metadata(service, cache):
+    def get_file_metadata(file_id: str, fields: str = None, profile: str = "standard"):
+        # fields is a Drive field mask; without it the named profile ("minimal", "standard" or "full") is used.
         logging.info(f"Fetching metadata for file ID: {file_id}")
         try:
-            file = service.files().get(fileId=file_id, fields=fields, supportsAllDrives=True).execute()
+            fields = field_mask(resolve_fields(fields, profile))
+        except ValueError as e:
+            return error_response(str(e), 400)
+        try:
+            file = cache.get(file_id, fields)
+            if file is not None:
+                logging.info(f"Serving cached metadata for file ID: {file_id}")
+                return success_response(file)
+            version = cache.version()
+            file = execute(service.files().get(fileId=file_id, fields=fields, supportsAllDrives=True))
+            cache.put(file_id, fields, file, version)
             logging.info(f"Successfully fetched metadata for file '{file.get('name')}'.")
             return success_response(file)
         except HttpError as e:
@@ -174,16 +199,19 @@ def get_file_metadata(service):
             return error_response(f"An unexpected error occurred: {e}")
     return get_file_metadata
 
-def rename_file_or_folder(service):
+def rename_file_or_folder(service, cache):
     def rename_file_or_folder(file_id: str, new_name: str):
         logging.info(f"Renaming file ID: {file_id} to '{new_name}'")
         try:
             metadata = {'name': new_name}
-            updated_file = service.files().update(
-                fileId=file_id,
-                body=metadata,
-                fields='id, name'
-            ).execute()
+            try:
+                updated_file = execute(service.files().update(
+                    fileId=file_id,
+                    body=metadata,
+                    fields='id, name'
+                ))
+            finally:
+                cache.invalidate(file_id)
             logging.info(f"File {file_id} renamed to '{updated_file['name']}'")
             return success_response(updated_file)
         except HttpError as e:
@@ -204,11 +232,11 @@ def copy_and_paste_file(service):
             metadata['parents'] = [destination_folder_id]
             
         try:
-            copied_file = service.files().copy(
+            copied_file = execute(service.files().copy(
                 fileId=file_id,
                 body=metadata,
                 fields='id, name, parents'
-            ).execute()
+            ))
             logging.info(f"File {file_id} copied to new file ID: {copied_file['id']}")
             return success_response(copied_file)
         except HttpError as e:
@@ -0,0 +1,205 @@
+from utils.response_handler import success_response, error_response, shape_items, LAYOUTS
+from utils.request_executor import execute
+from utils.batch import execute_batch, BATCH_LIMIT
+from utils.folder_walker import walk_tree, tree_executor, FOLDER_MIME_TYPE
+from utils.service_pool import report_progress
+from utils.state_store import StateStore
+from config import STATE_DIR
+from googleapiclient.errors import HttpError
+from mcp.server.fastmcp import Context
+import logging
+import time
+import uuid
+
+job_state = StateStore(STATE_DIR, "jobs")
+TREE_COLUMNS = ["id", "name", "mimeType", "parentId", "depth"]
+
+
+def list_folder_tree(service):
+    def list_folder_tree(folder_id: str, max_depth: int = None, max_items: int = 5000, layout: str = "records"):
+        logging.info(f"Listing folder tree under folder ID: {folder_id}")
+        if layout not in LAYOUTS:
+            return error_response(f"Unknown layout: {layout}. Use 'records' or 'columns'.", 400)
+        try:
+            items, truncated = [], False
+            for depth, parent_id, children in walk_tree(service, folder_id, fields="id, name, mimeType, parents",
+                                                        max_depth=max_depth):
+                for child in children:
+                    if len(items) >= max_items:
+                        truncated = True
+                        break
+                    items.append({"id": child["id"], "name": child["name"], "mimeType": child["mimeType"],
+                                  "parentId": parent_id, "depth": depth})
+                if truncated:
+                    break
+            logging.info(f"Listed {len(items)} items under folder {folder_id}")
+            return success_response({
+                "rootFolderId": folder_id, "items": shape_items(items, layout, TREE_COLUMNS),
+                "totalItems": len(items), "truncated": truncated
+            })
+        except HttpError as e:
+            logging.error(f"Google Drive API error when listing folder tree: {e.resp.status} - {e.content.decode()}")
+            return error_response(f"Google Drive API error: {e.content.decode()}", e.resp.status)
+        except Exception as e:
+            logging.error(f"An unexpected error occurred while listing folder tree {folder_id}: {e}")
+            return error_response(f"An unexpected error occurred: {e}")
+    return list_folder_tree
+
+
+def folder_tree_size(service):
+    def folder_tree_size(folder_id: str):
+        logging.info(f"Measuring folder tree under folder ID: {folder_id}")
+        try:
+            files, folders, total_bytes, max_depth = 0, 0, 0, 0
+            for depth, _, children in walk_tree(service, folder_id, fields="id, mimeType, size, parents"):
+                for child in children:
+                    max_depth = max(max_depth, depth)
+                    if child["mimeType"] == FOLDER_MIME_TYPE:
+                        folders += 1
+                    else:
+                        files += 1
+                        total_bytes += int(child.get("size", 0))
+            logging.info(f"Folder {folder_id} holds {files} files and {folders} folders, {total_bytes} bytes")
+            return success_response({
+                "folderId": folder_id, "files": files, "folders": folders,
+                "totalBytes": total_bytes, "maxDepth": max_depth
+            })
+        except HttpError as e:
+            logging.error(f"Google Drive API error when measuring folder tree: {e.resp.status} - {e.content.decode()}")
+            return error_response(f"Google Drive API error: {e.content.decode()}", e.resp.status)
+        except Exception as e:
+            logging.error(f"An unexpected error occurred while measuring folder tree {folder_id}: {e}")
+            return error_response(f"An unexpected error occurred: {e}")
+    return folder_tree_size
+
+
+def _run_batches(service, items, make_request, id_map):
+    # items: list of (source item, destination parent id), sent in batches of BATCH_LIMIT that run
+    # concurrently. Requests are built on the thread that sends them: each thread has its own transport.
+    def run(chunk):
+        return execute_batch(service, [(source["id"], make_request(source, parent_id)) for source, parent_id in chunk])
+    chunks = [items[i:i + BATCH_LIMIT] for i in range(0, len(items), BATCH_LIMIT)]
+    failed = {}
+    for results in tree_executor.map(run, chunks):
+        for source_id, result in results.items():
+            if result["status"] == "success":
+                id_map[source_id] = result["data"]["id"]
+            else:
+                failed[source_id] = result["error"]["message"]
+    return failed
+
+
+def _create_folders(service, folders, folder_map):
+    return _run_batches(service, folders, lambda source, parent_id: service.files().create(
+        body={"name": source["name"], "mimeType": FOLDER_MIME_TYPE, "parents": [parent_id]},
+        fields="id", supportsAllDrives=True
+    ), folder_map)
+
+
+def _copy_files(service, files, file_map):
+    return _run_batches(service, files, lambda source, parent_id: service.files().copy(
+        fileId=source["id"], body={"name": source["name"], "parents": [parent_id]},
+        fields="id", supportsAllDrives=True
+    ), file_map)
+
+
+def copy_folder_tree(service):
+    def copy_folder_tree(source_folder_id: str = None, destination_parent_id: str = None, new_name: str = None,
+                         job_id: str = None, ctx: Context = None):
+        # Pass the job_id of an interrupted copy to resume it; already copied items are skipped.
+        state = None
+        try:
+            if job_id:
+                state = job_state.load(job_id)
+                if state is None:
+                    return error_response(f"No folder copy job found with ID: {job_id}", 404)
+                logging.info(f"Resuming folder copy job {job_id}")
+            else:
+                if not source_folder_id:
+                    return error_response("source_folder_id is required to start a new copy", 400)
+                source = execute(service.files().get(fileId=source_folder_id, fields="id, name, parents", supportsAllDrives=True))
+                if destination_parent_id is None:
+                    destination_parent_id = (source.get("parents") or ["root"])[0]
+                root = execute(service.files().create(
+                    body={"name": new_name or f"Copy of {source['name']}", "mimeType": FOLDER_MIME_TYPE,
+                          "parents": [destination_parent_id]},
+                    fields="id", supportsAllDrives=True
+                ))
+                job_id = uuid.uuid4().hex
+                state = {
+                    "jobId": job_id, "type": "copy_folder_tree", "status": "running",
+                    "sourceFolderId": source_folder_id, "destinationFolderId": root["id"],
+                    "folders": {source_folder_id: root["id"]}, "files": {}, "failed": {},
+                    "startedAt": time.time()
+                }
+                job_state.save(job_id, state)
+                logging.info(f"Started folder copy job {job_id}: {source_folder_id} -> {root['id']}")
+
+            state["status"] = "running"
+            state["failed"] = {}
+            folder_map, file_map = state["folders"], state["files"]
+            pending_files, new_folders, level = [], [], 1
+            for depth, parent_id, children in walk_tree(service, state["sourceFolderId"],
+                                                        fields="id, name, mimeType, parents"):
+                # The walk is breadth-first, so a level's subfolders are all known before the next level
+                # starts, and they must exist before their own children are copied.
+                if depth != level:
+                    if new_folders:
+                        state["failed"].update(_create_folders(service, new_folders, folder_map))
+                        job_state.save(job_id, state)
+                    new_folders, level = [], depth
+                destination = folder_map.get(parent_id)
+                if destination is None:
+                    continue
+                new_folders.extend((c, destination) for c in children
+                                   if c["mimeType"] == FOLDER_MIME_TYPE and c["id"] not in folder_map)
+                pending_files.extend((c, destination) for c in children
+                                     if c["mimeType"] != FOLDER_MIME_TYPE and c["id"] not in file_map)
+                if len(pending_files) >= BATCH_LIMIT * 4:
+                    state["failed"].update(_copy_files(service, pending_files, file_map))
+                    pending_files = []
+                    job_state.save(job_id, state)
+                    report_progress(ctx, len(file_map) + len(folder_map))
+            if new_folders:
+                state["failed"].update(_create_folders(service, new_folders, folder_map))
+            if pending_files:
+                state["failed"].update(_copy_files(service, pending_files, file_map))
+
+            state["status"] = "completed" if not state["failed"] else "completed_with_errors"
+            state["finishedAt"] = time.time()
+            job_state.save(job_id, state)
+            logging.info(f"Folder copy job {job_id} finished: {len(folder_map)} folders, {len(file_map)} files")
+            return success_response({
+                "jobId": job_id, "status": state["status"], "rootFolderId": state["destinationFolderId"],
+                "folders": folder_map, "files": file_map, "failed": state["failed"]
+            })
+        except HttpError as e:
+            _mark_interrupted(state)
+            logging.error(f"Google Drive API error when copying folder tree: {e.resp.status} - {e.content.decode()}")
+            return error_response(f"Google Drive API error: {e.content.decode()}", e.resp.status, {"jobId": job_id})
+        except Exception as e:
+            _mark_interrupted(state)
+            logging.error(f"An unexpected error occurred while copying folder tree: {e}")
+            return error_response(f"An unexpected error occurred: {e}", details={"jobId": job_id})
+    return copy_folder_tree
+
+
+def _mark_interrupted(state):
+    if state:
+        state["status"] = "interrupted"
+        job_state.save(state["jobId"], state)
+
+
+def get_folder_job_status():
+    def get_folder_job_status(job_id: str):
+        logging.info(f"Fetching status of folder job {job_id}")
+        state = job_state.load(job_id)
+        if state is None:
+            return error_response(f"No folder job found with ID: {job_id}", 404)
+        return success_response({
+            "jobId": job_id, "type": state["type"], "status": state["status"],
+            "sourceFolderId": state["sourceFolderId"], "rootFolderId": state["destinationFolderId"],
+            "foldersCopied": len(state["folders"]), "filesCopied": len(state["files"]),
+            "failed": len(state["failed"])
+        })
+    return get_folder_job_status
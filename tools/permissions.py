@@ -1,8 +1,11 @@
 from utils.response_handler import success_response, error_response
+from utils.request_executor import execute
+from utils.batch import execute_batch, BATCH_LIMIT
+from utils.folder_walker import walk_tree, tree_executor
 from googleapiclient.errors import HttpError
 import logging
 
-def add_permission(service):
+def add_permission(service, cache):
     def add_permission(file_id: str, email: str, role: str = "reader", permission_type: str = "user"):
         logging.info(f"Adding '{role}' permission for '{email}' ({permission_type}) to file ID: {file_id}")
         permission_body = {
@@ -12,11 +15,14 @@ def add_permission(service):
         }
         try:
 
-            permission = service.permissions().create(
-                fileId=file_id,
-                body=permission_body,
-                fields="id, type, role, emailAddress"
-            ).execute()
+            try:
+                permission = execute(service.permissions().create(
+                    fileId=file_id,
+                    body=permission_body,
+                    fields="id, type, role, emailAddress"
+                ))
+            finally:
+                cache.invalidate_tree(file_id)
             logging.info(f"Permission created with ID: {permission['id']}")
             return success_response(permission)
         except HttpError as e:
@@ -31,10 +37,10 @@ def list_permissions(service):
     def list_permissions(file_id: str):
         logging.info(f"Listing permissions for file ID: {file_id}")
         try:
-            permissions = service.permissions().list(
+            permissions = execute(service.permissions().list(
                 fileId=file_id,
                 fields="permissions(id, type, role, emailAddress, displayName)"
-            ).execute()
+            ))
             return success_response(permissions)
         except HttpError as e:
             logging.error(f"Google Drive API error when listing permissions: {e.resp.status} - {e.content.decode()}")
@@ -43,3 +49,185 @@ def list_permissions(service):
             logging.error(f"An unexpected error occurred during listing permissions: {e}")
             return error_response(f"An unexpected error occurred: {e}")
     return list_permissions
+
+
+PERMISSION_FIELDS = "id, type, role, emailAddress, domain"
+ROLE_RANK = {"reader": 1, "commenter": 2, "writer": 3, "fileOrganizer": 4, "organizer": 5, "owner": 6}
+ROLE_NAMES = {rank: role for role, rank in ROLE_RANK.items()}
+
+
+def _principal(permission):
+    return permission.get("type"), (permission.get("emailAddress") or permission.get("domain") or permission.get("type")).lower()
+
+
+def _access(permissions):
+    # {(type, principal): highest role rank}
+    access = {}
+    for permission in permissions:
+        key = _principal(permission)
+        access[key] = max(access.get(key, 0), ROLE_RANK.get(permission.get("role"), 0))
+    return access
+
+
+def _tree_access(service, folder_id):
+    # Returns the folder's own access and (file, parent_id, access) for everything under it. Drive
+    # includes permissions in the listing for files the caller can share; the rest, such as shared
+    # drive items, are fetched with batched permissions().list calls.
+    root = execute(service.permissions().list(fileId=folder_id, fields=f"permissions({PERMISSION_FIELDS})",
+                                              supportsAllDrives=True))
+    items, missing = {}, []
+    for _, parent_id, children in walk_tree(service, folder_id,
+                                            fields=f"id, name, mimeType, parents, permissions({PERMISSION_FIELDS})"):
+        for child in children:
+            if child["id"] in items:
+                continue
+            items[child["id"]] = [child, parent_id, None]
+            if "permissions" in child:
+                items[child["id"]][2] = _access(child["permissions"])
+            else:
+                missing.append(child["id"])
+
+    def fetch_chunk(chunk):
+        return execute_batch(service, [(file_id, service.permissions().list(
+            fileId=file_id, fields=f"permissions({PERMISSION_FIELDS})", supportsAllDrives=True
+        )) for file_id in chunk])
+    chunks = [missing[i:i + BATCH_LIMIT] for i in range(0, len(missing), BATCH_LIMIT)]
+    for results in tree_executor.map(fetch_chunk, chunks):
+        for file_id, result in results.items():
+            if result["status"] == "success":
+                items[file_id][2] = _access(result["data"].get("permissions", []))
+    return _access(root.get("permissions", [])), list(items.values())
+
+
+def _diff(access, parent_access):
+    # Grants the file has beyond its parent, and parent grants the file does not reach.
+    extra = {key: rank for key, rank in access.items() if rank > parent_access.get(key, 0)}
+    restricted = {key: rank for key, rank in parent_access.items() if access.get(key, 0) < rank}
+    return extra, restricted
+
+
+def _group(groups, file_id, grants):
+    for key, rank in grants.items():
+        group = groups.setdefault((key, rank), [])
+        group.append(file_id)
+
+
+def _summarize(groups):
+    return sorted((
+        {"type": key[0], "principal": key[1], "role": ROLE_NAMES[rank], "files": len(file_ids), "sampleFileIds": file_ids[:5]}
+        for (key, rank), file_ids in groups.items()
+    ), key=lambda group: -group["files"])
+
+
+def _grant(service, file_ids, body):
+    # One permission per file, in batches that run concurrently; the requests are built on the sending thread.
+    def grant_chunk(chunk):
+        return execute_batch(service, [(file_id, service.permissions().create(
+            fileId=file_id, body=body, fields="id", sendNotificationEmail=False, supportsAllDrives=True
+        )) for file_id in chunk])
+    chunks = [file_ids[i:i + BATCH_LIMIT] for i in range(0, len(file_ids), BATCH_LIMIT)]
+    failed = {}
+    for results in tree_executor.map(grant_chunk, chunks):
+        failed.update({file_id: result["error"]["message"] for file_id, result in results.items()
+                       if result["status"] != "success"})
+    return failed
+
+
+def audit_permissions(service):
+    def audit_permissions(folder_id: str):
+        # Files whose access matches their parent folder are only counted; differences are grouped
+        # by principal and role.
+        logging.info(f"Auditing permissions under folder ID: {folder_id}")
+        try:
+            root_access, items = _tree_access(service, folder_id)
+            access_by_id = {file["id"]: access for file, _, access in items}
+            access_by_id[folder_id] = root_access
+            explicit, restricted, inheriting, unreadable = {}, {}, 0, []
+            for file, parent_id, access in items:
+                if access is None:
+                    unreadable.append(file["id"])
+                    continue
+                extra, missing = _diff(access, access_by_id.get(parent_id) or {})
+                if not extra and not missing:
+                    inheriting += 1
+                _group(explicit, file["id"], extra)
+                _group(restricted, file["id"], missing)
+            logging.info(f"Audited {len(items)} items under folder {folder_id}: {inheriting} inherit their parent's access")
+            return success_response({
+                "folderId": folder_id,
+                "folderAccess": [{"type": key[0], "principal": key[1], "role": ROLE_NAMES[rank]}
+                                 for key, rank in root_access.items()],
+                "filesScanned": len(items),
+                "inheritingFiles": inheriting,
+                "explicitGrants": _summarize(explicit),
+                "restrictedAccess": _summarize(restricted),
+                "unreadableFileIds": unreadable
+            })
+        except HttpError as e:
+            logging.error(f"Google Drive API error when auditing permissions: {e.resp.status} - {e.content.decode()}")
+            return error_response(f"Google Drive API error: {e.content.decode()}", e.resp.status)
+        except Exception as e:
+            logging.error(f"An unexpected error occurred while auditing permissions under {folder_id}: {e}")
+            return error_response(f"An unexpected error occurred: {e}")
+    return audit_permissions
+
+
+def share_tree(service, cache):
+    def share_tree(folder_id: str, email: str, role: str = "reader", permission_type: str = "user"):
+        # The folder permission reaches everything that inherits from it, so only items that already
+        # lack some of their parent's access, and would not pick it up, get their own permission.
+        logging.info(f"Sharing folder tree {folder_id} with '{email}' as '{role}'")
+        if role not in ROLE_RANK or role == "owner":
+            return error_response(f"Unsupported role for sharing a folder tree: {role}", 400)
+        principal, rank = (permission_type, email.lower()), ROLE_RANK[role]
+        try:
+            root_access, items = _tree_access(service, folder_id)
+            access_by_id = {file["id"]: access for file, _, access in items}
+            access_by_id[folder_id] = root_access
+            targets, already, inheriting, unreadable = [], 0, 0, []
+            for file, parent_id, access in items:
+                # Without the item's access, or its parent's, there is no telling whether it inherits
+                # the folder grant, so it is reported rather than given a permission it may not need.
+                parent_access = access_by_id.get(parent_id)
+                if access is None:
+                    unreadable.append(file["id"])
+                elif access.get(principal, 0) >= rank:
+                    already += 1
+                elif parent_access is None:
+                    unreadable.append(file["id"])
+                elif _diff(access, parent_access)[1]:
+                    targets.append(file["id"])
+                else:
+                    inheriting += 1
+
+            body = {"type": permission_type, "role": role, "emailAddress": email}
+            try:
+                root_permission = None
+                if root_access.get(principal, 0) < rank:
+                    root_permission = execute(service.permissions().create(
+                        fileId=folder_id, body=body, fields="id", supportsAllDrives=True
+                    ))
+                failed = _grant(service, targets, body)
+            finally:
+                cache.invalidate_tree(folder_id)
+            logging.info(f"Shared folder tree {folder_id}: {len(targets) - len(failed)} explicit grants, {len(failed)} failed, "
+                         f"{len(unreadable)} with unknown access")
+            return success_response({
+                "folderId": folder_id,
+                "principal": email,
+                "role": role,
+                "folderPermissionId": root_permission["id"] if root_permission else None,
+                "filesScanned": len(items),
+                "alreadyHadAccess": already,
+                "inheritingFiles": inheriting,
+                "explicitlyShared": len(targets) - len(failed),
+                "failed": failed,
+                "unreadableFileIds": unreadable
+            })
+        except HttpError as e:
+            logging.error(f"Google Drive API error when sharing folder tree: {e.resp.status} - {e.content.decode()}")
+            return error_response(f"Google Drive API error: {e.content.decode()}", e.resp.status)
+        except Exception as e:
+            logging.error(f"An unexpected error occurred while sharing folder tree {folder_id}: {e}")
+            return error_response(f"An unexpected error occurred: {e}")
+    return share_tree
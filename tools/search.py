@@ -1,21 +1,42 @@
-from utils.query_builder import build_query_string
-from utils.response_handler import success_response, error_response
+from utils.query_builder import query_terms
+from utils.query_planner import plan_query
+from utils.response_handler import success_response, error_response, resolve_fields, field_mask, shape_items, FIELD_PROFILES, LAYOUTS
+from utils.request_executor import execute
+from utils.pagination import iter_pages, encode_cursor, decode_cursor, format_files
+from utils.service_pool import on_default_account
 from googleapiclient.errors import HttpError
 import logging
+import time
+
+# The search_files filters the local index can answer, as carried in its cursors.
+INDEX_FILTERS = {
+    "name", "exact_name", "mime_type", "modified_after", "modified_before", "parent_folder_id", "starred", "trashed",
+    "owner_email", "folders_only", "exclude_folders"
+}
+
 
 def list_files(service):
-    def list_files(page_size: int = 10, page_token: str = None):
+    def list_files(page_size: int = 10, page_token: str = None, fields: list[str] = None, profile: str = None,
+                   layout: str = "records"):
+        # profile: "minimal", "standard" or "full" when fields is not given. layout="columns" returns
+        # the field names once and a row of values per file.
         logging.info(f"Listing Google Drive files with page_size={page_size}, page_token={page_token}")
-        params = {"pageSize": page_size, "fields": "nextPageToken, files(id, name, mimeType)"}
+        if layout not in LAYOUTS:
+            return error_response(f"Unknown layout: {layout}. Use 'records' or 'columns'.", 400)
+        try:
+            fields = resolve_fields(fields, profile, default=FIELD_PROFILES["minimal"])
+        except ValueError as e:
+            return error_response(str(e), 400)
+        params = {"pageSize": page_size, "fields": f"nextPageToken, files({field_mask(fields)})"}
         if page_token:
             params["pageToken"] = page_token
         try:
-            results = service.files().list(**params).execute()
+            results = execute(service.files().list(**params))
             items = results.get("files", [])
             next_page_token = results.get("nextPageToken")
             logging.info(f"Found {len(items)} files")
             return success_response({
-                "files": items,
+                "files": shape_items(items, layout, fields),
                 "nextPageToken": next_page_token,
                 "totalFiles": len(items)
             })
@@ -27,54 +48,139 @@ def list_files(service):
             return error_response(f"An unexpected error occurred: {e}")
     return list_files
 
-def search_files(service):
+def search_files(service, index=None):
     def search_files(
         name=None, exact_name=False, mime_type=None, contains_text=None,
         modified_after=None, modified_before=None, parent_folder_id=None,
         starred=None, trashed=False, shared_with_me=None, owner_email=None,
-        folders_only=False, exclude_folders=False, limit=20, fields=None
+        folders_only=False, exclude_folders=False, limit=20, fields=None,
+        source="auto", cursor=None, profile=None, layout="records", any_of=None, exclude=None
     ):
-        if fields is None:
-            fields = ["id", "name", "mimeType", "modifiedTime"]
-
-        logging.info(f"Searching Google Drive files with parameters")
+        # source: "auto" answers from the local index when it can, "index" requires it, "api" always goes live.
+        # cursor: the nextCursor of an earlier call; it carries the query, fields and position, so other filters are ignored.
+        # profile and layout work as in list_files.
+        # any_of: a list of filter objects (e.g. [{"mime_type": "application/pdf"}, {"name": "notes"}]); a file
+        # must match at least one. exclude: a filter object; files matching any of its filters are left out.
+        if layout not in LAYOUTS:
+            return error_response(f"Unknown layout: {layout}. Use 'records' or 'columns'.", 400)
         try:
-            query_string = build_query_string(
+            fields = resolve_fields(fields, profile, default=["id", "name", "mimeType", "modifiedTime"])
+            terms = query_terms(
                 name=name, mime_type=mime_type, contains_text=contains_text,
                 modified_after=modified_after, modified_before=modified_before,
                 parent_folder_id=parent_folder_id, starred=starred, trashed=trashed,
                 shared_with_me=shared_with_me, owner_email=owner_email,
-                exact_name=exact_name, folders_only=folders_only, exclude_folders=exclude_folders
+                exact_name=exact_name, folders_only=folders_only, exclude_folders=exclude_folders,
+                any_of=any_of, exclude=exclude
             )
-            logging.info(f"Built query: {query_string}")
-            fields_str = f"nextPageToken, files({', '.join(fields)})"
-            files_list = []
-            page_token = None
+        except ValueError as e:
+            return error_response(str(e), 400)
+
+        try:
+            state = decode_cursor(cursor) if cursor else None
+        except ValueError as e:
+            return error_response(str(e), 400)
 
-            while len(files_list) < limit:
-                page_size = min(100, limit - len(files_list))
-                request_params = {
-                    "spaces": "drive", "fields": fields_str, "pageSize": page_size
+        logging.info(f"Searching Google Drive files with parameters")
+        try:
+            # The local index mirrors the default account's Drive only. Its cursors carry the filters
+            # and an offset, since there is no page token to resume from.
+            if state and state.get("source") == "index":
+                if index is None or not on_default_account() or not index.is_seeded():
+                    return error_response("This cursor came from the local file index, which is no longer available. "
+                                          "Search again without the cursor.", 400)
+                filters, fields, limit, offset = state["filters"], state["fields"], state["pageSize"], state.get("offset", 0)
+                if not set(filters) <= INDEX_FILTERS:
+                    return error_response("Invalid search cursor", 400)
+            elif cursor is None and source != "api" and index is not None and on_default_account() \
+                    and index.is_seeded() and index.can_answer(contains_text=contains_text, shared_with_me=shared_with_me,
+                                                               fields=fields, any_of=any_of, exclude=exclude):
+                filters = {
+                    "name": name, "exact_name": exact_name, "mime_type": mime_type, "modified_after": modified_after,
+                    "modified_before": modified_before, "parent_folder_id": parent_folder_id, "starred": starred,
+                    "trashed": trashed, "owner_email": owner_email, "folders_only": folders_only,
+                    "exclude_folders": exclude_folders
                 }
-                if page_token:
-                    request_params["pageToken"] = page_token
-                if query_string.strip():
-                    request_params["q"] = query_string
+                offset = 0
+            else:
+                filters = None
+            if filters is not None:
+                index.sync_if_stale(service)
+                # One row past the limit tells whether there is another page.
+                files_list = index.search(**filters, limit=limit + 1, offset=offset)
+                next_cursor = None
+                if len(files_list) > limit:
+                    files_list = files_list[:limit]
+                    next_cursor = encode_cursor({"source": "index", "filters": filters, "fields": fields,
+                                                 "pageSize": limit, "offset": offset + limit})
+                formatted = format_files(files_list, fields)
+                logging.info(f"Found {len(formatted)} files in local index")
+                return success_response({
+                    "files": shape_items(formatted, layout, fields),
+                    "totalFiles": len(formatted),
+                    "queryUsed": "local index",
+                    "source": "index",
+                    "nextCursor": next_cursor
+                })
+            if cursor is None and source == "index":
+                return error_response("This search cannot be answered from the local file index. Use source='auto' or 'api'.", 400)
+
+            plan = None
+            if state:
+                query_string, fields, page_size = state.get("q", ""), state["fields"], state["pageSize"]
+                page_token, skip = state.get("pageToken"), state.get("offset", 0)
+            else:
+                query_string, plan = plan_query(service, terms)
+                if query_string is None:
+                    logging.info("No file matches the metadata filters, skipped the fullText search")
+                    return success_response({
+                        "files": shape_items([], layout, fields),
+                        "totalFiles": 0,
+                        "queryUsed": None,
+                        "queryPlan": plan,
+                        "source": "api",
+                        "nextCursor": None
+                    })
+                # The page size is fixed for the whole search so a cursor can point inside a page.
+                page_size, page_token, skip = max(1, min(100, limit)), None, 0
+            logging.info(f"Built query: {query_string}")
+            started = time.perf_counter()
+            request_params = {
+                "spaces": "drive", "fields": f"nextPageToken, files({field_mask(fields)})", "pageSize": page_size
+            }
+            if query_string.strip():
+                request_params["q"] = query_string
 
-                response = service.files().list(**request_params).execute()
-                batch = response.get("files", [])
-                files_list.extend(batch)
-                page_token = response.get("nextPageToken")
-                if not page_token or not batch:
+            formatted, next_state = [], None
+            pages = iter_pages(service, request_params, fields, page_token=page_token,
+                               max_items=skip + limit, prefetch=limit > page_size)
+            for page in pages:
+                available = page.files[skip:]
+                taken = available[:limit - len(formatted)]
+                formatted.extend(taken)
+                if len(formatted) >= limit:
+                    if len(taken) < len(available):
+                        next_state = {"pageToken": page.page_token, "offset": skip + len(taken)}
+                    elif page.next_page_token:
+                        next_state = {"pageToken": page.next_page_token, "offset": 0}
                     break
+                skip = 0
+            pages.close()
+            if plan:
+                plan["executionMs"] = round((time.perf_counter() - started) * 1000, 1)
 
-            formatted = [{k: f[k] for k in fields if k in f} for f in files_list[:limit]]
+            next_cursor = None
+            if next_state:
+                next_cursor = encode_cursor({"q": query_string, "fields": fields, "pageSize": page_size, **next_state})
 
             logging.info(f"Found {len(formatted)} files matching search criteria")
             return success_response({
-                "files": formatted,
+                "files": shape_items(formatted, layout, fields),
                 "totalFiles": len(formatted),
-                "queryUsed": query_string or "No query (list all files)"
+                "queryUsed": query_string or "No query (list all files)",
+                "queryPlan": plan,
+                "source": "api",
+                "nextCursor": next_cursor
             })
         except HttpError as e:
             logging.error(f"Google Drive API error: {e.resp.status} - {e.content.decode()}")
@@ -82,4 +188,23 @@ def search_files(service):
         except Exception as e:
             logging.error(f"An unexpected error occurred during search: {e}")
             return error_response(f"An unexpected error occurred: {e}")
-    return search_files
\ No newline at end of file
+    return search_files
+
+def sync_file_index(service, index):
+    def sync_file_index(full_rescan: bool = False):
+        logging.info(f"Syncing local file index (full_rescan={full_rescan})")
+        if index is None:
+            return error_response("The local file index is not enabled. Set GDRIVE_INDEX_PATH to enable it.", 400)
+        if not on_default_account():
+            return error_response("The local file index only covers the default account.", 400)
+        try:
+            result = index.seed(service) if full_rescan else index.sync(service)
+            logging.info(f"File index synced: {result}")
+            return success_response(result)
+        except HttpError as e:
+            logging.error(f"Google Drive API error when syncing file index: {e.resp.status} - {e.content.decode()}")
+            return error_response(f"Google Drive API error: {e.content.decode()}", e.resp.status)
+        except Exception as e:
+            logging.error(f"An unexpected error occurred during file index sync: {e}")
+            return error_response(f"An unexpected error occurred: {e}")
+    return sync_file_index
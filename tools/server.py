@@ -0,0 +1,53 @@
+from utils.response_handler import success_response, error_response
+from utils.http_transport import transport_stats
+import logging
+
+
+def get_cache_stats(cache):
+    def get_cache_stats():
+        logging.info("Fetching metadata cache statistics")
+        return success_response(cache.stats())
+    return get_cache_stats
+
+
+def get_request_stats(executor):
+    def get_request_stats():
+        logging.info("Fetching Drive request retry and throttling statistics")
+        return success_response(executor.metrics())
+    return get_request_stats
+
+
+def prometheus_text(registry, cache, executor):
+    gauges = {f"gdrive_cache_{_snake(k)}": v for k, v in cache.stats().items() if isinstance(v, (int, float))}
+    gauges.update({f"gdrive_requests_{_snake(k)}": v for k, v in executor.metrics().items()
+                   if isinstance(v, (int, float)) and not isinstance(v, bool)})
+    return registry.prometheus_text(gauges)
+
+
+def _snake(name):
+    return "".join(f"_{c.lower()}" if c.isupper() else c for c in name)
+
+
+def get_server_stats(registry, cache, executor):
+    def get_server_stats(format: str = "json"):
+        # format="prometheus" returns the same data in Prometheus text exposition format.
+        logging.info(f"Fetching server statistics as {format}")
+        if format == "prometheus":
+            return success_response({"contentType": "text/plain; version=0.0.4",
+                                     "text": prometheus_text(registry, cache, executor)})
+        if format != "json":
+            return error_response(f"Unsupported format: {format}. Use 'json' or 'prometheus'.", 400)
+        stats = registry.snapshot()
+        stats["requests"] = executor.metrics()
+        stats["cache"] = cache.stats()
+        stats["transport"] = transport_stats()
+        return success_response(stats)
+    return get_server_stats
+
+
+def list_accounts(accounts):
+    def list_accounts():
+        # Names accepted by the `account` argument of every tool, with their limits and current load.
+        logging.info("Listing configured accounts")
+        return success_response(accounts.stats())
+    return list_accounts
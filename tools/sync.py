@@ -0,0 +1,204 @@
+from utils.response_handler import success_response, error_response
+from utils.request_executor import execute, default_executor
+from utils.batch import execute_batch
+from utils.folder_walker import walk_tree, FOLDER_MIME_TYPE
+from utils.hashing import HashCache
+from utils.service_pool import report_progress, ContextThreadPoolExecutor
+from utils.state_store import StateStore
+from tools.transfer import aligned_chunk_size
+from config import STATE_DIR, UPLOAD_CHUNK_SIZE, SYNC_PARALLELISM
+from concurrent.futures import as_completed
+from googleapiclient.http import MediaFileUpload
+from googleapiclient.errors import HttpError
+from mcp.server.fastmcp import Context
+import logging
+import mimetypes
+import os
+
+SYNC_FIELDS = "id, name, mimeType, size, md5Checksum, parents"
+UPLOAD_FIELDS = "id, name, size, md5Checksum"
+
+hash_state = StateStore(STATE_DIR, "hashes")
+# Uploads run on their own threads so a large sync never holds more than SYNC_PARALLELISM transfers open.
+sync_executor = ContextThreadPoolExecutor(max_workers=SYNC_PARALLELISM, thread_name_prefix="gdrive-sync")
+
+
+def _remote_tree(service, folder_id):
+    # relative path -> Drive item for everything under folder_id, from a single walk of the tree.
+    # Drive allows duplicate names; the first item listed for a path wins.
+    paths, items = {folder_id: ""}, {}
+    for _, parent_id, children in walk_tree(service, folder_id, fields=SYNC_FIELDS):
+        base = paths.get(parent_id)
+        if base is None:
+            continue
+        for child in children:
+            path = f"{base}/{child['name']}" if base else child["name"]
+            if path in items:
+                continue
+            items[path] = child
+            if child["mimeType"] == FOLDER_MIME_TYPE:
+                paths[child["id"]] = path
+    return items
+
+
+def _local_tree(root):
+    folders, files = [], []
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        relative = os.path.relpath(directory, root).replace(os.sep, "/")
+        prefix = "" if relative == "." else f"{relative}/"
+        folders.extend(f"{prefix}{name}" for name in dirnames)
+        files.extend(f"{prefix}{name}" for name in sorted(filenames))
+    return folders, files
+
+
+def _create_folders(service, folder_id, local_folders, remote, dry_run):
+    # Missing folders are created one depth at a time, each level in batches, like create_folder_in_parent.
+    folder_ids = {"": folder_id}
+    folder_ids.update({path: item["id"] for path, item in remote.items() if item["mimeType"] == FOLDER_MIME_TYPE})
+    created, failed = [], {}
+    missing = [path for path in local_folders if path not in folder_ids]
+    for path in missing:
+        if path in remote:
+            failed[path] = "A file with this name already exists in Drive"
+    levels = {}
+    for path in missing:
+        if path not in failed:
+            levels.setdefault(path.count("/"), []).append(path)
+    for depth in sorted(levels):
+        requests = []
+        for path in levels[depth]:
+            parent, _, name = path.rpartition("/")
+            if parent not in folder_ids:
+                failed[path] = "Parent folder could not be created"
+            elif dry_run:
+                folder_ids[path] = None
+                created.append(path)
+            else:
+                requests.append((path, service.files().create(
+                    body={"name": name, "mimeType": FOLDER_MIME_TYPE, "parents": [folder_ids[parent]]},
+                    fields="id, name, parents"
+                )))
+        for path, result in execute_batch(service, requests).items():
+            if result["status"] == "success":
+                folder_ids[path] = result["data"]["id"]
+                created.append(path)
+            else:
+                failed[path] = result["error"]["message"]
+    return folder_ids, created, failed
+
+
+def _upload(service, path, size, name, parent_id, file_id):
+    # Files up to one chunk go in a single multipart request; larger ones use a resumable session.
+    mime_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    resumable = size > UPLOAD_CHUNK_SIZE
+    media = MediaFileUpload(path, mimetype=mime_type, chunksize=aligned_chunk_size(UPLOAD_CHUNK_SIZE), resumable=resumable)
+    try:
+        if file_id:
+            request = service.files().update(fileId=file_id, media_body=media, fields=UPLOAD_FIELDS, supportsAllDrives=True)
+        else:
+            request = service.files().create(body={"name": name, "parents": [parent_id]}, media_body=media,
+                                             fields=UPLOAD_FIELDS, supportsAllDrives=True)
+        if not resumable:
+            return execute(request)
+        file = None
+        while file is None:
+            _, file = default_executor.call(request.next_chunk, description="upload chunk", write=True)
+        return file
+    finally:
+        media.stream().close()
+
+
+def _sync_file(service, cache, hashes, root, relative, remote_item, parent_id, dry_run):
+    # Returns (outcome, size) where outcome is "uploaded", "updated" or "skipped".
+    path = os.path.join(root, *relative.split("/"))
+    stat = os.stat(path)
+    if remote_item is not None:
+        if "md5Checksum" not in remote_item:
+            raise ValueError("A folder or Google Workspace file with this name already exists in Drive")
+        if int(remote_item.get("size", -1)) == stat.st_size and \
+                hashes.md5(relative, path, stat) == remote_item["md5Checksum"]:
+            return "skipped", stat.st_size
+    outcome = "updated" if remote_item else "uploaded"
+    if dry_run:
+        return outcome, stat.st_size
+    try:
+        file = _upload(service, path, stat.st_size, relative.rpartition("/")[2], parent_id,
+                       remote_item["id"] if remote_item else None)
+    finally:
+        if remote_item:
+            cache.invalidate(remote_item["id"])
+    # Hashing after the upload both verifies it and leaves the digest cached for the next run.
+    if file.get("md5Checksum") and hashes.md5(relative, path, stat) != file["md5Checksum"]:
+        raise ValueError("Checksum mismatch after upload")
+    return outcome, stat.st_size
+
+
+def sync_directory(service, cache):
+    def sync_directory(local_path: str, parent_folder_id: str, dry_run: bool = False, ctx: Context = None):
+        # One-way sync of a local directory into a Drive folder. Files whose size and MD5 match the
+        # Drive copy are skipped; local MD5s are cached by size and mtime between runs. Nothing in
+        # Drive is deleted: files only present there are counted in remoteOnly.
+        logging.info(f"Syncing local directory '{local_path}' to folder ID: {parent_folder_id} (dry_run={dry_run})")
+        root = os.path.abspath(os.path.expanduser(local_path))
+        if not os.path.isdir(root):
+            return error_response(f"Local directory not found: {local_path}", 404)
+        try:
+            remote = _remote_tree(service, parent_folder_id)
+            local_folders, local_files = _local_tree(root)
+            folder_ids, created, failed = _create_folders(service, parent_folder_id, local_folders, remote, dry_run)
+
+            hashes = HashCache(hash_state, root)
+            counts = {"uploaded": 0, "updated": 0, "skipped": 0}
+            transferred = skipped_bytes = done = 0
+            futures = {}
+            for relative in local_files:
+                parent = relative.rpartition("/")[0]
+                if parent not in folder_ids:
+                    failed[relative] = "Parent folder could not be created"
+                    continue
+                futures[sync_executor.submit(_sync_file, service, cache, hashes, root, relative, remote.get(relative),
+                                             folder_ids[parent], dry_run)] = relative
+            for future in as_completed(futures):
+                try:
+                    outcome, size = future.result()
+                except HttpError as e:
+                    failed[futures[future]] = f"Google Drive API error: {e.content.decode()}"
+                    continue
+                except Exception as e:
+                    failed[futures[future]] = str(e)
+                    continue
+                counts[outcome] += 1
+                if outcome == "skipped":
+                    skipped_bytes += size
+                else:
+                    transferred += size
+                done += 1
+                report_progress(ctx, done, len(futures))
+            hashes.save()
+
+            local_paths = set(local_files) | set(local_folders)
+            remote_only = sorted(path for path, item in remote.items()
+                                 if item["mimeType"] != FOLDER_MIME_TYPE and path not in local_paths)
+            logging.info(f"Synced '{root}': {counts['uploaded']} uploaded, {counts['updated']} updated, "
+                         f"{counts['skipped']} unchanged, {len(failed)} failed")
+            return success_response({
+                "localPath": root,
+                "folderId": parent_folder_id,
+                "dryRun": dry_run,
+                **counts,
+                "foldersCreated": len(created),
+                "bytesTransferred": transferred,
+                "bytesSkipped": skipped_bytes,
+                "hashCacheHits": hashes.hits,
+                "remoteOnly": len(remote_only),
+                "remoteOnlySample": remote_only[:20],
+                "failed": failed
+            })
+        except HttpError as e:
+            logging.error(f"Google Drive API error when syncing directory: {e.resp.status} - {e.content.decode()}")
+            return error_response(f"Google Drive API error: {e.content.decode()}", e.resp.status)
+        except Exception as e:
+            logging.error(f"An unexpected error occurred while syncing '{local_path}': {e}")
+            return error_response(f"An unexpected error occurred: {e}")
+    return sync_directory
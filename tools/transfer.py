@@ -0,0 +1,304 @@
+from utils.response_handler import success_response, error_response
+from utils.request_executor import execute, default_executor
+from utils.service_pool import report_progress, account_name, ContextThreadPoolExecutor
+from utils.state_store import StateStore
+from utils.hashing import md5_file
+from config import STATE_DIR, UPLOAD_CHUNK_SIZE, DOWNLOAD_CHUNK_SIZE, DOWNLOAD_PARALLELISM
+from datetime import datetime
+from googleapiclient.http import MediaFileUpload, MediaIoBaseDownload
+from googleapiclient.errors import HttpError
+from mcp.server.fastmcp import Context
+import base64
+import io
+import logging
+import mimetypes
+import os
+
+CHUNK_ALIGNMENT = 256 * 1024
+PEEK_BYTES = 64 * 1024
+MAX_PEEK_BYTES = 4 * 1024 * 1024
+DOWNLOAD_FIELDS = "id, name, mimeType, size, md5Checksum, modifiedTime"
+
+upload_state = StateStore(STATE_DIR, "uploads")
+# Range fetches run on their own threads so they never wait behind the tool worker that started them.
+range_executor = ContextThreadPoolExecutor(max_workers=DOWNLOAD_PARALLELISM, thread_name_prefix="gdrive-range")
+
+
+def aligned_chunk_size(chunk_size: int) -> int:
+    # Drive requires resumable chunks to be a multiple of 256 KiB.
+    return max(CHUNK_ALIGNMENT, chunk_size - chunk_size % CHUNK_ALIGNMENT)
+
+
+def upload_local_file(service):
+    def upload_local_file(local_path: str, name: str = None, mime_type: str = None, parent_folder_id: str = None,
+                          chunk_size: int = UPLOAD_CHUNK_SIZE, ctx: Context = None):
+        logging.info(f"Uploading local file '{local_path}' to parent folder ID: {parent_folder_id}")
+        try:
+            local_path = os.path.abspath(os.path.expanduser(local_path))
+            stat = os.stat(local_path)
+            name = name or os.path.basename(local_path)
+            mime_type = mime_type or mimetypes.guess_type(local_path)[0] or "application/octet-stream"
+            state_key = upload_state.key(local_path, stat.st_size, stat.st_mtime_ns, name, parent_folder_id, account_name())
+
+            metadata = {"name": name}
+            if parent_folder_id:
+                metadata["parents"] = [parent_folder_id]
+            # MediaFileUpload reads one chunk at a time from disk, so memory stays bounded by chunk_size.
+            media = MediaFileUpload(local_path, mimetype=mime_type, chunksize=aligned_chunk_size(chunk_size), resumable=True)
+
+            def new_request():
+                return service.files().create(body=metadata, media_body=media, fields="id, name, mimeType, parents, size")
+
+            request = new_request()
+            saved = upload_state.load(state_key)
+            resumed_from, file = 0, None
+            try:
+                while file is None:
+                    try:
+                        if saved:
+                            request.resumable_uri = saved["resumable_uri"]
+                            file = default_executor.call(lambda: _resume_session(request, stat.st_size),
+                                                         description="upload status")
+                            resumed_from = request.resumable_progress
+                            logging.info(f"Resuming upload of '{local_path}' from saved session at byte {resumed_from}")
+                        while file is None:
+                            status, file = default_executor.call(request.next_chunk, description="upload chunk", write=True)
+                            if request.resumable_uri:
+                                upload_state.save(state_key, {"resumable_uri": request.resumable_uri,
+                                                              "progress": request.resumable_progress})
+                            if status:
+                                logging.info(f"Uploaded {status.resumable_progress}/{stat.st_size} bytes of '{name}'")
+                                report_progress(ctx, status.resumable_progress, stat.st_size)
+                    except HttpError as e:
+                        if not saved or e.resp.status not in (404, 410):
+                            raise
+                        # The saved session expired; start a new one in this call. saved is cleared,
+                        # so this happens at most once.
+                        logging.info(f"Saved upload session for '{local_path}' expired, starting over")
+                        upload_state.delete(state_key)
+                        saved, resumed_from, request = None, 0, new_request()
+            finally:
+                if file is None and request.resumable_uri and (saved or request.resumable_progress):
+                    upload_state.save(state_key, {"resumable_uri": request.resumable_uri, "progress": request.resumable_progress})
+                media.stream().close()
+
+            upload_state.delete(state_key)
+            report_progress(ctx, stat.st_size, stat.st_size)
+            logging.info(f"File '{name}' uploaded with ID: {file['id']} in parent {parent_folder_id}")
+            return success_response({**file, "bytesUploaded": stat.st_size - resumed_from, "resumedFromByte": resumed_from})
+        except FileNotFoundError:
+            return error_response(f"Local file not found: {local_path}", 404)
+        except HttpError as e:
+            logging.error(f"Google Drive API error when uploading local file: {e.resp.status} - {e.content.decode()}")
+            return error_response(f"Google Drive API error: {e.content.decode()}", e.resp.status)
+        except Exception as e:
+            logging.error(f"An unexpected error occurred during local file upload: {e}")
+            return error_response(f"An unexpected error occurred: {e}")
+    return upload_local_file
+
+
+
+def _resume_session(request, size: int):
+    # Asks Drive how much of a saved resumable session it already holds and continues from there.
+    # Returns the file when the whole upload had already arrived, otherwise None.
+    response, content = request.http.request(request.resumable_uri, method="PUT", body=b"",
+                                             headers={"Content-Range": f"bytes */{size}", "Content-Length": "0"})
+    if response.status in (200, 201):
+        request.resumable_progress = size
+        return request.postproc(response, content)
+    if response.status != 308:
+        raise HttpError(response, content, uri=request.resumable_uri)
+    received = response.get("range")
+    request.resumable_progress = int(received.rsplit("-", 1)[1]) + 1 if received else 0
+    return None
+
+
+def _encode_content(data: bytes):
+    try:
+        return data.decode("utf-8"), "utf-8"
+    except UnicodeDecodeError:
+        return base64.b64encode(data).decode("ascii"), "base64"
+
+
+def _file_metadata(service, cache, file_id):
+    file = cache.get(file_id, DOWNLOAD_FIELDS)
+    if file is None:
+        version = cache.version()
+        file = execute(service.files().get(fileId=file_id, fields=DOWNLOAD_FIELDS, supportsAllDrives=True))
+        cache.put(file_id, DOWNLOAD_FIELDS, file, version)
+    return file
+
+
+def _fetch_range(service, file_id, start, end):
+    request = service.files().get_media(fileId=file_id, supportsAllDrives=True)
+    request.headers["Range"] = f"bytes={start}-{end}"
+    return execute(request)
+
+
+def _modified_timestamp(modified_time):
+    return datetime.fromisoformat(modified_time.replace("Z", "+00:00")).timestamp()
+
+
+def _download_parallel(service, file_id, path, size, chunk_size, ctx):
+    with open(path, "wb") as f:
+        f.truncate(size)
+
+    def fetch(start):
+        end = min(start + chunk_size, size) - 1
+        data = _fetch_range(service, file_id, start, end)
+        with open(path, "r+b") as f:
+            f.seek(start)
+            f.write(data)
+        return len(data)
+
+    done = 0
+    for written in range_executor.map(fetch, range(0, size, chunk_size)):
+        done += written
+        report_progress(ctx, done, size)
+
+
+def _download_sequential(service, file_id, path, size, chunk_size, ctx):
+    with open(path, "wb") as f:
+        downloader = MediaIoBaseDownload(f, service.files().get_media(fileId=file_id, supportsAllDrives=True), chunksize=chunk_size)
+        finished = False
+        while not finished:
+            status, finished = default_executor.call(downloader.next_chunk, description="download chunk")
+            report_progress(ctx, status.resumable_progress, size)
+
+
+def download_file(service, cache):
+    def download_file(file_id: str, local_path: str = None, byte_range_start: int = None, byte_range_end: int = None,
+                      max_bytes: int = None, overwrite: bool = False, ctx: Context = None):
+        # Without local_path this is a peek: the requested byte range (or the first max_bytes) is returned inline.
+        logging.info(f"Downloading file ID: {file_id} to {local_path or 'inline content'}")
+        if (byte_range_start is not None and byte_range_start < 0) or (byte_range_end is not None and byte_range_end < 0):
+            return error_response("byte_range_start and byte_range_end must not be negative", 400)
+        if byte_range_end is not None and byte_range_end < (byte_range_start or 0):
+            return error_response("byte_range_end must not be less than byte_range_start", 400)
+        if max_bytes is not None and max_bytes <= 0:
+            return error_response("max_bytes must be positive", 400)
+        if local_path is not None and (byte_range_start, byte_range_end, max_bytes) != (None, None, None):
+            return error_response("byte_range_start, byte_range_end and max_bytes only apply without local_path; "
+                                  "a download to local_path always saves the whole file", 400)
+        try:
+            file = _file_metadata(service, cache, file_id)
+            if file.get("mimeType", "").startswith("application/vnd.google-apps."):
+                return error_response(f"'{file.get('name')}' is a Google Workspace file. Use export_file instead.", 400)
+            size = int(file.get("size", 0))
+
+            if local_path is None:
+                start = byte_range_start or 0
+                if byte_range_end is None:
+                    byte_range_end = start + min(max_bytes or PEEK_BYTES, MAX_PEEK_BYTES) - 1
+                end = min(byte_range_end, start + MAX_PEEK_BYTES - 1, size - 1)
+                data = _fetch_range(service, file_id, start, end) if size and start < size else b""
+                content, encoding = _encode_content(data)
+                logging.info(f"Read {len(data)} bytes of '{file.get('name')}' starting at byte {start}")
+                return success_response({
+                    "id": file_id, "name": file.get("name"), "size": size, "rangeStart": start,
+                    "bytesRead": len(data), "content": content, "encoding": encoding
+                })
+
+            path = os.path.abspath(os.path.expanduser(local_path))
+            if os.path.isdir(path):
+                path = os.path.join(path, file["name"])
+            expected_md5 = file.get("md5Checksum")
+            if os.path.exists(path) and not overwrite:
+                if expected_md5 and os.path.getsize(path) == size and md5_file(path) == expected_md5:
+                    logging.info(f"Local copy of '{file['name']}' at {path} is up to date, skipping download")
+                    return success_response({"id": file_id, "name": file["name"], "localPath": path, "size": size,
+                                             "md5Checksum": expected_md5, "skipped": True})
+                return error_response(f"{path} already exists and differs from '{file['name']}'. "
+                                      "Pass overwrite=True to replace it.", 409)
+
+            part_path = f"{path}.part"
+            try:
+                if size > DOWNLOAD_CHUNK_SIZE and DOWNLOAD_PARALLELISM > 1:
+                    _download_parallel(service, file_id, part_path, size, DOWNLOAD_CHUNK_SIZE, ctx)
+                else:
+                    _download_sequential(service, file_id, part_path, size, DOWNLOAD_CHUNK_SIZE, ctx)
+                if expected_md5 and md5_file(part_path) != expected_md5:
+                    return error_response(f"Checksum mismatch downloading '{file['name']}'", 502)
+                os.replace(part_path, path)
+            finally:
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+
+            logging.info(f"Downloaded '{file['name']}' ({size} bytes) to {path}")
+            return success_response({"id": file_id, "name": file["name"], "localPath": path, "size": size,
+                                     "md5Checksum": expected_md5, "skipped": False})
+        except HttpError as e:
+            logging.error(f"Google Drive API error when downloading file: {e.resp.status} - {e.content.decode()}")
+            return error_response(f"Google Drive API error: {e.content.decode()}", e.resp.status)
+        except Exception as e:
+            logging.error(f"An unexpected error occurred while downloading file {file_id}: {e}")
+            return error_response(f"An unexpected error occurred: {e}")
+    return download_file
+
+
+def export_file(service, cache):
+    def export_file(file_id: str, mime_type: str = "application/pdf", local_path: str = None, max_bytes: int = None,
+                    overwrite: bool = False, ctx: Context = None):
+        # Exports a Google Workspace file. Without local_path the first max_bytes of the export are returned inline.
+        logging.info(f"Exporting file ID: {file_id} as {mime_type} to {local_path or 'inline content'}")
+        if local_path is not None and max_bytes is not None:
+            return error_response("max_bytes only applies without local_path; an export to local_path always saves "
+                                  "the whole file", 400)
+        try:
+            file = _file_metadata(service, cache, file_id)
+            request = service.files().export_media(fileId=file_id, mimeType=mime_type)
+
+            if local_path is None:
+                limit = min(max_bytes or PEEK_BYTES, MAX_PEEK_BYTES)
+                buffer = io.BytesIO()
+                downloader = MediaIoBaseDownload(buffer, request, chunksize=CHUNK_ALIGNMENT)
+                finished = False
+                while not finished and buffer.tell() < limit:
+                    _, finished = default_executor.call(downloader.next_chunk, description="export chunk")
+                data = buffer.getvalue()[:limit]
+                content, encoding = _encode_content(data)
+                return success_response({
+                    "id": file_id, "name": file.get("name"), "mimeType": mime_type,
+                    "bytesRead": len(data), "truncated": not finished or buffer.tell() > limit,
+                    "content": content, "encoding": encoding
+                })
+
+            path = os.path.abspath(os.path.expanduser(local_path))
+            if os.path.isdir(path):
+                extension = mimetypes.guess_extension(mime_type) or ""
+                path = os.path.join(path, f"{file['name']}{extension}")
+            # Exports carry no checksum, so a local copy at least as new as the Drive file counts as current.
+            modified = _modified_timestamp(file["modifiedTime"]) if file.get("modifiedTime") else None
+            if os.path.exists(path) and not overwrite:
+                if modified and os.path.getmtime(path) >= modified:
+                    logging.info(f"Exported copy of '{file['name']}' at {path} is up to date, skipping export")
+                    return success_response({"id": file_id, "name": file["name"], "localPath": path,
+                                             "size": os.path.getsize(path), "skipped": True})
+                return error_response(f"{path} already exists and is older than '{file['name']}'. "
+                                      "Pass overwrite=True to replace it.", 409)
+
+            part_path = f"{path}.part"
+            try:
+                with open(part_path, "wb") as f:
+                    downloader = MediaIoBaseDownload(f, request, chunksize=DOWNLOAD_CHUNK_SIZE)
+                    finished = False
+                    while not finished:
+                        status, finished = default_executor.call(downloader.next_chunk, description="export chunk")
+                        report_progress(ctx, status.resumable_progress, status.total_size)
+                if modified:
+                    os.utime(part_path, (modified, modified))
+                os.replace(part_path, path)
+            finally:
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+
+            logging.info(f"Exported '{file['name']}' as {mime_type} to {path}")
+            return success_response({"id": file_id, "name": file["name"], "localPath": path,
+                                     "size": os.path.getsize(path), "skipped": False})
+        except HttpError as e:
+            logging.error(f"Google Drive API error when exporting file: {e.resp.status} - {e.content.decode()}")
+            return error_response(f"Google Drive API error: {e.content.decode()}", e.resp.status)
+        except Exception as e:
+            logging.error(f"An unexpected error occurred while exporting file {file_id}: {e}")
+            return error_response(f"An unexpected error occurred: {e}")
+    return export_file
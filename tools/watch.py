@@ -0,0 +1,74 @@
+from utils.response_handler import success_response, error_response
+from utils.service_pool import on_default_account, resource_notifier
+from googleapiclient.errors import HttpError
+from mcp.server.fastmcp import Context
+import json
+import logging
+
+
+def watch_folder(watcher):
+    def watch_folder(folder_id: str = None, ctx: Context = None):
+        # Subscribes to changes to the direct children of folder_id (all of Drive when omitted).
+        # Events are added, changed, trashed, removed and movedOut; the client is sent a resource
+        # update for resourceUri whenever new ones arrive, and reads them with get_folder_changes.
+        logging.info(f"Watching folder ID: {folder_id or 'all of Drive'}")
+        if not on_default_account():
+            return error_response("Watching changes is only available for the default account.", 400)
+        try:
+            subscription = watcher.subscribe(folder_id, resource_notifier(ctx))
+            return success_response({
+                "subscriptionId": subscription.id,
+                "resourceUri": subscription.uri,
+                "folderId": folder_id,
+                "mode": watcher.mode,
+                "watchedFiles": len(subscription.known_ids)
+            })
+        except HttpError as e:
+            logging.error(f"Google Drive API error: {e.resp.status} - {e.content.decode()}")
+            return error_response(f"Google Drive API error: {e.content.decode()}", e.resp.status)
+        except Exception as e:
+            logging.error(f"An unexpected error occurred: {e}")
+            return error_response(f"An unexpected error occurred: {e}")
+    return watch_folder
+
+
+def get_folder_changes(watcher):
+    def get_folder_changes(subscription_id: str, after: int = 0, refresh: bool = False):
+        # Events with a seq greater than `after`; pass the returned lastSeq next time. refresh=True
+        # checks Drive first instead of waiting for the next notification or poll.
+        logging.info(f"Fetching changes for subscription {subscription_id} after {after}")
+        subscription = watcher.get(subscription_id)
+        if subscription is None:
+            return error_response(f"Unknown subscription: {subscription_id}", 404)
+        try:
+            if refresh:
+                watcher.poll()
+            result = subscription.since(after)
+            result["watcher"] = watcher.stats()
+            return success_response(result)
+        except HttpError as e:
+            logging.error(f"Google Drive API error: {e.resp.status} - {e.content.decode()}")
+            return error_response(f"Google Drive API error: {e.content.decode()}", e.resp.status)
+        except Exception as e:
+            logging.error(f"An unexpected error occurred: {e}")
+            return error_response(f"An unexpected error occurred: {e}")
+    return get_folder_changes
+
+
+def unwatch_folder(watcher):
+    def unwatch_folder(subscription_id: str):
+        logging.info(f"Removing subscription {subscription_id}")
+        if not watcher.unsubscribe(subscription_id):
+            return error_response(f"Unknown subscription: {subscription_id}", 404)
+        return success_response({"subscriptionId": subscription_id, "removed": True})
+    return unwatch_folder
+
+
+def changes_resource(watcher):
+    def changes_resource(subscription_id: str) -> str:
+        # The gdrive://changes/{subscription_id} resource: the buffered events of a subscription.
+        subscription = watcher.get(subscription_id)
+        if subscription is None:
+            raise ValueError(f"Unknown subscription: {subscription_id}")
+        return json.dumps(subscription.since(0))
+    return changes_resource
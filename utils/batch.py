@@ -0,0 +1,68 @@
+from utils.response_handler import success_response, error_response
+from utils.request_executor import default_executor, is_rate_limited, is_write, measure_sizes
+from googleapiclient.errors import HttpError
+from typing import Any, Dict, List, Tuple
+import logging
+
+BATCH_LIMIT = 100
+
+
+def _chunks(items: List[Any], size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def execute_batch(service, requests: List[Tuple[Any, Any]], batch_size: int = BATCH_LIMIT) -> Dict[Any, Dict[str, Any]]:
+    # requests is a list of (key, HttpRequest). Each item counts against the shared rate
+    # limiter. Rate-limited items are retried in smaller batches with the executor's
+    # backoff; everything else is final after one pass.
+    results = {}
+    pending = list(requests)
+    batch_size = max(1, min(batch_size, BATCH_LIMIT))
+
+    for attempt in range(default_executor.max_retries + 1):
+        rate_limited = []
+        for chunk in _chunks(pending, batch_size):
+            by_id = {str(i): item for i, item in enumerate(chunk)}
+
+            def callback(request_id, response, exception, by_id=by_id):
+                key, request = by_id[request_id]
+                if exception is None:
+                    results[key] = success_response(response)
+                elif isinstance(exception, HttpError) and is_rate_limited(exception):
+                    rate_limited.append((key, request))
+                elif isinstance(exception, HttpError):
+                    results[key] = error_response(f"Google Drive API error: {exception.content.decode()}", exception.resp.status)
+                else:
+                    results[key] = error_response(f"An unexpected error occurred: {exception}")
+
+            batch = service.new_batch_http_request(callback=callback)
+            for request_id, (_, request) in by_id.items():
+                batch.add(request, request_id=request_id)
+            sizes = measure_sizes(request for _, request in chunk)
+            default_executor.call(batch.execute, cost=len(chunk), description="batch request", sizes=sizes,
+                                  write=any(is_write(request) for _, request in chunk))
+
+        if not rate_limited:
+            break
+        pending = rate_limited
+        if attempt < default_executor.max_retries:
+            batch_size = max(1, batch_size // 2)
+            delay = default_executor.wait_before_retry(attempt, "batch item rate limit")
+            logging.warning(f"{len(pending)} batch items rate-limited, retried after {delay:.1f}s with batch size {batch_size}")
+    else:
+        for key, _ in pending:
+            results[key] = error_response("Google Drive API rate limit exceeded after retries", 429)
+
+    return results
+
+
+def batch_summary(file_ids: List[str], results: Dict[Any, Dict[str, Any]]) -> Dict[str, Any]:
+    # results are keyed by position so the same file may appear more than once.
+    items = [{"fileId": file_id, **results[i]} for i, file_id in enumerate(file_ids)]
+    succeeded = sum(1 for item in items if item["status"] == "success")
+    return {
+        "results": items,
+        "succeeded": succeeded,
+        "failed": len(items) - succeeded
+    }
@@ -0,0 +1,315 @@
+from utils.request_executor import execute
+from utils.file_index import FILE_FIELDS
+from utils.folder_walker import FOLDER_MIME_TYPE
+from utils.query_builder import escape_literal
+from config import (WATCH_POLL_MIN_INTERVAL, WATCH_POLL_MAX_INTERVAL, WATCH_EVENT_BUFFER, WEBHOOK_URL,
+                    WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_CHANNEL_TTL)
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+import logging
+import secrets
+import threading
+import time
+import uuid
+
+CHANGE_FIELDS = f"nextPageToken, newStartPageToken, changes(fileId, removed, time, file({FILE_FIELDS}, createdTime))"
+# A channel is renewed this many seconds before Drive would expire it.
+CHANNEL_RENEW_MARGIN = 120
+
+
+def _parse_time(value: Optional[str]) -> float:
+    if not value:
+        return 0.0
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone(timezone.utc).timestamp()
+
+
+class Subscription:
+
+    def __init__(self, folder_id: Optional[str], known_ids: set, notify: Optional[Callable[[str], None]]):
+        self.id = uuid.uuid4().hex[:16]
+        self.folder_id = folder_id
+        self.known_ids = known_ids
+        self.notify = notify
+        self.created_at = time.time()
+        self.events: deque = deque(maxlen=WATCH_EVENT_BUFFER)
+        self.seq = 0
+        # The watcher thread records while tool calls read, and a deque cannot be iterated while it changes.
+        self._lock = threading.Lock()
+        # Set when events were recorded since the client was last notified.
+        self.pending = False
+
+    @property
+    def uri(self) -> str:
+        return f"gdrive://changes/{self.id}"
+
+    def classify(self, change: Dict[str, Any]) -> Optional[str]:
+        # The event this change means for the watched folder, or None when it is outside it.
+        file_id, file = change["fileId"], change.get("file")
+        known = file_id in self.known_ids
+        if change.get("removed") or not file:
+            self.known_ids.discard(file_id)
+            return "removed" if known or self.folder_id is None else None
+        inside = self.folder_id is None or self.folder_id in file.get("parents", [])
+        if file.get("trashed"):
+            self.known_ids.discard(file_id)
+            return "trashed" if inside or known else None
+        if not inside:
+            self.known_ids.discard(file_id)
+            return "movedOut" if known else None
+        self.known_ids.add(file_id)
+        if known:
+            return "changed"
+        if self.folder_id is not None or _parse_time(file.get("createdTime")) >= self.created_at:
+            return "added"
+        return "changed"
+
+    def record(self, event: Dict[str, Any]) -> None:
+        with self._lock:
+            self.seq += 1
+            self.events.append({"seq": self.seq, **event})
+
+    def since(self, after: int) -> Dict[str, Any]:
+        with self._lock:
+            buffered, seq = list(self.events), self.seq
+        events = [event for event in buffered if event["seq"] > after]
+        oldest = buffered[0]["seq"] if buffered else seq + 1
+        return {"events": events, "lastSeq": seq, "missedEvents": max(0, oldest - after - 1)}
+
+
+class ChangeWatcher:
+    # Follows the Drive changes feed for the default account on a background thread and turns it
+    # into per-folder events. Every change also invalidates the metadata cache and, once it is
+    # seeded, updates the local file index, so both stay current without re-listing.
+    #
+    # Polling backs off from WATCH_POLL_MIN_INTERVAL to WATCH_POLL_MAX_INTERVAL while nothing
+    # changes. With GDRIVE_WEBHOOK_URL set, a changes().watch channel delivers notifications to
+    # a local receiver that wakes the thread at once, and polling only runs as a slow safety net.
+
+    def __init__(self, service, cache=None, index=None, webhook_url: Optional[str] = WEBHOOK_URL,
+                 min_interval: float = WATCH_POLL_MIN_INTERVAL, max_interval: float = WATCH_POLL_MAX_INTERVAL):
+        self.service = service
+        self.cache = cache
+        self.index = index
+        self.webhook_url = webhook_url
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.interval = min_interval
+        self._subscriptions: Dict[str, Subscription] = {}
+        self._page_token: Optional[str] = None
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._stopped = False
+        self._thread: Optional[threading.Thread] = None
+        self._channel: Optional[Dict[str, Any]] = None
+        self._channel_token = secrets.token_urlsafe(24)
+        self._receiver = None
+        self.polls = 0
+        self.changes_seen = 0
+        self.notifications = 0
+        self.errors = 0
+
+    @property
+    def mode(self) -> str:
+        return "webhook" if self._channel else "polling"
+
+    def subscribe(self, folder_id: Optional[str] = None, notify: Optional[Callable[[str], None]] = None) -> Subscription:
+        # Runs on a tool worker thread. The start token is taken before the folder is listed, so
+        # nothing that happens in between is missed.
+        with self._lock:
+            if self._page_token is None:
+                self._page_token = execute(self.service.changes().getStartPageToken())["startPageToken"]
+        known_ids = self._children(folder_id) if folder_id else set()
+        subscription = Subscription(folder_id, known_ids, notify)
+        with self._lock:
+            self._subscriptions[subscription.id] = subscription
+            self._start()
+        self.interval = self.min_interval
+        self._wake.set()
+        logging.info(f"Watching {folder_id or 'all of Drive'} as subscription {subscription.id} ({self.mode})")
+        return subscription
+
+    def unsubscribe(self, subscription_id: str) -> bool:
+        with self._lock:
+            return self._subscriptions.pop(subscription_id, None) is not None
+
+    def get(self, subscription_id: str) -> Optional[Subscription]:
+        with self._lock:
+            return self._subscriptions.get(subscription_id)
+
+    def poll(self) -> int:
+        # Applies every change since the last poll; returns how many there were.
+        with self._lock:
+            if self._page_token is None:
+                return 0
+            subscriptions = list(self._subscriptions.values())
+            page_token, applied = self._page_token, 0
+            while page_token:
+                response = execute(self.service.changes().list(
+                    pageToken=page_token, pageSize=1000, includeRemoved=True, spaces="drive", fields=CHANGE_FIELDS
+                ))
+                for change in response.get("changes", []):
+                    self._apply(change, subscriptions)
+                    applied += 1
+                if "newStartPageToken" in response:
+                    page_token = response["newStartPageToken"]
+                    break
+                page_token = response.get("nextPageToken")
+            self._page_token = page_token
+            self.polls += 1
+            self.changes_seen += applied
+        for subscription in subscriptions:
+            if subscription.notify and subscription.pending:
+                subscription.pending = False
+                subscription.notify(subscription.uri)
+        return applied
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            subscriptions = len(self._subscriptions)
+        return {
+            "mode": self.mode,
+            "subscriptions": subscriptions,
+            "pollIntervalSeconds": self.interval,
+            "polls": self.polls,
+            "changesSeen": self.changes_seen,
+            "webhookNotifications": self.notifications,
+            "errors": self.errors,
+            "channelExpiresAt": self._channel["expiresAt"] if self._channel else None
+        }
+
+    def close(self) -> None:
+        self._stopped = True
+        self._wake.set()
+        self._stop_channel()
+        if self._receiver:
+            self._receiver.shutdown()
+            self._receiver.server_close()
+            self._receiver = None
+
+    def _children(self, folder_id: str) -> set:
+        ids, page_token = set(), None
+        while True:
+            params = {"q": f"'{escape_literal(folder_id)}' in parents and trashed = false", "pageSize": 1000,
+                      "fields": "nextPageToken, files(id)"}
+            if page_token:
+                params["pageToken"] = page_token
+            response = execute(self.service.files().list(**params))
+            ids.update(file["id"] for file in response.get("files", []))
+            page_token = response.get("nextPageToken")
+            if not page_token:
+                return ids
+
+    def _apply(self, change: Dict[str, Any], subscriptions: List[Subscription]) -> None:
+        file = change.get("file") or {}
+        if self.cache is not None:
+            if file.get("mimeType") == FOLDER_MIME_TYPE:
+                self.cache.invalidate_tree(change["fileId"])
+            else:
+                self.cache.invalidate(change["fileId"])
+        if self.index is not None and self.index.is_seeded():
+            self.index.apply_change(change)
+        for subscription in subscriptions:
+            event_type = subscription.classify(change)
+            if event_type:
+                subscription.record({"type": event_type, "fileId": change["fileId"], "name": file.get("name"),
+                                     "mimeType": file.get("mimeType"), "time": change.get("time")})
+                subscription.pending = True
+
+    def _start(self) -> None:
+        if self._thread is not None:
+            return
+        if self.webhook_url:
+            self._open_channel()
+        self._thread = threading.Thread(target=self._run, name="gdrive-watcher", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped:
+            with self._lock:
+                idle = not self._subscriptions
+            if idle:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            self._wake.clear()
+            try:
+                if self._channel and time.time() > self._channel["expiresAt"] - CHANNEL_RENEW_MARGIN:
+                    self._renew_channel()
+                changed = self.poll()
+                self.interval = self.min_interval if changed else min(self.interval * 2, self.max_interval)
+            except Exception as e:
+                self.errors += 1
+                self.interval = self.max_interval
+                logging.error(f"Polling Drive changes failed: {e}")
+            self._wake.wait(self.max_interval if self._channel else self.interval)
+
+    def _open_channel(self) -> None:
+        # Drive only posts to public HTTPS addresses, so GDRIVE_WEBHOOK_URL is whatever tunnel or
+        # proxy forwards to the local receiver. Without a channel the watcher simply polls.
+        try:
+            if self._receiver is None:
+                self._receiver = start_webhook_receiver(WEBHOOK_PORT, self._on_notification, WEBHOOK_HOST)
+            channel_id = str(uuid.uuid4())
+            response = execute(self.service.changes().watch(
+                pageToken=self._page_token, includeRemoved=True, spaces="drive",
+                body={"id": channel_id, "type": "web_hook", "address": self.webhook_url, "token": self._channel_token,
+                      "expiration": int((time.time() + WEBHOOK_CHANNEL_TTL) * 1000)}
+            ))
+            expires = int(response.get("expiration") or 0) / 1000 or time.time() + WEBHOOK_CHANNEL_TTL
+            self._channel = {"id": channel_id, "resourceId": response["resourceId"], "expiresAt": expires}
+            logging.info(f"Opened Drive changes channel {channel_id} until {datetime.fromtimestamp(expires, timezone.utc)}")
+        except Exception as e:
+            self._channel = None
+            logging.warning(f"Could not open a Drive changes channel, polling instead: {e}")
+
+    def _renew_channel(self) -> None:
+        old = self._channel
+        self._open_channel()
+        if old:
+            self._stop_channel(old)
+
+    def _stop_channel(self, channel: Optional[Dict[str, Any]] = None) -> None:
+        channel = channel or self._channel
+        if channel is None:
+            return
+        if channel is self._channel:
+            self._channel = None
+        try:
+            execute(self.service.channels().stop(body={"id": channel["id"], "resourceId": channel["resourceId"]}))
+        except Exception as e:
+            logging.warning(f"Could not stop Drive changes channel {channel['id']}: {e}")
+
+    def _on_notification(self, headers) -> bool:
+        channel = self._channel
+        if channel is None or headers.get("X-Goog-Channel-ID") != channel["id"]:
+            return False
+        if not secrets.compare_digest(headers.get("X-Goog-Channel-Token", ""), self._channel_token):
+            return False
+        self.notifications += 1
+        if headers.get("X-Goog-Resource-State") != "sync":
+            self._wake.set()
+        return True
+
+
+def start_webhook_receiver(port: int, on_notification: Callable[[Any], bool], host: str = "127.0.0.1"):
+    # Accepts Drive's channel notifications on a daemon thread. They carry no body; the headers
+    # say which channel fired, and anything not from the current channel is refused.
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                self.rfile.read(length)
+            self.send_response(200 if on_notification(self.headers) else 404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="gdrive-webhook", daemon=True).start()
+    return server
@@ -0,0 +1,266 @@
+from utils.request_executor import execute, default_executor
+from typing import Any, Dict, List, Optional
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+INDEXED_FIELDS = ("id", "name", "mimeType", "parents", "modifiedTime", "owners", "trashed", "starred")
+FILE_FIELDS = "id, name, mimeType, parents, modifiedTime, owners(emailAddress, displayName), trashed, starred"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    mime_type TEXT,
+    modified_time TEXT,
+    owners TEXT,
+    trashed INTEGER NOT NULL DEFAULT 0,
+    starred INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS file_parents (
+    file_id TEXT NOT NULL,
+    parent_id TEXT NOT NULL,
+    PRIMARY KEY (file_id, parent_id)
+);
+CREATE TABLE IF NOT EXISTS file_owners (
+    file_id TEXT NOT NULL,
+    email TEXT NOT NULL,
+    PRIMARY KEY (file_id, email)
+);
+CREATE INDEX IF NOT EXISTS idx_files_name ON files(name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS idx_files_modified ON files(modified_time);
+CREATE INDEX IF NOT EXISTS idx_parents_parent ON file_parents(parent_id);
+CREATE INDEX IF NOT EXISTS idx_owners_email ON file_owners(email);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class FileIndex:
+
+    def __init__(self, path: str, sync_interval: float = 30.0):
+        self.path = path
+        self.sync_interval = sync_interval
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.RLock()
+        # Held for a whole seed or sync, so only one of them talks to Drive at a time.
+        self._sync_lock = threading.RLock()
+        self._last_sync = 0.0
+        # default_executor.writes at the start of the last sync.
+        self._synced_writes = -1
+
+    def is_seeded(self) -> bool:
+        return self._get_meta("start_page_token") is not None
+
+    def can_answer(self, contains_text=None, shared_with_me=None, fields=None, any_of=None, exclude=None) -> bool:
+        if contains_text or shared_with_me or any_of or exclude:
+            return False
+        return all(field.split("(", 1)[0].strip() in INDEXED_FIELDS for field in (fields or []))
+
+    def seed(self, service) -> Dict[str, Any]:
+        # Take the start token first so changes made during the crawl are replayed by sync(). Pages
+        # are fetched outside the index lock and committed one at a time, and the index reports
+        # itself unseeded until the crawl ends, so searches go to the API meanwhile instead of waiting.
+        with self._sync_lock:
+            writes = default_executor.writes
+            start_token = execute(service.changes().getStartPageToken())["startPageToken"]
+            root_id = execute(service.files().get(fileId="root", fields="id"))["id"]
+            started = time.perf_counter()
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM meta WHERE key = 'start_page_token'")
+                self._conn.execute("DELETE FROM files")
+                self._conn.execute("DELETE FROM file_parents")
+                self._conn.execute("DELETE FROM file_owners")
+            count, page_token = 0, None
+            while True:
+                params = {"pageSize": 1000, "fields": f"nextPageToken, files({FILE_FIELDS})", "spaces": "drive"}
+                if page_token:
+                    params["pageToken"] = page_token
+                response = execute(service.files().list(**params))
+                files = response.get("files", [])
+                with self._lock, self._conn:
+                    for file in files:
+                        self._upsert(file)
+                count += len(files)
+                page_token = response.get("nextPageToken")
+                if not page_token:
+                    break
+            with self._lock, self._conn:
+                self._set_meta("root_id", root_id)
+                self._set_meta("start_page_token", start_token)
+                self._last_sync, self._synced_writes = time.monotonic(), writes
+            logging.info(f"Seeded file index with {count} files in {time.perf_counter() - started:.1f}s")
+            return {"indexedFiles": count, "pageToken": start_token}
+
+    def sync(self, service) -> Dict[str, Any]:
+        # Like seed, each page of changes is applied and its token saved in one short transaction.
+        with self._sync_lock:
+            page_token = self._get_meta("start_page_token")
+            if page_token is None:
+                return self.seed(service)
+            writes = default_executor.writes
+            applied = 0
+            while True:
+                response = execute(service.changes().list(
+                    pageToken=page_token,
+                    pageSize=1000,
+                    includeRemoved=True,
+                    spaces="drive",
+                    fields=f"nextPageToken, newStartPageToken, changes(fileId, removed, file({FILE_FIELDS}))"
+                ))
+                page_token = response.get("newStartPageToken") or response.get("nextPageToken")
+                with self._lock, self._conn:
+                    for change in response.get("changes", []):
+                        self._apply_change(change)
+                    self._set_meta("start_page_token", page_token)
+                applied += len(response.get("changes", []))
+                if "newStartPageToken" in response or not response.get("nextPageToken"):
+                    break
+            with self._lock:
+                self._last_sync, self._synced_writes = time.monotonic(), writes
+            return {"appliedChanges": applied, "pageToken": page_token, "indexedFiles": self.count()}
+
+    def sync_if_stale(self, service) -> None:
+        # Anything this server wrote since the last sync must show up in the next answer; changes
+        # made elsewhere are picked up once the interval has passed.
+        if default_executor.writes != self._synced_writes or time.monotonic() - self._last_sync >= self.sync_interval:
+            self.sync(service)
+
+    def apply_change(self, change: Dict[str, Any]) -> None:
+        with self._lock, self._conn:
+            self._apply_change(change)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def search(
+            self,
+            name: Optional[str] = None,
+            exact_name: bool = False,
+            mime_type: Optional[str] = None,
+            modified_after: Optional[str] = None,
+            modified_before: Optional[str] = None,
+            parent_folder_id: Optional[str] = None,
+            starred: Optional[bool] = None,
+            trashed: Optional[bool] = None,
+            owner_email: Optional[str] = None,
+            folders_only: bool = False,
+            exclude_folders: bool = False,
+            limit: int = 20,
+            offset: int = 0
+        ) -> List[Dict[str, Any]]:
+        # name matches like Drive's `name contains`: names that start with it, ignoring case.
+        clauses, args = [], []
+        if name:
+            if exact_name:
+                clauses.append("f.name = ?")
+                args.append(name)
+            else:
+                clauses.append("f.name LIKE ? ESCAPE '\\'")
+                args.append(f"{_escape_like(name)}%")
+        if mime_type:
+            clauses.append("f.mime_type = ?")
+            args.append(mime_type)
+        elif folders_only:
+            clauses.append("f.mime_type = ?")
+            args.append(FOLDER_MIME_TYPE)
+        elif exclude_folders:
+            clauses.append("f.mime_type != ?")
+            args.append(FOLDER_MIME_TYPE)
+        if modified_after:
+            clauses.append("f.modified_time > ?")
+            args.append(modified_after)
+        if modified_before:
+            clauses.append("f.modified_time < ?")
+            args.append(modified_before)
+        if parent_folder_id:
+            if parent_folder_id == "root":
+                parent_folder_id = self._get_meta("root_id") or parent_folder_id
+            clauses.append("f.id IN (SELECT file_id FROM file_parents WHERE parent_id = ?)")
+            args.append(parent_folder_id)
+        if starred is not None:
+            clauses.append("f.starred = ?")
+            args.append(int(starred))
+        if trashed is not None:
+            clauses.append("f.trashed = ?")
+            args.append(int(trashed))
+        if owner_email:
+            clauses.append("f.id IN (SELECT file_id FROM file_owners WHERE email = ?)")
+            args.append(owner_email)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT f.* FROM files f {where} ORDER BY f.modified_time DESC, f.id LIMIT ? OFFSET ?"
+        with self._lock:
+            rows = self._conn.execute(sql, args + [limit, offset]).fetchall()
+            return [self._row_to_file(row) for row in rows]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _row_to_file(self, row: sqlite3.Row) -> Dict[str, Any]:
+        parents = [r[0] for r in self._conn.execute(
+            "SELECT parent_id FROM file_parents WHERE file_id = ?", (row["id"],)
+        )]
+        return {
+            "id": row["id"],
+            "name": row["name"],
+            "mimeType": row["mime_type"],
+            "parents": parents,
+            "modifiedTime": row["modified_time"],
+            "owners": json.loads(row["owners"] or "[]"),
+            "trashed": bool(row["trashed"]),
+            "starred": bool(row["starred"])
+        }
+
+    def _upsert(self, file: Dict[str, Any]) -> None:
+        owners = file.get("owners", [])
+        self._conn.execute(
+            "INSERT OR REPLACE INTO files (id, name, mime_type, modified_time, owners, trashed, starred) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (file["id"], file.get("name", ""), file.get("mimeType"), file.get("modifiedTime"),
+             json.dumps(owners), int(file.get("trashed", False)), int(file.get("starred", False)))
+        )
+        self._conn.execute("DELETE FROM file_parents WHERE file_id = ?", (file["id"],))
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO file_parents (file_id, parent_id) VALUES (?, ?)",
+            [(file["id"], parent) for parent in file.get("parents", [])]
+        )
+        self._conn.execute("DELETE FROM file_owners WHERE file_id = ?", (file["id"],))
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO file_owners (file_id, email) VALUES (?, ?)",
+            [(file["id"], owner["emailAddress"]) for owner in owners if owner.get("emailAddress")]
+        )
+
+    def _apply_change(self, change: Dict[str, Any]) -> None:
+        file = change.get("file")
+        if change.get("removed") or not file:
+            self._delete(change["fileId"])
+        else:
+            self._upsert(file)
+
+    def _delete(self, file_id: str) -> None:
+        self._conn.execute("DELETE FROM files WHERE id = ?", (file_id,))
+        self._conn.execute("DELETE FROM file_parents WHERE file_id = ?", (file_id,))
+        self._conn.execute("DELETE FROM file_owners WHERE file_id = ?", (file_id,))
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else None
+
+    def _set_meta(self, key: str, value: str) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
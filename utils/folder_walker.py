@@ -0,0 +1,56 @@
+from utils.request_executor import execute
+from utils.service_pool import ContextThreadPoolExecutor
+from config import TREE_CONCURRENCY
+from typing import Any, Dict, Iterator, List, Tuple
+
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+# How many folders share one "'a' in parents or 'b' in parents" listing query.
+PARENTS_PER_QUERY = 20
+
+tree_executor = ContextThreadPoolExecutor(max_workers=TREE_CONCURRENCY, thread_name_prefix="gdrive-tree")
+
+
+def _list_children(service, folder_ids: List[str], fields: str) -> Dict[str, List[Dict[str, Any]]]:
+    parents_clause = " or ".join(f"'{folder_id}' in parents" for folder_id in folder_ids)
+    params = {
+        "q": f"({parents_clause}) and trashed = false",
+        "fields": f"nextPageToken, files({fields})",
+        "pageSize": 1000,
+        "supportsAllDrives": True,
+        "includeItemsFromAllDrives": True
+    }
+    children = {folder_id: [] for folder_id in folder_ids}
+    page_token = None
+    while True:
+        if page_token:
+            params["pageToken"] = page_token
+        response = execute(service.files().list(**params))
+        for file in response.get("files", []):
+            for parent in file.get("parents", []):
+                if parent in children:
+                    children[parent].append(file)
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return children
+
+
+def walk_tree(service, root_id: str, fields: str = "id, name, mimeType, size, parents",
+              max_depth: int = None) -> Iterator[Tuple[int, str, List[Dict[str, Any]]]]:
+    # Breadth-first walk that yields (depth, folder_id, children) for every folder under root_id.
+    # Each level is listed with batched parent queries spread over tree_executor.
+    if "parents" not in fields:
+        fields = f"{fields}, parents"
+    if "mimeType" not in fields:
+        fields = f"{fields}, mimeType"
+    level, depth, seen = [root_id], 1, {root_id}
+    while level and (max_depth is None or depth <= max_depth):
+        groups = [level[i:i + PARENTS_PER_QUERY] for i in range(0, len(level), PARENTS_PER_QUERY)]
+        next_level = []
+        for children_by_folder in tree_executor.map(lambda group: _list_children(service, group, fields), groups):
+            for folder_id, children in children_by_folder.items():
+                yield depth, folder_id, children
+                for child in children:
+                    if child.get("mimeType") == FOLDER_MIME_TYPE and child["id"] not in seen:
+                        seen.add(child["id"])
+                        next_level.append(child["id"])
+        level, depth = next_level, depth + 1
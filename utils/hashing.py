@@ -0,0 +1,49 @@
+from utils.state_store import StateStore
+from typing import Dict
+import hashlib
+import os
+import threading
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def md5_file(path: str) -> str:
+    # Hex digest in the same form as Drive's md5Checksum, read in blocks to keep memory flat.
+    digest = hashlib.md5()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class HashCache:
+    # md5 digests of the files under one local directory, persisted between runs and reused
+    # while a file's size and mtime are unchanged.
+
+    def __init__(self, store: StateStore, root: str):
+        self._store = store
+        self._key = store.key(os.path.abspath(root))
+        self._entries: Dict[str, list] = (store.load(self._key) or {}).get("files", {})
+        self._seen = set()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def md5(self, relative_path: str, path: str, stat: os.stat_result) -> str:
+        with self._lock:
+            self._seen.add(relative_path)
+            entry = self._entries.get(relative_path)
+            if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+        digest = md5_file(path)
+        with self._lock:
+            self._entries[relative_path] = [stat.st_size, stat.st_mtime_ns, digest]
+        return digest
+
+    def save(self) -> None:
+        # Entries for files that were not looked at in this run are dropped.
+        with self._lock:
+            entries = {path: entry for path, entry in self._entries.items() if path in self._seen}
+        self._store.save(self._key, {"files": entries})
@@ -0,0 +1,174 @@
+from config import TRANSPORT, HTTP2, HTTP_MAX_CONNECTIONS, HTTP_KEEPALIVE_EXPIRY, HTTP_TIMEOUT
+from googleapiclient.http import build_http
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import logging
+import threading
+import httplib2
+
+REDIRECT_CODES = {301, 302, 303, 307}
+# httplib2 reports decoded bodies; these are the encodings httpx decodes for us.
+DECODED_ENCODINGS = {"gzip", "deflate", "br", "zstd"}
+
+
+class HttpxTransport:
+    # One httpx.AsyncClient shared by every worker thread and account. Its event loop runs on a
+    # daemon thread; workers block on the result, so the googleapiclient code above stays
+    # synchronous while all Drive traffic is multiplexed over a few pooled HTTP/2 connections.
+
+    def __init__(self, http2: bool = HTTP2, http1: bool = True, max_connections: int = HTTP_MAX_CONNECTIONS,
+                 keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY, timeout: float = HTTP_TIMEOUT, verify: Any = True):
+        import httpx
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logging.warning("HTTP/2 needs the h2 package (pip install 'httpx[http2]'); using HTTP/1.1")
+                http2, http1 = False, True
+        self.http2 = http2
+        self._httpx = httpx
+        self._options = {
+            "http1": http1, "http2": http2, "verify": verify, "timeout": httpx.Timeout(timeout), "follow_redirects": False,
+            "limits": httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections,
+                                   keepalive_expiry=keepalive_expiry)
+        }
+        self._client = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.errors = 0
+        self.versions: Dict[str, int] = {}
+
+    def request(self, method: str, uri: str, body: Any = None, headers: Optional[Dict[str, str]] = None,
+                redirections: int = 5) -> Tuple[httplib2.Response, bytes]:
+        if hasattr(body, "read"):
+            body = body.read()
+        if isinstance(body, str):
+            body = body.encode()
+        headers = {str(k): str(v) for k, v in (headers or {}).items()}
+        future = asyncio.run_coroutine_threadsafe(self._send(method, uri, body, headers, redirections), self._start())
+        return future.result()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "type": "httpx",
+            "http2": self.http2,
+            "requests": self.requests,
+            "inFlight": self.in_flight,
+            "maxInFlight": self.max_in_flight,
+            "errors": self.errors,
+            "httpVersions": dict(self.versions)
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            loop, client = self._loop, self._client
+            self._loop = self._client = None
+        if loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(timeout=5)
+        loop.call_soon_threadsafe(loop.stop)
+
+    def _start(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="gdrive-http", daemon=True).start()
+                # The client binds to the loop it is created on.
+                self._client = asyncio.run_coroutine_threadsafe(self._create_client(), loop).result()
+                self._loop = loop
+            return self._loop
+
+    async def _create_client(self):
+        return self._httpx.AsyncClient(**self._options)
+
+    async def _send(self, method, uri, body, headers, redirections):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            for _ in range(redirections + 1):
+                response = await self._client.request(method, uri, content=body, headers=headers)
+                location = response.headers.get("location")
+                # Like httplib2, only safe requests follow redirects; a resumable upload's 308 is a
+                # progress report, not a redirect, and is returned as is.
+                if response.status_code not in REDIRECT_CODES or not location or method not in ("GET", "HEAD"):
+                    break
+                uri = str(response.url.join(location))
+            self.requests += 1
+            self.versions[response.http_version] = self.versions.get(response.http_version, 0) + 1
+            return _to_httplib2(response)
+        except self._httpx.TimeoutException as e:
+            self.errors += 1
+            raise TimeoutError(f"{method} {uri} timed out: {e}") from e
+        except self._httpx.TransportError as e:
+            # The request executor retries ConnectionError, as it does for httplib2 socket errors.
+            self.errors += 1
+            raise ConnectionError(f"{method} {uri} failed: {e!r}") from e
+        finally:
+            self.in_flight -= 1
+
+
+def _to_httplib2(response) -> Tuple[httplib2.Response, bytes]:
+    content = response.content
+    info = {"status": str(response.status_code)}
+    for key, value in response.headers.multi_items():
+        key = key.lower()
+        info[key] = f"{info[key]}, {value}" if key in info and key != "status" else value
+    if info.get("content-encoding", "").lower() in DECODED_ENCODINGS:
+        info["-content-encoding"] = info.pop("content-encoding")
+        info["content-length"] = str(len(content))
+    result = httplib2.Response(info)
+    result.reason = response.reason_phrase
+    result.version = 20 if response.http_version == "HTTP/2" else 11
+    return result, content
+
+
+class HttpxHttp:
+    # Enough of httplib2.Http for googleapiclient and google_auth_httplib2, on a shared HttpxTransport.
+
+    def __init__(self, transport: HttpxTransport):
+        self.transport = transport
+        self.timeout = HTTP_TIMEOUT
+        self.follow_redirects = True
+        self.redirect_codes = frozenset(REDIRECT_CODES)
+        self.connections = {}
+
+    def request(self, uri, method="GET", body=None, headers=None, redirections=5, connection_type=None):
+        return self.transport.request(method, uri, body, headers, redirections)
+
+    def close(self):
+        # The transport outlives any one service.
+        pass
+
+
+_shared: Optional[HttpxTransport] = None
+_shared_lock = threading.Lock()
+
+
+def shared_transport() -> HttpxTransport:
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = HttpxTransport()
+            logging.info(f"Using the httpx transport (HTTP/2 {'on' if _shared.http2 else 'off'})")
+        return _shared
+
+
+def build_transport():
+    # The HTTP object for one worker thread's services, as chosen by GDRIVE_TRANSPORT.
+    if TRANSPORT == "httpx":
+        return HttpxHttp(shared_transport())
+    if TRANSPORT != "httplib2":
+        raise ValueError(f"Unknown GDRIVE_TRANSPORT: {TRANSPORT}. Use 'httplib2' or 'httpx'.")
+    return build_http()
+
+
+def transport_stats() -> Dict[str, Any]:
+    return _shared.stats() if _shared is not None else {"type": TRANSPORT}
+
+
+def close_transport() -> None:
+    if _shared is not None:
+        _shared.close()
@@ -0,0 +1,145 @@
+from utils.response_handler import split_fields
+from utils.service_pool import account_name
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Optional
+import threading
+import time
+
+
+def parse_fields(fields: str) -> FrozenSet[str]:
+    return frozenset(split_fields(fields))
+
+
+def _field_key(field: str) -> str:
+    return field.split("(", 1)[0].split("/", 1)[0]
+
+
+def _covers(cached: FrozenSet[str], requested: FrozenSet[str]) -> bool:
+    # A "*" entry holds every top-level field, but only in full, so it cannot answer a mask that
+    # selects inside a field such as "owners(emailAddress)".
+    if requested <= cached:
+        return True
+    return "*" in cached and all("(" not in f and "/" not in f for f in requested)
+
+
+def _project(data: Dict[str, Any], requested: FrozenSet[str]) -> Dict[str, Any]:
+    if "*" in requested:
+        return dict(data)
+    keys = {_field_key(f) for f in requested}
+    return {k: v for k, v in data.items() if k in keys}
+
+
+class MetadataCache:
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # file_id -> {(account, field set): (expires_at, data)}, ordered by recency of use. Accounts
+        # see different files and fields, so they never share entries, but a change made through
+        # any account invalidates the file for all of them.
+        self._entries: "OrderedDict[str, Dict[FrozenSet[str], tuple]]" = OrderedDict()
+        # file_id -> version at which it was last invalidated; bounded, with _floor
+        # covering anything pruned so that in-flight fetches are never stored stale.
+        self._invalidated: "OrderedDict[str, int]" = OrderedDict()
+        self._version = 0
+        self._floor = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def version(self) -> int:
+        with self._lock:
+            return self._version
+
+    def get(self, file_id: str, fields: str) -> Optional[Dict[str, Any]]:
+        requested = parse_fields(fields)
+        account = account_name()
+        now = time.monotonic()
+        with self._lock:
+            by_fields = self._entries.get(file_id)
+            if by_fields:
+                for key, (expires_at, data) in list(by_fields.items()):
+                    if expires_at <= now:
+                        del by_fields[key]
+                        continue
+                    if key[0] == account and _covers(key[1], requested):
+                        self._entries.move_to_end(file_id)
+                        self.hits += 1
+                        return _project(data, requested)
+                if not by_fields:
+                    del self._entries[file_id]
+            self.misses += 1
+            return None
+
+    def put(self, file_id: str, fields: str, data: Dict[str, Any], version: int) -> None:
+        with self._lock:
+            if version < self._floor or self._invalidated.get(file_id, 0) > version:
+                return
+            by_fields = self._entries.setdefault(file_id, {})
+            by_fields[(account_name(), parse_fields(fields))] = (time.monotonic() + self.ttl, dict(data))
+            self._entries.move_to_end(file_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, file_id: str) -> None:
+        with self._lock:
+            self._invalidate_locked(file_id)
+
+    def invalidate_tree(self, file_id: str) -> None:
+        # Trashing, moving or sharing a folder changes what its descendants report too.
+        # Drop every cached descendant we can see, and any entry whose parents are unknown.
+        with self._lock:
+            doomed = {file_id}
+            changed = True
+            while changed:
+                changed = False
+                for cached_id, by_fields in self._entries.items():
+                    if cached_id in doomed:
+                        continue
+                    parents = self._known_parents(by_fields)
+                    if parents is None or doomed.intersection(parents):
+                        doomed.add(cached_id)
+                        changed = True
+            for doomed_id in doomed:
+                self._invalidate_locked(doomed_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._version += 1
+            self._floor = self._version
+            self._entries.clear()
+            self._invalidated.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "maxEntries": self.max_entries,
+                "ttlSeconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hitRate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations
+            }
+
+    def _invalidate_locked(self, file_id: str) -> None:
+        self._version += 1
+        self._entries.pop(file_id, None)
+        self._invalidated[file_id] = self._version
+        self._invalidated.move_to_end(file_id)
+        self.invalidations += 1
+        while len(self._invalidated) > self.max_entries * 4:
+            _, pruned_version = self._invalidated.popitem(last=False)
+            self._floor = max(self._floor, pruned_version)
+
+    @staticmethod
+    def _known_parents(by_fields):
+        for _, data in by_fields.values():
+            if "parents" in data:
+                return data["parents"]
+        return None
@@ -0,0 +1,247 @@
+from config import PROFILE_SAMPLE_RATE, PROFILE_SLOW_THRESHOLD
+from collections import defaultdict, deque
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import cProfile
+import functools
+import io
+import json
+import pstats
+import random
+import threading
+import time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+
+class Histogram:
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        # Linear interpolation inside the bucket holding the q-th observation, as Prometheus does.
+        if not self.count:
+            return None
+        rank, seen, lower = q * self.count, 0, 0.0
+        for i, bound in enumerate(self.buckets):
+            if seen + self.counts[i] >= rank:
+                return lower + (bound - lower) * ((rank - seen) / self.counts[i] if self.counts[i] else 0)
+            seen += self.counts[i]
+            lower = bound
+        return self.buckets[-1]
+
+    def summary(self, digits: int = 4) -> Dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": round(self.sum, digits),
+            "avg": round(self.sum / self.count, digits) if self.count else None,
+            "p50": _round(self.quantile(0.5), digits),
+            "p95": _round(self.quantile(0.95), digits),
+            "p99": _round(self.quantile(0.99), digits)
+        }
+
+
+def _round(value, digits):
+    return round(value, digits) if value is not None else None
+
+
+class Invocation:
+    # Per tool call; shared with helper threads through the context so their Drive calls count too.
+
+    def __init__(self, tool: str):
+        self.tool = tool
+        self.drive_calls = 0
+
+
+current_invocation: ContextVar[Optional[Invocation]] = ContextVar("current_invocation", default=None)
+
+
+class MetricsRegistry:
+
+    def __init__(self, profile_sample_rate: float = PROFILE_SAMPLE_RATE, profile_slow_threshold: float = PROFILE_SLOW_THRESHOLD):
+        self.profile_sample_rate = profile_sample_rate
+        self.profile_slow_threshold = profile_slow_threshold
+        self._lock = threading.Lock()
+        # cProfile can only profile one call at a time in a process.
+        self._profiler_lock = threading.Lock()
+        self.slow_profiles = deque(maxlen=20)
+        self.started_at = time.time()
+        self.tool_latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.tool_request_bytes = defaultdict(lambda: Histogram(SIZE_BUCKETS))
+        self.tool_response_bytes = defaultdict(lambda: Histogram(SIZE_BUCKETS))
+        self.tool_drive_calls = defaultdict(lambda: Histogram(COUNT_BUCKETS))
+        self.tool_errors = defaultdict(int)
+        self.drive_latency = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.drive_request_bytes = defaultdict(int)
+        self.drive_response_bytes = defaultdict(int)
+        self.drive_errors = defaultdict(int)
+
+    def record_drive_call(self, method: str, seconds: float, request_bytes: int = 0, response_bytes: int = 0,
+                          error: bool = False) -> None:
+        invocation = current_invocation.get()
+        with self._lock:
+            self.drive_latency[method].observe(seconds)
+            self.drive_request_bytes[method] += request_bytes
+            self.drive_response_bytes[method] += response_bytes
+            if error:
+                self.drive_errors[method] += 1
+            if invocation is not None:
+                invocation.drive_calls += 1
+
+    def instrument(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        tool = fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            invocation = Invocation(tool)
+            token = current_invocation.set(invocation)
+            started = time.perf_counter()
+            profiler = None
+            if self.profile_sample_rate and random.random() < self.profile_sample_rate \
+                    and self._profiler_lock.acquire(blocking=False):
+                profiler = cProfile.Profile()
+                profiler.enable()
+            try:
+                result = fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                if profiler is not None:
+                    profiler.disable()
+                    self._profiler_lock.release()
+                current_invocation.reset(token)
+            if profiler is not None and elapsed >= self.profile_slow_threshold:
+                self._keep_profile(tool, elapsed, profiler)
+            request_bytes = len(json.dumps({k: v for k, v in kwargs.items() if k != "ctx"}, default=str))
+            response_bytes = len(json.dumps(result, default=str))
+            failed = isinstance(result, dict) and result.get("status") == "error"
+            with self._lock:
+                self.tool_latency[tool].observe(elapsed)
+                self.tool_request_bytes[tool].observe(request_bytes)
+                self.tool_response_bytes[tool].observe(response_bytes)
+                self.tool_drive_calls[tool].observe(invocation.drive_calls)
+                if failed:
+                    self.tool_errors[tool] += 1
+            return result
+        return wrapper
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            tools = {
+                tool: {
+                    "latencySeconds": histogram.summary(),
+                    "errors": self.tool_errors[tool],
+                    "driveCallsPerInvocation": self.tool_drive_calls[tool].summary(2),
+                    "requestBytes": self.tool_request_bytes[tool].summary(0),
+                    "responseBytes": self.tool_response_bytes[tool].summary(0)
+                }
+                for tool, histogram in self.tool_latency.items()
+            }
+            drive = {
+                method: {
+                    "latencySeconds": histogram.summary(),
+                    "errors": self.drive_errors[method],
+                    "requestBytes": self.drive_request_bytes[method],
+                    "responseBytes": self.drive_response_bytes[method]
+                }
+                for method, histogram in self.drive_latency.items()
+            }
+            profiles = list(self.slow_profiles)
+        return {
+            "uptimeSeconds": round(time.time() - self.started_at, 1),
+            "tools": tools,
+            "driveMethods": drive,
+            "slowCallProfiles": profiles
+        }
+
+    def prometheus_text(self, extra_gauges: Optional[Dict[str, float]] = None) -> str:
+        lines: List[str] = []
+        with self._lock:
+            _histogram_lines(lines, "gdrive_tool_latency_seconds", "Tool call latency", "tool", self.tool_latency)
+            _histogram_lines(lines, "gdrive_tool_response_bytes", "Serialized tool response size", "tool", self.tool_response_bytes)
+            _histogram_lines(lines, "gdrive_tool_request_bytes", "Serialized tool argument size", "tool", self.tool_request_bytes)
+            _histogram_lines(lines, "gdrive_tool_drive_calls", "Drive API calls per tool invocation", "tool", self.tool_drive_calls)
+            _counter_lines(lines, "gdrive_tool_errors_total", "Tool calls that returned an error", "tool", self.tool_errors)
+            _histogram_lines(lines, "gdrive_drive_request_latency_seconds", "Drive API request latency", "method", self.drive_latency)
+            _counter_lines(lines, "gdrive_drive_request_bytes_total", "Drive API request body bytes", "method", self.drive_request_bytes)
+            _counter_lines(lines, "gdrive_drive_response_bytes_total", "Drive API response body bytes", "method", self.drive_response_bytes)
+            _counter_lines(lines, "gdrive_drive_errors_total", "Drive API requests that raised", "method", self.drive_errors)
+        for name, value in (extra_gauges or {}).items():
+            lines.append(f"# TYPE {name} gauge")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def _keep_profile(self, tool: str, elapsed: float, profiler: cProfile.Profile) -> None:
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(25)
+        self.slow_profiles.append({
+            "tool": tool, "seconds": round(elapsed, 3), "at": time.time(), "profile": out.getvalue()
+        })
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def _histogram_lines(lines, name, help_text, label, histograms):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for key, histogram in histograms.items():
+        cumulative = 0
+        for bound, count in zip(histogram.buckets, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{label}="{_label(key)}",le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{label}="{_label(key)}",le="+Inf"}} {histogram.count}')
+        lines.append(f'{name}_sum{{{label}="{_label(key)}"}} {histogram.sum}')
+        lines.append(f'{name}_count{{{label}="{_label(key)}"}} {histogram.count}')
+
+
+def _counter_lines(lines, name, help_text, label, counters):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} counter")
+    for key, value in counters.items():
+        lines.append(f'{name}{{{label}="{_label(key)}"}} {value}')
+
+
+
+def start_metrics_server(port: int, render: Callable[[], str], host: str = "127.0.0.1"):
+    # Serves GET /metrics for a Prometheus scraper on a daemon thread.
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="gdrive-metrics", daemon=True).start()
+    return server
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,69 @@
+from utils.request_executor import execute
+from utils.service_pool import ContextThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+import base64
+import json
+
+# Prefetches run on their own threads so a page can be fetched while the previous one is processed.
+prefetch_executor = ContextThreadPoolExecutor(max_workers=4, thread_name_prefix="gdrive-prefetch")
+
+
+class Page(NamedTuple):
+    files: List[Dict[str, Any]]
+    page_token: Optional[str]
+    next_page_token: Optional[str]
+
+
+def encode_cursor(state: Dict[str, Any]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        state = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid search cursor")
+    # A cursor comes back from the client, so check its shape before anything trusts it.
+    if not isinstance(state, dict) or not _is_count(state.get("pageSize"), minimum=1) \
+            or not isinstance(state.get("fields"), list) or not all(isinstance(f, str) for f in state["fields"]) \
+            or not _is_count(state.get("offset", 0)) \
+            or (state.get("source") == "index" and not isinstance(state.get("filters"), dict)):
+        raise ValueError("Invalid search cursor")
+    return state
+
+
+def _is_count(value: Any, minimum: int = 0) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) and value >= minimum
+
+
+def format_files(files: List[Dict[str, Any]], fields: List[str]) -> List[Dict[str, Any]]:
+    keys = [field.split("(", 1)[0].strip() for field in fields]
+    return [{k: f[k] for k in keys if k in f} for f in files]
+
+
+def iter_pages(service, params: Dict[str, Any], fields: List[str], page_token: Optional[str] = None,
+               max_items: Optional[int] = None, prefetch: bool = False) -> Iterator[Page]:
+    # Yields formatted pages of files().list results. With prefetch, the request for the next
+    # page is already in flight while the caller works on the current one, but only while more
+    # items are still wanted.
+    def fetch(token):
+        request_params = dict(params)
+        if token:
+            request_params["pageToken"] = token
+        return execute(service.files().list(**request_params))
+
+    seen = 0
+    pending = None
+    while True:
+        response = pending.result() if pending else fetch(page_token)
+        pending = None
+        files = response.get("files", [])
+        next_page_token = response.get("nextPageToken")
+        seen += len(files)
+        if prefetch and next_page_token and files and (max_items is None or seen < max_items):
+            pending = prefetch_executor.submit(fetch, next_page_token)
+        yield Page(format_files(files, fields), page_token, next_page_token)
+        if not next_page_token or not files:
+            return
+        page_token = next_page_token
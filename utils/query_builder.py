@@ -1,7 +1,40 @@
-from typing import Optional, Dict
+from typing import Any, Dict, List, Optional, Tuple
+import re
 
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+# Filters that may appear in an any_of group or in exclude.
+GROUP_FILTERS = {
+    "name", "exact_name", "mime_type", "contains_text", "modified_after", "modified_before", "parent_folder_id",
+    "starred", "shared_with_me", "owner_email", "folders_only", "exclude_folders"
+}
 
-def build_query_string(
+
+def escape_literal(value: Any) -> str:
+    # Backslashes first, so the ones added for quotes are not doubled.
+    return str(value).replace("\\", "\\\\").replace("'", "\\'")
+
+
+NEGATED_OPERATORS = {"=": "!=", "!=": "=", "<": ">=", ">": "<=", "<=": ">", ">=": "<"}
+COMPARISON = re.compile(r"^(name|mimeType|modifiedTime|starred|trashed) (=|!=|<=|>=|<|>) (.+)$")
+
+
+def _negate(clause: str) -> str:
+    # Drive only accepts `not` before contains, in and has, so comparisons flip their operator.
+    match = COMPARISON.match(clause)
+    if match:
+        return f"{match.group(1)} {NEGATED_OPERATORS[match.group(2)]} {match.group(3)}"
+    return f"not {clause}"
+
+
+def _check_group(group: Dict[str, Any], label: str) -> None:
+    if not isinstance(group, dict) or not group:
+        raise ValueError(f"Each {label} entry must be a non-empty object of search filters")
+    unknown = set(group) - GROUP_FILTERS
+    if unknown:
+        raise ValueError(f"Unsupported filters in {label}: {', '.join(sorted(unknown))}")
+
+
+def query_terms(
         name: Optional[str] = None,
         mime_type: Optional[str] = None,
         contains_text: Optional[str] = None,
@@ -15,49 +48,70 @@ def build_query_string(
         custom_properties: Optional[Dict[str, str]] = None,
         exact_name: bool = False,
         folders_only: bool = False,
-        exclude_folders: bool = False
-    ) -> str:
-        query_parts = []
-        
+        exclude_folders: bool = False,
+        any_of: Optional[List[Dict[str, Any]]] = None,
+        exclude: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[str, str]]:
+        # The clauses of a query as (kind, clause) pairs, all of which must hold. any_of matches
+        # files that satisfy at least one of its groups; exclude drops files matching any of its filters.
+        terms = []
+
         if name:
-            escaped_name = name.replace("'", "\\'").replace("\\", "\\\\")
             if exact_name:
-                query_parts.append(f"name = '{escaped_name}'")
+                terms.append(("name", f"name = '{escape_literal(name)}'"))
             else:
-                query_parts.append(f"name contains '{escaped_name}'")
-        
+                terms.append(("nameContains", f"name contains '{escape_literal(name)}'"))
+
         if mime_type:
-            query_parts.append(f"mimeType = '{mime_type}'")
+            terms.append(("mimeType", f"mimeType = '{escape_literal(mime_type)}'"))
         elif folders_only:
-            query_parts.append("mimeType = 'application/vnd.google-apps.folder'")
+            terms.append(("mimeType", f"mimeType = '{FOLDER_MIME_TYPE}'"))
         elif exclude_folders:
-            query_parts.append("mimeType != 'application/vnd.google-apps.folder'")
-        
+            terms.append(("notMimeType", f"mimeType != '{FOLDER_MIME_TYPE}'"))
+
         if contains_text:
-            escaped_text = contains_text.replace("'", "\\'").replace("\\", "\\\\")
-            if '"' in contains_text:  
-                query_parts.append(f"fullText contains '{escaped_text}'")
-            else:
-                query_parts.append(f"fullText contains '{escaped_text}'")
-        
+            terms.append(("fullText", f"fullText contains '{escape_literal(contains_text)}'"))
+
         if modified_after:
-            query_parts.append(f"modifiedTime > '{modified_after}'")
+            terms.append(("modifiedTime", f"modifiedTime > '{escape_literal(modified_after)}'"))
         if modified_before:
-            query_parts.append(f"modifiedTime < '{modified_before}'")
+            terms.append(("modifiedTime", f"modifiedTime < '{escape_literal(modified_before)}'"))
         if parent_folder_id:
-            query_parts.append(f"'{parent_folder_id}' in parents")
-        
+            terms.append(("parents", f"'{escape_literal(parent_folder_id)}' in parents"))
+
         if starred is not None:
-            query_parts.append(f"starred = {str(starred).lower()}")
+            terms.append(("starred" if starred else "notStarred", f"starred = {str(starred).lower()}"))
         if trashed is not None:
-            query_parts.append(f"trashed = {str(trashed).lower()}")
+            terms.append(("trashed", f"trashed = {str(trashed).lower()}"))
         if shared_with_me is not None and shared_with_me:
-            query_parts.append("sharedWithMe")
+            terms.append(("sharedWithMe", "sharedWithMe"))
         if owner_email:
-            query_parts.append(f"'{owner_email}' in owners")
+            terms.append(("owners", f"'{escape_literal(owner_email)}' in owners"))
 
         if custom_properties:
             for key, value in custom_properties.items():
-                query_parts.append(f"properties has {{ key='{key}' and value='{value}' }}")
-        
-        return " and ".join(query_parts)
\ No newline at end of file
+                terms.append(("properties",
+                              f"properties has {{ key='{escape_literal(key)}' and value='{escape_literal(value)}' }}"))
+
+        if any_of:
+            groups = []
+            for group in any_of:
+                _check_group(group, "any_of")
+                clauses = [clause for _, clause in query_terms(**group)]
+                if not clauses:
+                    raise ValueError("Each any_of group must set at least one filter")
+                groups.append(f"({' and '.join(clauses)})" if len(clauses) > 1 else clauses[0])
+            text = any("contains_text" in group for group in any_of)
+            terms.append(("fullText" if text else "anyOf",
+                          f"({' or '.join(groups)})" if len(groups) > 1 else groups[0]))
+
+        if exclude:
+            _check_group(exclude, "exclude")
+            for kind, clause in query_terms(**exclude):
+                terms.append(("fullText" if kind == "fullText" else "exclude", _negate(clause)))
+
+        return terms
+
+
+def build_query_string(**filters) -> str:
+    return " and ".join(clause for _, clause in query_terms(**filters))
@@ -0,0 +1,78 @@
+from utils.request_executor import execute
+from utils.query_builder import escape_literal
+from typing import Any, Dict, List, Optional, Tuple
+import time
+
+# Rough share of a Drive that each kind of clause (see query_terms) lets through.
+SELECTIVITY = {
+    "parents": 0.001, "name": 0.001, "properties": 0.01, "nameContains": 0.02, "starred": 0.02,
+    "mimeType": 0.1, "owners": 0.3, "modifiedTime": 0.3, "sharedWithMe": 0.3, "anyOf": 0.5,
+    "exclude": 0.9, "notMimeType": 0.9, "notStarred": 1.0, "trashed": 1.0
+}
+# A fullText search is only probed when its metadata filters are expected to keep at most this share.
+PROBE_SELECTIVITY = 0.05
+# Candidates the probe lists; more than this and the fullText search runs unscoped.
+PROBE_LIMIT = 500
+# Most folders a scoped fullText query names in its "'a' in parents or ..." clause.
+MAX_SCOPE_PARENTS = 50
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+
+def estimate_selectivity(terms: List[Tuple[str, str]]) -> float:
+    estimate = 1.0
+    for kind, _ in terms:
+        if kind != "fullText":
+            estimate *= SELECTIVITY.get(kind, 1.0)
+    return estimate
+
+
+def plan_query(service, terms: List[Tuple[str, str]], spaces: str = "drive") -> Tuple[Optional[str], Dict[str, Any]]:
+    # Orders the clauses by estimated selectivity and, for fullText searches with selective metadata
+    # filters, lists the files those filters match first. No candidates means no fullText query at
+    # all; a few means the fullText query is limited to the folders they live in, which matches the
+    # same files. Returns the query to run (None when nothing can match) and the plan for reporting.
+    started = time.perf_counter()
+    metadata = sorted((t for t in terms if t[0] != "fullText"), key=lambda t: SELECTIVITY.get(t[0], 1.0))
+    text = [t for t in terms if t[0] == "fullText"]
+    metadata_query = " and ".join(clause for _, clause in metadata)
+    query = " and ".join(clause for _, clause in metadata + text)
+    selectivity = estimate_selectivity(metadata)
+    plan = {"strategy": "single", "estimatedSelectivity": selectivity, "steps": []}
+
+    def finish(query, strategy=None, reason=None):
+        plan["strategy"] = strategy or plan["strategy"]
+        if reason:
+            plan["reason"] = reason
+        plan["planningMs"] = _elapsed_ms(started)
+        return query, plan
+
+    if not text:
+        return finish(query, reason="no fullText clause")
+    if any(kind == "parents" for kind, _ in metadata):
+        return finish(query, reason="already limited to a folder")
+    if not metadata or selectivity > PROBE_SELECTIVITY:
+        return finish(query, reason="metadata filters are not selective enough to probe")
+
+    probe_started = time.perf_counter()
+    response = execute(service.files().list(q=metadata_query, spaces=spaces, pageSize=PROBE_LIMIT,
+                                            fields="nextPageToken, files(id, parents)"))
+    candidates = response.get("files", [])
+    plan["steps"].append({"step": "probe", "query": metadata_query, "candidates": len(candidates),
+                          "complete": not response.get("nextPageToken"), "ms": _elapsed_ms(probe_started)})
+
+    if response.get("nextPageToken"):
+        return finish(query, reason=f"metadata filters match more than {PROBE_LIMIT} files")
+    if not candidates:
+        return finish(None, "empty", "no file matches the metadata filters")
+    parents = list(dict.fromkeys(parent for file in candidates for parent in file.get("parents", [])))
+    if any(not file.get("parents") for file in candidates):
+        return finish(query, reason="some candidates have no visible parent folder")
+    if len(parents) > MAX_SCOPE_PARENTS:
+        return finish(query, reason=f"candidates span more than {MAX_SCOPE_PARENTS} folders")
+    scope = " or ".join(f"'{escape_literal(parent)}' in parents" for parent in parents)
+    scope = f"({scope})" if len(parents) > 1 else scope
+    scoped = " and ".join([metadata_query, scope] + [clause for _, clause in text])
+    return finish(scoped, "scoped", f"fullText limited to the {len(parents)} folders holding {len(candidates)} candidates")
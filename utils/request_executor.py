@@ -0,0 +1,201 @@
+from config import QPS_LIMIT, QPS_BURST, MAX_RETRIES, RETRY_BASE_DELAY, RETRY_MAX_DELAY
+from utils.metrics import registry
+from utils.service_pool import current_account
+from email.utils import parsedate_to_datetime
+from googleapiclient.errors import HttpError
+from typing import Any, Callable, Dict, Iterable, Optional
+import json
+import logging
+import random
+import threading
+import time
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = {"rateLimitExceeded", "userRateLimitExceeded", "sharingRateLimitExceeded"}
+
+
+def is_rate_limited(error: HttpError) -> bool:
+    if error.resp.status == 429:
+        return True
+    if error.resp.status != 403:
+        return False
+    try:
+        errors = json.loads(error.content.decode()).get("error", {}).get("errors", [])
+    except (ValueError, AttributeError):
+        return False
+    return any(e.get("reason") in RATE_LIMIT_REASONS for e in errors)
+
+
+def is_retryable(error: HttpError) -> bool:
+    return error.resp.status in RETRYABLE_STATUSES or is_rate_limited(error)
+
+
+def retry_after_seconds(error: HttpError) -> Optional[float]:
+    value = error.resp.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1) -> float:
+        # Reserve the tokens now (possibly going negative) and sleep off the debt outside the lock,
+        # so concurrent callers queue fairly instead of all waking at once.
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class RequestExecutor:
+
+    def __init__(self, qps: float = QPS_LIMIT, burst: float = QPS_BURST, max_retries: int = MAX_RETRIES,
+                 base_delay: float = RETRY_BASE_DELAY, max_delay: float = RETRY_MAX_DELAY):
+        self.limiter = TokenBucket(qps, burst) if qps > 0 else None
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._lock = threading.Lock()
+        self._metrics = {
+            "requests": 0,
+            "retries": 0,
+            "retriesByStatus": {},
+            "failures": 0,
+            "throttledRequests": 0,
+            "throttleWaitSeconds": 0.0,
+            "backoffWaitSeconds": 0.0
+        }
+        # Requests that may have changed Drive, successful or not; the file index compares it with
+        # the count at its last sync to tell whether this server has written since.
+        self.writes = 0
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        # Full jitter, but never sooner than the server asked us to wait.
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    def throttle(self, cost: float = 1) -> None:
+        # The shared limit stands for the project quota; an account's own limit for its per-user quota.
+        account = current_account.get()
+        waited = self.limiter.acquire(cost) if self.limiter else 0.0
+        if account is not None and account.limiter is not None:
+            waited += account.limiter.acquire(cost)
+        if waited > 0:
+            with self._lock:
+                self._metrics["throttledRequests"] += 1
+                self._metrics["throttleWaitSeconds"] += waited
+
+    def wait_before_retry(self, attempt: int, status: Any, retry_after: Optional[float] = None) -> float:
+        delay = self.backoff_delay(attempt, retry_after)
+        with self._lock:
+            self._metrics["retries"] += 1
+            by_status = self._metrics["retriesByStatus"]
+            by_status[str(status)] = by_status.get(str(status), 0) + 1
+            self._metrics["backoffWaitSeconds"] += delay
+        time.sleep(delay)
+        return delay
+
+    def call(self, fn: Callable[[], Any], cost: float = 1, description: str = "Drive request",
+             sizes: Optional[Dict[str, int]] = None, write: bool = False) -> Any:
+        # sizes comes from measure_sizes() and is reported with the attempt's latency. write marks
+        # calls that may change Drive.
+        try:
+            return self._call(fn, cost, description, sizes)
+        finally:
+            if write:
+                with self._lock:
+                    self.writes += 1
+
+    def _call(self, fn, cost, description, sizes):
+        for attempt in range(self.max_retries + 1):
+            self.throttle(cost)
+            with self._lock:
+                self._metrics["requests"] += 1
+            started = time.perf_counter()
+            try:
+                result = fn()
+                self._record(description, started, sizes)
+                return result
+            except HttpError as e:
+                self._record(description, started, sizes, error=True)
+                if attempt >= self.max_retries or not is_retryable(e):
+                    with self._lock:
+                        self._metrics["failures"] += 1
+                    raise
+                delay = self.wait_before_retry(attempt, e.resp.status, retry_after_seconds(e))
+                logging.warning(f"{description} failed with {e.resp.status}, retry {attempt + 1}/{self.max_retries} after {delay:.2f}s")
+            except (ConnectionError, TimeoutError) as e:
+                self._record(description, started, sizes, error=True)
+                if attempt >= self.max_retries:
+                    with self._lock:
+                        self._metrics["failures"] += 1
+                    raise
+                delay = self.wait_before_retry(attempt, type(e).__name__)
+                logging.warning(f"{description} failed with {e!r}, retry {attempt + 1}/{self.max_retries} after {delay:.2f}s")
+
+    def execute(self, request, cost: float = 1) -> Any:
+        return self.call(request.execute, cost=cost, description=getattr(request, "methodId", None) or "Drive request",
+                         sizes=measure_sizes([request]), write=is_write(request))
+
+    def _record(self, description: str, started: float, sizes: Optional[Dict[str, int]], error: bool = False) -> None:
+        request_bytes, response_bytes = (sizes["request"], sizes.pop("response", 0)) if sizes else (0, 0)
+        registry.record_drive_call(description, time.perf_counter() - started, request_bytes, response_bytes, error)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["retriesByStatus"] = dict(self._metrics["retriesByStatus"])
+        metrics["throttleWaitSeconds"] = round(metrics["throttleWaitSeconds"], 3)
+        metrics["backoffWaitSeconds"] = round(metrics["backoffWaitSeconds"], 3)
+        metrics["writes"] = self.writes
+        metrics["qpsLimit"] = self.limiter.rate if self.limiter else None
+        return metrics
+
+
+def is_write(request) -> bool:
+    return getattr(request, "method", "GET") not in ("GET", "HEAD")
+
+
+def measure_sizes(requests: Iterable[Any]) -> Dict[str, int]:
+    # Counts request bodies up front and response bodies as each request parses its response.
+    sizes = {"request": 0}
+    for request in requests:
+        sizes["request"] += len(getattr(request, "body", None) or "")
+        postproc = getattr(request, "postproc", None)
+        if postproc is None:
+            continue
+
+        def counting_postproc(resp, content, postproc=postproc):
+            sizes["response"] = sizes.get("response", 0) + len(content or b"")
+            return postproc(resp, content)
+        request.postproc = counting_postproc
+    return sizes
+
+
+default_executor = RequestExecutor()
+
+
+def execute(request, cost: float = 1) -> Any:
+    return default_executor.execute(request, cost=cost)
@@ -1,4 +1,4 @@
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Union
 
 
 def success_response(data: Any, message: str = "Operation successful") -> Dict[str, Any]:
@@ -18,4 +18,64 @@ def error_response(message: str, code: int = 500, details: Optional[Any] = None)
             "code": code,
             "details": details
         }
-    }
\ No newline at end of file
+    }
+
+
+# Named field masks for file results, from cheapest to most complete.
+FIELD_PROFILES = {
+    "minimal": ["id", "name", "mimeType"],
+    "standard": ["id", "name", "mimeType", "size", "modifiedTime", "parents"],
+    "full": ["id", "name", "mimeType", "size", "createdTime", "modifiedTime", "owners(displayName, emailAddress)",
+             "parents", "webViewLink", "md5Checksum", "starred", "trashed"]
+}
+LAYOUTS = ("records", "columns")
+
+
+def resolve_fields(fields: Optional[Union[str, List[str]]] = None, profile: Optional[str] = None,
+                   default: Optional[List[str]] = None) -> List[str]:
+    # Explicit fields win over a profile; a comma separated mask is split on top-level commas.
+    if fields:
+        if isinstance(fields, str):
+            return split_fields(fields)
+        return list(fields)
+    if profile:
+        if profile not in FIELD_PROFILES:
+            raise ValueError(f"Unknown field profile: {profile}. Use one of: {', '.join(FIELD_PROFILES)}")
+        return list(FIELD_PROFILES[profile])
+    return list(default or FIELD_PROFILES["standard"])
+
+
+def field_mask(fields: List[str]) -> str:
+    return ", ".join(fields)
+
+
+def shape_items(items: List[Dict[str, Any]], layout: str = "records",
+                columns: Optional[List[str]] = None) -> Union[List[Dict[str, Any]], Dict[str, Any]]:
+    # "columns" sends the field names once and one value row per item instead of repeating every key.
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout: {layout}. Use 'records' or 'columns'.")
+    if layout == "records":
+        return items
+    if columns is None:
+        columns = list(dict.fromkeys(key for item in items for key in item))
+    else:
+        columns = [column.split("(", 1)[0].strip() for column in columns]
+    return {"columns": columns, "rows": [[item.get(column) for column in columns] for item in items]}
+
+
+def split_fields(mask: str) -> List[str]:
+    # Split a Drive field mask on top-level commas, keeping "owners(emailAddress)" intact.
+    parts, depth, current = [], 0, ""
+    for char in mask:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char == "," and depth == 0:
+            parts.append(current.strip())
+            current = ""
+        else:
+            current += char
+    if current.strip():
+        parts.append(current.strip())
+    return parts
@@ -0,0 +1,157 @@
+from utils.response_handler import error_response
+from concurrent.futures import ThreadPoolExecutor
+from pydantic import AnyUrl
+from typing import Any, Callable, Optional
+import asyncio
+import contextvars
+import functools
+import inspect
+import threading
+
+_worker = threading.local()
+# The account (see accounts.Account) the current tool call acts as. None when the server was
+# built around a single service factory.
+current_account: contextvars.ContextVar = contextvars.ContextVar("gdrive_account", default=None)
+
+
+def account_name() -> Optional[str]:
+    account = current_account.get()
+    return account.name if account else None
+
+
+def on_default_account() -> bool:
+    account = current_account.get()
+    return account is None or account.is_default
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    # Runs each task in a copy of the submitter's context, so helper threads stay attributed
+    # to the tool call that started them.
+
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+
+def _call_in_worker(loop, account, fn, args, kwargs):
+    _worker.loop = loop
+    token = current_account.set(account)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        current_account.reset(token)
+        _worker.loop = None
+
+
+def report_progress(ctx, progress: float, total: float = None) -> None:
+    # Lets a tool running on a worker thread send MCP progress notifications on the server's loop.
+    loop = getattr(_worker, "loop", None)
+    if ctx is None or loop is None:
+        return
+    asyncio.run_coroutine_threadsafe(ctx.report_progress(progress, total), loop)
+
+
+def resource_notifier(ctx) -> Optional[Callable[[str], None]]:
+    # A callable that, from any thread, tells the client of the current tool call that a resource
+    # changed. None outside a tool call or without a session to notify.
+    loop = getattr(_worker, "loop", None)
+    if ctx is None or loop is None:
+        return None
+    try:
+        session = ctx.session
+    except ValueError:
+        return None
+
+    def notify(uri: str) -> None:
+        if loop.is_closed():
+            return
+        future = asyncio.run_coroutine_threadsafe(session.send_resource_updated(AnyUrl(uri)), loop)
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+    return notify
+
+
+class _WorkerService:
+
+    def __init__(self, pool: "ServicePool"):
+        self._pool = pool
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._pool.local_service(), name)
+
+
+class ServicePool:
+    # With an accounts registry, every call runs as one of its accounts: services are cached per
+    # thread and account, and tools get an optional `account` argument when there is a choice.
+
+    def __init__(self, service_factory: Callable[[], Any], max_workers: int = 8, accounts=None):
+        self._service_factory = service_factory
+        self._local = threading.local()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="gdrive-worker")
+        self.max_workers = max_workers
+        self.accounts = accounts
+        self.service = _WorkerService(self)
+
+    def local_service(self) -> Any:
+        # Services are cached per thread and account. Services of accounts the registry has dropped
+        # go the next time the thread builds one, so each thread holds one per live account at most.
+        services = getattr(self._local, "services", None)
+        if services is None:
+            services = self._local.services = {}
+        account = current_account.get()
+        name = account.name if account else None
+        cached = services.get(name)
+        if cached is not None and cached[0] is account:
+            return cached[1]
+        service = self._service_factory()
+        for key in [key for key, (owner, _) in services.items() if owner is not None and owner.retired]:
+            del services[key]
+        if account is None or not account.retired:
+            services[name] = (account, service)
+        return service
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        return await self.run_as(self.accounts.get() if self.accounts else None, fn, *args, **kwargs)
+
+    async def run_as(self, account, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        # The account's slots are awaited on the event loop, so a busy account queues without
+        # holding worker threads that other accounts could use.
+        loop = asyncio.get_running_loop()
+        if account is None:
+            return await loop.run_in_executor(self._executor, _call_in_worker, loop, None, fn, args, kwargs)
+        # Counted as waiting until it has a slot, so the registry does not drop the account meanwhile.
+        account.waiting += 1
+        try:
+            if account.slots:
+                await account.slots.acquire()
+        finally:
+            account.waiting -= 1
+        account.active += 1
+        account.calls += 1
+        try:
+            return await loop.run_in_executor(self._executor, _call_in_worker, loop, account, fn, args, kwargs)
+        finally:
+            account.active -= 1
+            if account.slots:
+                account.slots.release()
+
+    def wrap(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        if self.accounts is None:
+            @functools.wraps(fn)
+            async def wrapper(*args, **kwargs):
+                return await self.run(fn, *args, **kwargs)
+            return wrapper
+
+        @functools.wraps(fn)
+        async def wrapper(*args, account: str = None, **kwargs):
+            try:
+                selected = self.accounts.get(account)
+            except KeyError as e:
+                return error_response(e.args[0], 400)
+            return await self.run_as(selected, fn, *args, **kwargs)
+        if self.accounts.selectable:
+            signature = inspect.signature(fn)
+            selector = inspect.Parameter("account", inspect.Parameter.KEYWORD_ONLY, default=None, annotation=Optional[str])
+            wrapper.__signature__ = signature.replace(parameters=[*signature.parameters.values(), selector])
+        return wrapper
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,42 @@
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import os
+import threading
+
+
+class StateStore:
+
+    def __init__(self, root: str, namespace: str):
+        self.directory = os.path.join(root, namespace)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts: Any) -> str:
+        return hashlib.sha1("\0".join(str(p) for p in parts).encode()).hexdigest()
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(key)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def save(self, key: str, data: Dict[str, Any]) -> None:
+        # Write to a temp file and rename so a crash never leaves a half-written state file.
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self._path(key)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")